@@ -14,35 +14,178 @@ MODEL_QA = "gpt-4.1-mini"
 # Storage dirs
 STORAGE_DIR = BASE_DIR / "storage"
 OUTPUT_DIR = STORAGE_DIR / "output"
+CHECKPOINT_DIR = STORAGE_DIR / "checkpoints"
+CHUNK_STORE_PATH = STORAGE_DIR / "chunks.sqlite3"
+BATCH_DIR = STORAGE_DIR / "batches"
+CAMPAIGN_STORE_PATH = STORAGE_DIR / "campaigns.sqlite3"
+ARTIFACT_DIR = STORAGE_DIR / "artifacts"
+
+# Keep stage checkpoints after a successful run (they are always kept on failure)
+KEEP_CHECKPOINTS_ON_SUCCESS = False
+
+# LLM response cache (SQLite, keyed on model + prompt + temperature)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = STORAGE_DIR / "llm_cache.sqlite3"
+LLM_CACHE_MAX_BYTES = 512 * 1024 * 1024
+LLM_CACHE_MAX_AGE_DAYS = 30
+# Stages that always go to the API, e.g. {"player_final"} to re-roll the story
+LLM_CACHE_BYPASS_STAGES: set[str] = set()
+
+# Run artifacts: one compressed JSON bundle per run, indexed by run id and
+# transcript hash. "auto" uses zstd when the zstandard package is installed,
+# gzip otherwise.
+ARTIFACT_CODEC = "auto"
+# Also write the GM / player recaps as Markdown files to OUTPUT_DIR
+EXPORT_MARKDOWN = True
+
+# OpenAI calls (app/models/openai_client.py, app/pipeline/ratelimit.py)
+# Per-model (requests per minute, tokens per minute) for this API key's tier;
+# calls wait for budget instead of running into 429s
+MODEL_RATE_LIMITS = {
+    "gpt-4.1": (500, 30_000),
+    "gpt-4.1-mini": (500, 200_000),
+}
+DEFAULT_RATE_LIMIT = (500, 30_000)
+# Completion tokens charged up front per call, settled against actual usage
+LLM_COMPLETION_TOKEN_ESTIMATE = 1_000
+LLM_TIMEOUT_SECONDS = 120          # per request; for streams, between chunks
+LLM_CONNECT_TIMEOUT_SECONDS = 10
+LLM_MAX_RETRIES = 6                # 429, 408/409, 5xx, timeouts, connection errors
+LLM_BACKOFF_BASE_SECONDS = 1.0     # doubles per attempt unless the server says otherwise
+LLM_BACKOFF_MAX_SECONDS = 60.0
+
+# Uploads are read in pieces of this size, never whole
+UPLOAD_READ_CHUNK_BYTES = 1024 * 1024
 
 # Maximum number of tokens per transcript chunk
 MAX_CHUNK_TOKENS = 12000
 
+# How transcripts are cut into chunks (app/pipeline/chunking.py):
+#   "turns"  - whole speaker turns packed up to MAX_CHUNK_TOKENS, ending at a
+#              scene break (blank line or a timestamp gap of at least
+#              CHUNK_SCENE_GAP_SECONDS) when one is close enough to the limit
+#   "tokens" - every MAX_CHUNK_TOKENS tokens, wherever that falls
+CHUNK_STRATEGY = "turns"
+CHUNK_SCENE_GAP_SECONDS = 90
+# Tokens from the end of each chunk repeated at the start of the next (whole
+# turns; at most half a chunk). Events seen twice at a boundary are kept once
+# when timelines are merged.
+CHUNK_OVERLAP_TOKENS = 0
+
+# Send prompt_cache_key (the stage name) with chat calls, so calls sharing a
+# prompt template are routed to the same provider-side prompt cache
+LLM_PROMPT_CACHE_KEY = True
+
+# Token budgets for the variable inputs of the synthesis and QA prompts
+# (chunk summaries, digests, action logs). Inputs over budget are merged in
+# groups of at most REDUCE_GROUP_TOKENS, in parallel and level by level,
+# until they fit (app/pipeline/reduce.py).
+SYNTHESIS_INPUT_BUDGET = 40_000
+QA_INPUT_BUDGET = 40_000
+REDUCE_GROUP_TOKENS = 12_000
+
+# QA of the final recaps:
+#   "local" - deterministic name/pronoun check first (app/pipeline/qa_local.py);
+#             the LLM QA call only sees the flagged passages and is skipped
+#             when nothing is flagged
+#   "full"  - LLM QA over the recaps and all chunk summaries and digests
+QA_MODE = "local"
+QA_NAME_SIMILARITY = 85   # rapidfuzz ratio at which an unknown name counts as a misspelling
+# Capitalized words that are never reported as unknown names
+QA_IGNORED_NAMES = ["I", "GM", "DM", "NPC", "NPCs", "PC", "PCs", "ShadowDark", "Shadowdark", "TTRPG"]
+
+# Known entities per category passed from the campaign store to canon extraction
+CAMPAIGN_HINT_LIMIT = 200
+
+# Transcript compaction after normalization (app/pipeline/compaction.py)
+COMPACTION_ENABLED = True
+COMPACTION_KEEP_LINE_MAP = False       # report which source lines each output line came from
+COMPACTION_MAX_REPEAT_WORDS = 3        # longest stuttered phrase collapsed ("I think I think")
+# Repeats are only collapsed when they start with one of these words, so
+# deliberate repetition ("no no no", "very very") is kept
+COMPACTION_STUTTER_WORDS = [
+    "i", "i'm", "i'll", "it", "it's", "the", "a", "an", "and", "but", "so", "or", "to", "of", "in",
+    "on", "at", "is", "we", "you", "he", "she", "they", "that", "this", "what", "if", "my", "your",
+]
+COMPACTION_DISFLUENCIES = ["um", "umm", "uh", "uhh", "uhm", "erm", "er", "hmm", "hm", "mm", "mhm"]
+# Removed only when set off by commas or at the start of an utterance
+COMPACTION_DISCOURSE_FILLERS = ["like", "you know", "i mean", "so yeah", "basically", "literally"]
+# Lines consisting only of one of these are crosstalk and dropped when they
+# interrupt another speaker (between two of that speaker's lines, the first
+# not a question); elsewhere they can be answers ("Do you open it?" "Yes.")
+COMPACTION_BACKCHANNELS = ["yeah", "yep", "yes", "ok", "okay", "right", "mm-hmm", "uh-huh", "lol", "haha", "nice", "cool", "sure"]
+# Lines matching any of these are out-of-character table talk and dropped.
+# They are searched in the whole utterance, so anchor them (^...) unless the
+# phrase can never be in-character speech.
+COMPACTION_OOC_PATTERNS = [r"^\(?ooc\b", r"^\(\(.*\)\)$", r"^brb\b", r"^(?:quick |short )?bathroom break\b"]
+
+# Canon/timeline extraction:
+#   "single"  - whole transcript in one prompt each
+#   "chunked" - per chunk in parallel, then merged locally
+#   "auto"    - chunked once the transcript is longer than one chunk
+EXTRACTION_MODE = "auto"
+
+# One structured call per chunk (analytical summary, narrative digest and
+# action log together) instead of three; invalid responses fall back per chunk
+FUSED_CHUNK_CALLS = False
+
+# Batch API mode (app/pipeline/batch.py)
+BATCH_POLL_SECONDS = 60
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_MAX_REQUESTS = 50_000                 # per batch file (API limit)
+BATCH_MAX_FILE_BYTES = 190 * 1024 * 1024    # per batch file (API limit is 200 MB)
+
+# Maximum number of LLM calls in flight at once (chunk and stage-level calls,
+# across all running sessions)
+CHUNK_CONCURRENCY = 8
+
+# Maximum number of pipeline stages running at once within a single run
+STAGE_CONCURRENCY = 6
+
+# Background job queue for /api/upload
+# Running sessions share the CHUNK_CONCURRENCY pool by weighted fair share
+# (app/pipeline/parallel.py), so several can run without one starving another
+JOB_WORKERS = 4          # transcripts processed at the same time
+JOB_QUEUE_MAXSIZE = 64   # queued uploads before /api/upload answers 503
+JOB_HISTORY_LIMIT = 200  # finished jobs kept in memory for status polling
+# Streamed recap tokens are coalesced into one "token" event per stage at most
+# this often, so a job's replayable event log holds a few hundred entries,
+# not one per token
+JOB_TOKEN_EVENT_SECONDS = 0.25
+# Priority levels and their weights: higher priorities are started first and
+# get a proportionally larger share of the LLM call pool while running
+JOB_PRIORITIES = {"low": 1, "normal": 2, "high": 4}
+JOB_DEFAULT_PRIORITY = "normal"
+
+# Multi-transcript uploads (/api/batches): files per request (zip members
+# included) and the largest transcript read out of a zip archive
+UPLOAD_BATCH_MAX_FILES = 64
+UPLOAD_ZIP_MAX_MEMBER_BYTES = 50 * 1024 * 1024
+
 # --- CHARACTER ALIAS CONFIG -----------------------------------------------
 
 CHARACTER_MAP_FILE = BASE_DIR / "config" / "characters.json"
 
-# Load new-format characters.json
-# Expected structure:
-# {
-#   "characters": {
-#       "Graak": { "aliases": [...], "pronouns": "he/him" },
-#       "Bahl":  { "aliases": [...], "pronouns": "she/her" }
-#   }
-# }
-CHARACTER_DATA = json.loads(CHARACTER_MAP_FILE.read_text(encoding="utf-8"))
+# Per-campaign profiles (same format as characters.json), picked by the
+# campaign_id of an upload; campaigns without one use CHARACTER_MAP_FILE.
+# See app/pipeline/profiles.py.
+CAMPAIGN_PROFILE_DIR = BASE_DIR / "config" / "campaigns"
+PROFILE_CACHE_SIZE = 32
 
-# Build alias map (canonical → aliases)
-CHARACTER_ALIASES = {
-    canonical: data["aliases"]
-    for canonical, data in CHARACTER_DATA["characters"].items()
-}
 
-# Build pronoun map (canonical → pronouns)
-CHARACTER_PRONOUNS = {
-    canonical: data.get("pronouns", "")
-    for canonical, data in CHARACTER_DATA["characters"].items()
-}
+def __getattr__(name: str):
+    # CHARACTER_DATA / CHARACTER_ALIASES / CHARACTER_PRONOUNS are the default
+    # profile's, read on first access (not at import) and re-read when
+    # characters.json changes.
+    if name == "CHARACTER_DATA":
+        return json.loads(CHARACTER_MAP_FILE.read_text(encoding="utf-8"))
+    if name in ("CHARACTER_ALIASES", "CHARACTER_PRONOUNS"):
+        from app.pipeline.profiles import get_profile
+
+        profile = get_profile()
+        return profile.aliases if name == "CHARACTER_ALIASES" else profile.pronouns
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Words that should NEVER be normalized away
 PROTECTED_WORDS = [
@@ -0,0 +1,303 @@
+import asyncio
+import itertools
+import time
+import traceback
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict, List
+
+from app.config import (
+    JOB_DEFAULT_PRIORITY,
+    JOB_HISTORY_LIMIT,
+    JOB_PRIORITIES,
+    JOB_QUEUE_MAXSIZE,
+    JOB_TOKEN_EVENT_SECONDS,
+    JOB_WORKERS,
+)
+from app.pipeline.parallel import session
+from app.pipeline.summarizer import run_pipeline
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    source_name: str | None
+    transcript: str | None
+    resume: bool = False
+    incremental: bool = False
+    campaign_id: str | None = None
+    priority: str = JOB_DEFAULT_PRIORITY
+    batch_id: str | None = None
+    status: str = "queued"  # queued | running | done | failed
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    stages: Dict[str, dict] = field(default_factory=dict)
+    result: dict | None = None
+    error: str | None = None
+    # Append-only log of pipeline events, replayed to /events subscribers
+    events: List[dict] = field(default_factory=list)
+    _lock: Lock = field(default_factory=Lock, repr=False)
+    # Token deltas per stage not yet in `events`, and when each was last flushed
+    _tokens: Dict[str, List[str]] = field(default_factory=dict, repr=False)
+    _tokens_flushed: Dict[str, float] = field(default_factory=dict, repr=False)
+    _loop: asyncio.AbstractEventLoop | None = field(default=None, repr=False)
+    _waiters: List[asyncio.Event] = field(default_factory=list, repr=False)
+
+    def on_progress(self, event: str, stage: str, data: Any = None) -> None:
+        # Called from pipeline threads
+        now = time.time()
+        with self._lock:
+            if event == "token":
+                self._tokens.setdefault(stage, []).append(data)
+                if now - self._tokens_flushed.get(stage, 0.0) < JOB_TOKEN_EVENT_SECONDS:
+                    return
+                self._flush_tokens(stage, now)
+            else:
+                # Tokens always precede their stage's finished/failed event
+                self._flush_tokens(stage, now)
+                if event in ("started", "finished", "failed", "restored"):
+                    entry = self.stages.setdefault(stage, {})
+                    entry["status"] = event
+                    entry["started_at" if event == "started" else "finished_at"] = now
+                self.events.append({"event": event, "stage": stage, "data": data})
+        self._wake()
+
+    def _flush_tokens(self, stage: str, now: float) -> None:
+        deltas = self._tokens.pop(stage, None)
+        self._tokens_flushed[stage] = now
+        if deltas:
+            self.events.append({"event": "token", "stage": stage, "data": "".join(deltas)})
+
+    def set_status(self, status: str) -> None:
+        self.status = status
+        self._wake()
+
+    def _wake(self) -> None:
+        if self._loop is None:
+            return
+        for waiter in list(self._waiters):
+            self._loop.call_soon_threadsafe(waiter.set)
+
+    async def wait_for_events(self, seen: int, timeout: float = 15.0) -> None:
+        """
+        Returns once there are more than `seen` events, the job has finished,
+        or `timeout` seconds have passed (so callers can send keep-alives).
+        """
+        if len(self.events) > seen or self.status in ("done", "failed"):
+            return
+        waiter = asyncio.Event()
+        self._waiters.append(waiter)
+        try:
+            if len(self.events) > seen or self.status in ("done", "failed"):
+                return
+            await asyncio.wait_for(waiter.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._waiters.remove(waiter)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = {name: dict(info) for name, info in self.stages.items()}
+        return {
+            "job_id": self.id,
+            "source": self.source_name,
+            "campaign_id": self.campaign_id,
+            "priority": self.priority,
+            "batch_id": self.batch_id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "stages": stages,
+            "stages_done": sum(1 for info in stages.values() if info.get("status") in ("finished", "restored")),
+            "error": self.error,
+        }
+
+
+@dataclass
+class Batch:
+    """
+    Transcripts uploaded together. Each one is an ordinary job; the batch
+    only groups them for progress reporting.
+    """
+    id: str
+    job_ids: List[str]
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self, jobs: Dict[str, Job]) -> dict:
+        sessions = [jobs[job_id].to_dict() for job_id in self.job_ids if job_id in jobs]
+        counts = Counter(s["status"] for s in sessions)
+        started = [s["started_at"] for s in sessions if s["started_at"]]
+        finished = [s["finished_at"] for s in sessions if s["finished_at"]]
+        durations = [s["finished_at"] - s["started_at"] for s in sessions if s["finished_at"] and s["started_at"]]
+        done = len(finished) == len(sessions)  # jobs dropped from history had finished
+        return {
+            "batch_id": self.id,
+            "created_at": self.created_at,
+            "status": "finished" if done else "running" if started else "queued",
+            "counts": {status: counts.get(status, 0) for status in ("queued", "running", "done", "failed")},
+            # Wall time of the whole batch vs. the sum of its sessions' own run times
+            "wall_seconds": round(max(finished) - min(started), 3) if done and started else None,
+            "session_seconds": round(sum(durations), 3),
+            "sessions": sessions,
+        }
+
+
+class JobManager:
+    """
+    In-process job queue. Uploads are queued and a fixed number of workers
+    run `run_pipeline` on a thread pool, so the event loop stays free.
+    Queued jobs start in priority order (then upload order); running jobs
+    share the LLM call pool in proportion to their priority weight.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_queue: int = JOB_QUEUE_MAXSIZE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.batches: "OrderedDict[str, Batch]" = OrderedDict()
+        self._queue: asyncio.PriorityQueue | None = None
+        self._order = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+        self._executor: ThreadPoolExecutor | None = None
+
+    async def start(self) -> None:
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(
+        self,
+        transcript: str,
+        source_name: str | None = None,
+        resume: bool = False,
+        incremental: bool = False,
+        campaign_id: str | None = None,
+        priority: str = JOB_DEFAULT_PRIORITY,
+    ) -> Job:
+        return self.submit_many([(transcript, source_name)], resume, incremental, campaign_id, priority)[0]
+
+    def submit_batch(
+        self,
+        transcripts: List[tuple[str, str | None]],
+        resume: bool = False,
+        incremental: bool = False,
+        campaign_id: str | None = None,
+        priority: str = JOB_DEFAULT_PRIORITY,
+    ) -> Batch:
+        batch = Batch(id=uuid.uuid4().hex, job_ids=[])
+        jobs = self.submit_many(transcripts, resume, incremental, campaign_id, priority, batch.id)
+        batch.job_ids = [job.id for job in jobs]
+        self.batches[batch.id] = batch
+        while len(self.batches) > JOB_HISTORY_LIMIT:
+            self.batches.popitem(last=False)
+        return batch
+
+    def submit_many(
+        self,
+        transcripts: List[tuple[str, str | None]],
+        resume: bool = False,
+        incremental: bool = False,
+        campaign_id: str | None = None,
+        priority: str = JOB_DEFAULT_PRIORITY,
+        batch_id: str | None = None,
+    ) -> List[Job]:
+        """
+        Queues one job per (transcript, source name), all or none.
+        """
+        if self._queue is None:
+            raise RuntimeError("JobManager has not been started.")
+        if priority not in JOB_PRIORITIES:
+            raise ValueError(f"Unknown priority {priority!r}; expected one of {sorted(JOB_PRIORITIES)}.")
+        free = self.max_queue - self._queue.qsize()
+        if len(transcripts) > free:
+            raise QueueFullError(f"Job queue is full ({self.max_queue - free} pending, {len(transcripts)} submitted).")
+
+        loop = asyncio.get_running_loop()
+        jobs = []
+        for transcript, source_name in transcripts:
+            job = Job(
+                id=uuid.uuid4().hex,
+                source_name=source_name,
+                transcript=transcript,
+                resume=resume,
+                incremental=incremental,
+                campaign_id=campaign_id,
+                priority=priority,
+                batch_id=batch_id,
+                _loop=loop,
+            )
+            self._queue.put_nowait((-JOB_PRIORITIES[priority], next(self._order), job))
+            self.jobs[job.id] = job
+            jobs.append(job)
+
+        self._trim_history()
+        return jobs
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def get_batch(self, batch_id: str) -> Batch | None:
+        return self.batches.get(batch_id)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _trim_history(self) -> None:
+        finished = [j.id for j in self.jobs.values() if j.status in ("done", "failed")]
+        for job_id in finished[: max(0, len(self.jobs) - JOB_HISTORY_LIMIT)]:
+            del self.jobs[job_id]
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            *_, job = await self._queue.get()
+            job.set_status("running")
+            job.started_at = time.time()
+            try:
+                job.result = await loop.run_in_executor(self._executor, self._run, job)
+                job.finished_at = time.time()
+                job.set_status("done")
+            except Exception as e:
+                traceback.print_exc()
+                job.error = f"{type(e).__name__}: {e}"
+                job.finished_at = time.time()
+                job.set_status("failed")
+            finally:
+                job.transcript = None  # no need to hold the text once processed
+                self._queue.task_done()
+
+    @staticmethod
+    def _run(job: Job) -> dict:
+        # Runs on a job thread; the session tags this run's LLM pool work
+        with session(job.id, JOB_PRIORITIES[job.priority]):
+            return run_pipeline(
+                job.transcript,
+                source_name=job.source_name,
+                progress=job.on_progress,
+                resume=job.resume,
+                incremental=job.incremental,
+                campaign_id=job.campaign_id,
+                run_id=job.id,
+            )
+
+
+job_manager = JobManager()
@@ -1,14 +1,49 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+from app.config import LLM_CACHE_ENABLED
+from app.jobs import job_manager
+from app.pipeline.cache import get_response_cache
+from app.pipeline.metrics import register_gauge, render_metrics
+from app.pipeline.parallel import pending_calls
+from app.routes.batches import router as batches_router
+from app.routes.jobs import router as jobs_router
+from app.routes.runs import router as runs_router
 from app.routes.upload import router as upload_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await job_manager.start()
+    yield
+    await job_manager.stop()
+
+
 app = FastAPI(
     title="TTRPG Session Summarizer",
     description="Multi-pass GM & player-facing summarizer for TTRPG voice transcripts.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.include_router(upload_router, prefix="/api")
+app.include_router(batches_router, prefix="/api")
+app.include_router(jobs_router, prefix="/api")
+app.include_router(runs_router, prefix="/api")
+
+register_gauge("ttrpg_job_queue_depth", "Uploads waiting for a worker.", job_manager.queue_depth)
+register_gauge("ttrpg_llm_pool_pending", "Chunk-level LLM calls waiting for the shared pool.", lambda: sum(pending_calls().values()))
+if LLM_CACHE_ENABLED:
+    register_gauge("ttrpg_llm_cache_entries", "Responses in the LLM response cache.", lambda: get_response_cache().stats()["entries"])
+    register_gauge("ttrpg_llm_cache_bytes", "Size of the cached LLM responses.", lambda: get_response_cache().stats()["bytes"])
+
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
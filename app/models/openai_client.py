@@ -1,8 +1,72 @@
+import asyncio
 import os
+import threading
+from typing import Awaitable, TypeVar
+
 import openai
 
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise RuntimeError("OPENAI_API_KEY environment variable is not set.")
+from app.config import LLM_CONNECT_TIMEOUT_SECONDS, LLM_TIMEOUT_SECONDS
+
+T = TypeVar("T")
+
+# The module-level client is created on first use and reads OPENAI_API_KEY
+# then, so importing the app (and serving cached or stored results) does not
+# need a key.
+
+
+def require_api_key() -> None:
+    if not (openai.api_key or os.getenv("OPENAI_API_KEY")):
+        raise RuntimeError("OPENAI_API_KEY environment variable is not set.")
+
+
+# Point the client at an OpenAI-compatible server instead of api.openai.com,
+# e.g. the local stand-in in bench/fake_openai.py
+base_url = os.getenv("OPENAI_BASE_URL")
+if base_url:
+    openai.base_url = base_url
+
+
+# --- Async client for chat calls ---
+# Pipeline code runs on worker threads. Chat calls from all of them are
+# handed to one event loop on a background thread, which owns a single
+# AsyncOpenAI client: one HTTP connection pool, and one place where the
+# per-model rate limit buckets live (app/pipeline/ratelimit.py).
+
+_LOOP: asyncio.AbstractEventLoop | None = None
+_CLIENT: openai.AsyncOpenAI | None = None
+_LOCK = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _LOOP
+    with _LOCK:
+        if _LOOP is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="openai-loop", daemon=True).start()
+            _LOOP = loop
+        return _LOOP
+
+
+def get_async_client() -> openai.AsyncOpenAI:
+    """
+    The shared client. Retries are done by the caller (see
+    `app.pipeline.models`), so the SDK's own are off.
+    """
+    global _CLIENT
+    with _LOCK:
+        if _CLIENT is None:
+            require_api_key()
+            _CLIENT = openai.AsyncOpenAI(
+                base_url=base_url or None,
+                max_retries=0,
+                timeout=openai.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+            )
+        return _CLIENT
+
 
-openai.api_key = api_key
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Runs `coro` on the client loop and waits for it. Must not be called from
+    that loop itself.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
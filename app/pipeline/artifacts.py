@@ -0,0 +1,164 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from threading import Lock
+from typing import List
+
+from app.config import ARTIFACT_CODEC, ARTIFACT_DIR
+
+try:
+    import zstandard
+except ImportError:  # optional; gzip is always available
+    zstandard = None
+
+# Codec name -> (file suffix, Content-Encoding token)
+CODECS = {"zstd": (".json.zst", "zstd"), "gzip": (".json.gz", "gzip")}
+
+
+def _codec() -> str:
+    if ARTIFACT_CODEC == "auto":
+        return "zstd" if zstandard is not None else "gzip"
+    if ARTIFACT_CODEC == "zstd" and zstandard is None:
+        raise RuntimeError("ARTIFACT_CODEC is 'zstd' but the zstandard package is not installed")
+    return ARTIFACT_CODEC
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("artifact is zstd-compressed but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+@dataclass(frozen=True)
+class Artifact:
+    run_id: str
+    transcript_hash: str
+    source: str | None
+    digest: str  # sha256 of the uncompressed bundle; doubles as the ETag
+    codec: str
+    size: int  # compressed bytes on disk
+    created_at: float
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+class ArtifactStore:
+    """
+    Run results as compressed JSON bundles, stored by content hash under
+    ARTIFACT_DIR/<codec>/<digest[:2]>/<digest>, with a SQLite index from
+    run id and transcript hash to bundle. Bundles never change once written,
+    so the digest is a stable ETag and decoded bundles can be cached freely.
+    """
+
+    def __init__(self, root: Path = ARTIFACT_DIR):
+        root.mkdir(parents=True, exist_ok=True)
+        self.root = root
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(root / "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id          TEXT PRIMARY KEY,
+                transcript_hash TEXT NOT NULL,
+                source          TEXT,
+                digest          TEXT NOT NULL,
+                codec           TEXT NOT NULL,
+                size            INTEGER NOT NULL,
+                created_at      REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_transcript ON runs(transcript_hash, created_at);
+            """
+        )
+        self._conn.commit()
+
+    def path(self, digest: str, codec: str) -> Path:
+        return self.root / codec / digest[:2] / f"{digest}{CODECS[codec][0]}"
+
+    def save(self, run_id: str, result: dict) -> Artifact:
+        data = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        codec = _codec()
+        path = self.path(digest, codec)
+
+        if not path.exists():  # identical bundles are stored once
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(_compress(data, codec))
+            os.replace(tmp, path)
+
+        artifact = Artifact(
+            run_id=run_id,
+            transcript_hash=result.get("transcript_hash", ""),
+            source=result.get("source"),
+            digest=digest,
+            codec=codec,
+            size=path.stat().st_size,
+            created_at=time.time(),
+        )
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+                tuple(asdict(artifact).values()),
+            )
+            self._conn.commit()
+        return artifact
+
+    # --- lookups ---
+
+    def get(self, run_id: str) -> Artifact | None:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return Artifact(*row) if row else None
+
+    def runs(self, transcript_hash: str | None = None, limit: int = 50) -> List[Artifact]:
+        """
+        Most recent runs first, optionally only those of one transcript.
+        """
+        query, params = "SELECT * FROM runs", ()
+        if transcript_hash is not None:
+            query, params = query + " WHERE transcript_hash = ?", (transcript_hash,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY created_at DESC LIMIT ?", (*params, limit)).fetchall()
+        return [Artifact(*row) for row in rows]
+
+    def raw(self, artifact: Artifact) -> bytes:
+        """
+        The bundle as stored (compressed with `artifact.codec`).
+        """
+        return self.path(artifact.digest, artifact.codec).read_bytes()
+
+    def load(self, artifact: Artifact) -> dict:
+        return _load_bundle(self.path(artifact.digest, artifact.codec), artifact.codec)
+
+
+@lru_cache(maxsize=32)
+def _load_bundle(path: Path, codec: str) -> dict:
+    return json.loads(_decompress(path.read_bytes(), codec))
+
+
+_STORE: ArtifactStore | None = None
+_STORE_LOCK = Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = ArtifactStore()
+        return _STORE
@@ -0,0 +1,285 @@
+"""
+Batch API execution mode, for processing a backlog of sessions overnight.
+
+Chunk-level requests for every transcript are sent through the OpenAI Batch
+API in two rounds (analytical + narrative [+ canon], then actions [+ timeline],
+which need round-one output). Results go into the incremental chunk store, and
+each transcript then runs through `run_pipeline(incremental=True)`, which only
+makes the synthesis calls live.
+
+    python -m app.pipeline.batch session1.txt session2.vtt
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from app.config import (
+    BATCH_COMPLETION_WINDOW,
+    BATCH_DIR,
+    BATCH_MAX_FILE_BYTES,
+    BATCH_MAX_REQUESTS,
+    BATCH_POLL_SECONDS,
+    LLM_PROMPT_CACHE_KEY,
+)
+from app.pipeline.campaign import campaign_hints, load_known
+from app.pipeline.incremental import chunk_hash, get_chunk_store
+from app.pipeline.ingest import read_transcript_file
+from app.pipeline.metrics import LLM_CALLS, LLM_TOKENS
+from app.pipeline.models import ChatRequest, api_call
+from app.pipeline.profiles import CampaignProfile, get_profile
+from app.pipeline.summarizer import (
+    actions_request,
+    analytical_request,
+    canon_request,
+    chunk_namespaces,
+    narrative_request,
+    preparation_hash,
+    run_pipeline,
+    safe_json_loads,
+    timeline_request,
+    transcript_chunks,
+    use_chunked_extraction,
+)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+# --- Batch API plumbing ---
+
+def _request_line(custom_id: str, request: ChatRequest) -> str:
+    body = {
+        "model": request.model,
+        "messages": [{"role": "user", "content": request.prompt}],
+        "temperature": request.temperature,
+    }
+    if request.response_format is not None:
+        body["response_format"] = request.response_format
+    if LLM_PROMPT_CACHE_KEY:
+        body["prompt_cache_key"] = request.stage
+    return json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}, ensure_ascii=False)
+
+
+def _split(lines: List[str]) -> List[List[str]]:
+    """
+    Packs request lines into batch files within the per-file API limits.
+    """
+    parts: List[List[str]] = [[]]
+    size = 0
+    for line in lines:
+        line_bytes = len(line.encode("utf-8")) + 1
+        if parts[-1] and (len(parts[-1]) >= BATCH_MAX_REQUESTS or size + line_bytes > BATCH_MAX_FILE_BYTES):
+            parts.append([])
+            size = 0
+        parts[-1].append(line)
+        size += line_bytes
+    return [p for p in parts if p]
+
+
+def execute_batch(
+    requests: Dict[str, ChatRequest],
+    label: str,
+    poll_seconds: float = BATCH_POLL_SECONDS,
+) -> Dict[str, str]:
+    """
+    Sends `requests` (custom_id -> request) through the Batch API and waits
+    for them. Returns custom_id -> response text for the requests that
+    succeeded; failed or expired ones are simply missing.
+    Input and output JSONL files are kept under BATCH_DIR.
+    """
+    if not requests:
+        return {}
+
+    BATCH_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+
+    batch_ids = []
+    for n, part in enumerate(_split([_request_line(cid, req) for cid, req in requests.items()])):
+        path = BATCH_DIR / f"{stamp}_{label}_{n}_input.jsonl"
+        path.write_text("\n".join(part) + "\n", encoding="utf-8")
+        data = path.read_bytes()  # re-sent as a whole on a retry
+        uploaded = api_call("files.create", lambda c: c.files.create(file=(path.name, data), purpose="batch"))
+        batch = api_call("batches.create", lambda c: c.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=BATCH_COMPLETION_WINDOW,
+            metadata={"label": label},
+        ))
+        batch_ids.append(batch.id)
+
+    results: Dict[str, str] = {}
+    pending = list(batch_ids)
+    while pending:
+        time.sleep(poll_seconds)
+        still_pending = []
+        for batch_id in pending:
+            batch = api_call("batches.retrieve", lambda c: c.batches.retrieve(batch_id))
+            if batch.status not in TERMINAL_STATUSES:
+                still_pending.append(batch_id)
+                continue
+            if batch.status != "completed":
+                print(f"Batch {batch_id} ended as {batch.status}; its requests will run live.")
+            if batch.output_file_id:
+                results.update(_read_output(batch.output_file_id, f"{stamp}_{label}_{batch_id}_output.jsonl", requests))
+        pending = still_pending
+
+    return results
+
+
+def _read_output(file_id: str, name: str, requests: Dict[str, ChatRequest]) -> Dict[str, str]:
+    text = api_call("files.content", lambda c: c.files.content(file_id)).text
+    (BATCH_DIR / name).write_text(text, encoding="utf-8")
+
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        response = row.get("response") or {}
+        request = requests.get(row.get("custom_id"))
+        if request is None or row.get("error") or response.get("status_code") != 200:
+            continue
+
+        body = response.get("body") or {}
+        content = body["choices"][0]["message"]["content"]
+        usage = body.get("usage") or {}
+        LLM_CALLS.inc(stage=request.stage, model=request.model, cache="batch")
+        LLM_TOKENS.inc(usage.get("prompt_tokens", 0), stage=request.stage, model=request.model, type="prompt")
+        LLM_TOKENS.inc(usage.get("completion_tokens", 0), stage=request.stage, model=request.model, type="completion")
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        LLM_TOKENS.inc(cached, stage=request.stage, model=request.model, type="cached_prompt")
+        if content:
+            results[row["custom_id"]] = content
+    return results
+
+
+# --- Pipeline integration ---
+
+def prefill_chunk_outputs(
+    transcripts: List[str],
+    poll_seconds: float = BATCH_POLL_SECONDS,
+    known: dict | None = None,
+    profile: CampaignProfile | None = None,
+) -> Dict[str, int]:
+    """
+    Computes every chunk-level output missing from the chunk store via the
+    Batch API. Identical chunks across transcripts are requested once.
+    `known` and `profile` are the campaign snapshot and profile the pipeline
+    runs will use.
+    Returns how many outputs of each kind were stored.
+    """
+    store = get_chunk_store()
+    profile = profile or get_profile()
+    hints = campaign_hints(known)
+    namespaces = chunk_namespaces(profile, hints)
+    preparation = preparation_hash(profile)
+
+    def key(digest: str, kind: str) -> str:
+        # the store key the pipeline's ChunkReuse looks up for this chunk
+        return chunk_hash(chunks[digest][0], namespaces[kind])
+
+    # chunk hash -> (chunk text, needs chunked canon/timeline)
+    chunks: Dict[str, Tuple[str, bool]] = {}
+    for transcript in transcripts:
+        # chunked as the incremental run will: after any prefix it extends
+        prefix = store.find_prefix(transcript, preparation)
+        prepared_chunks = transcript_chunks(transcript, known, profile, prefix)
+        chunked_extraction = use_chunked_extraction(prepared_chunks)
+        for chunk in prepared_chunks:
+            digest = chunk_hash(chunk)
+            previous = chunks.get(digest, (chunk, False))
+            chunks[digest] = (chunk, previous[1] or chunked_extraction)
+
+    first: Dict[str, ChatRequest] = {}
+    for digest, (chunk, chunked_extraction) in chunks.items():
+        if store.get(key(digest, "analytical"), "analytical") is None:
+            first[f"analytical:{digest}"] = analytical_request(chunk)
+        if store.get(key(digest, "story"), "story") is None:
+            first[f"narrative:{digest}"] = narrative_request(chunk)
+        if chunked_extraction and store.get(key(digest, "canon_timeline"), "canon_timeline") is None:
+            first[f"canon:{digest}"] = canon_request(chunk, hints, profile)
+
+    round_one = execute_batch(first, "chunks", poll_seconds)
+
+    stored = {"analytical": 0, "story": 0, "canon_timeline": 0}
+    second: Dict[str, ChatRequest] = {}
+    canons: Dict[str, dict] = {}
+    for custom_id, content in round_one.items():
+        kind, digest = custom_id.split(":", 1)
+        chunk = chunks[digest][0]
+        if kind == "analytical":
+            store.put(key(digest, "analytical"), "analytical", content)
+            stored["analytical"] += 1
+        elif kind == "narrative":
+            second[f"actions:{digest}"] = actions_request(content)
+        elif kind == "canon":
+            try:
+                canons[digest] = safe_json_loads(content)
+            except ValueError:
+                continue  # left for the live run
+            second[f"timeline:{digest}"] = timeline_request(chunk, canons[digest])
+
+    round_two = execute_batch(second, "followups", poll_seconds)
+
+    for custom_id, content in round_two.items():
+        kind, digest = custom_id.split(":", 1)
+        if kind == "actions":
+            store.put(key(digest, "story"), "story", [round_one[f"narrative:{digest}"], content])
+            stored["story"] += 1
+        elif kind == "timeline":
+            try:
+                timeline = safe_json_loads(content)
+            except ValueError:
+                continue
+            store.put(key(digest, "canon_timeline"), "canon_timeline", [canons[digest], timeline])
+            stored["canon_timeline"] += 1
+
+    return stored
+
+
+def run_batch(
+    transcripts: List[Tuple[str, str | None]],
+    poll_seconds: float = BATCH_POLL_SECONDS,
+    campaign_id: str | None = None,
+) -> List[Dict]:
+    """
+    Batch execution mode for `run_pipeline`: (transcript, source name) pairs
+    in, one result per transcript out. Chunk work goes through the Batch API;
+    anything the batch could not produce is computed live by the pipeline.
+
+    All transcripts use the campaign snapshot and profile taken before the
+    batch, so the chunks the pipeline sees match the ones that were batched.
+    """
+    known = load_known(campaign_id)
+    profile = get_profile(campaign_id)
+    prefill_chunk_outputs([text for text, _ in transcripts], poll_seconds, known, profile)
+    return [
+        run_pipeline(
+            text,
+            source_name=source,
+            incremental=True,
+            campaign_id=campaign_id,
+            known=known,
+            profile=profile,
+        )
+        for text, source in transcripts
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", type=Path)
+    parser.add_argument("--poll", type=float, default=BATCH_POLL_SECONDS, help="seconds between status checks")
+    parser.add_argument("--campaign", default=None, help="campaign id for the campaign entity store")
+    args = parser.parse_args()
+
+    results = run_batch([(read_transcript_file(path), path.name) for path in args.files], args.poll, args.campaign)
+    for path, result in zip(args.files, results):
+        print(f"{path.name}: {result['chunk_count']} chunks, reused {result['incremental']['reused']}")
+
+
+if __name__ == "__main__":
+    main()
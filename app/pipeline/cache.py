@@ -0,0 +1,133 @@
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+
+from app.config import (
+    LLM_CACHE_MAX_AGE_DAYS,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_PATH,
+)
+from app.pipeline.metrics import LLM_CACHE_LOOKUPS
+
+# Run eviction every N writes rather than on every put
+_EVICT_EVERY = 50
+
+
+def cache_key(model: str, prompt: str, temperature: float, response_format: dict | None = None) -> str:
+    parts = [model, round(float(temperature), 4), prompt]
+    if response_format is not None:
+        parts.append(response_format)
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Content-addressed store of LLM responses, keyed on (model, prompt, temperature).
+    Entries are evicted least-recently-used once the store grows past
+    `max_bytes`, and unconditionally once older than `max_age_days`.
+    """
+
+    def __init__(
+        self,
+        path: Path = LLM_CACHE_PATH,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        max_age_days: float = LLM_CACHE_MAX_AGE_DAYS,
+    ):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_days * 86400
+        self._writes = 0
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key        TEXT PRIMARY KEY,
+                model      TEXT NOT NULL,
+                response   TEXT NOT NULL,
+                size       INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used  REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+
+    def get(self, key: str, stage: str | None = None) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                LLM_CACHE_LOOKUPS.inc(stage=stage or "unknown", result="miss")
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        LLM_CACHE_LOOKUPS.inc(stage=stage or "unknown", result="hit")
+        return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict_locked(now)
+
+    def evict(self) -> None:
+        with self._lock:
+            self._evict_locked(time.time())
+
+    def _evict_locked(self, now: float) -> None:
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age_seconds,))
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            # Drop least recently used entries until we are back under budget
+            excess = total - self.max_bytes
+            doomed = []
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used ASC"):
+                doomed.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+        self._conn.commit()
+
+    def stats(self) -> dict:
+        """
+        Size of the store, exported as gauges on /metrics (hits and misses
+        are counted in ttrpg_llm_cache_lookups_total).
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+            return {"entries": entries, "bytes": size}
+
+
+_CACHE: ResponseCache | None = None
+_CACHE_LOCK = Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _CACHE
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResponseCache()
+        return _CACHE
@@ -0,0 +1,179 @@
+import json
+import sqlite3
+import time
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, List
+
+from app.config import CAMPAIGN_HINT_LIMIT, CAMPAIGN_STORE_PATH
+from app.pipeline.merge import entity_key, merge_canon
+from app.pipeline.profiles import get_profile
+
+# Canon categories; used as the `kind` column
+KINDS = ("characters", "npcs", "locations", "items", "creatures")
+
+
+def _empty_canon() -> dict:
+    return {"characters": {}, "npcs": {}, "locations": [], "items": [], "creatures": []}
+
+
+def _add_entry(canon: dict, kind: str, name: str, aliases: List[str], pronouns: str) -> None:
+    if kind == "characters":
+        canon[kind][name] = {"aliases": aliases, "pronouns": pronouns}
+    elif kind == "npcs":
+        canon[kind][name] = aliases
+    else:
+        canon[kind].append(name)
+
+
+def _rows_to_canon(rows, limit: int | None = None) -> dict:
+    canon = _empty_canon()
+    for kind, name, aliases, pronouns in rows:
+        if limit is None or len(canon[kind]) < limit:
+            _add_entry(canon, kind, name, json.loads(aliases), pronouns)
+    return canon
+
+
+def _canon_entries(canon: dict) -> List[tuple[str, str, List[str], str]]:
+    """
+    (kind, name, aliases, pronouns) for every entity in a canon dict as
+    produced by `merge_canon`.
+    """
+    out = []
+    for name, data in (canon.get("characters") or {}).items():
+        out.append(("characters", name, data.get("aliases") or [], data.get("pronouns") or ""))
+    for name, aliases in (canon.get("npcs") or {}).items():
+        out.append(("npcs", name, aliases or [], ""))
+    for kind in ("locations", "items", "creatures"):
+        for name in canon.get(kind) or []:
+            out.append((kind, name, [], ""))
+    return out
+
+
+class CampaignStore:
+    """
+    Entities seen across a campaign's sessions, with their aliases.
+    Updated from each run's canon; read back as hints for the next run.
+    """
+
+    def __init__(self, path: Path = CAMPAIGN_STORE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entities (
+                campaign_id TEXT NOT NULL,
+                kind        TEXT NOT NULL,
+                name        TEXT NOT NULL,
+                aliases     TEXT NOT NULL,
+                pronouns    TEXT NOT NULL DEFAULT '',
+                sessions    INTEGER NOT NULL,
+                first_seen  REAL NOT NULL,
+                last_seen   REAL NOT NULL,
+                PRIMARY KEY (campaign_id, kind, name)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def known(self, campaign_id: str, limit: int | None = None) -> dict:
+        """
+        The campaign's entities in canon format, most recently seen first.
+        `limit` caps the number of entities per category.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, name, aliases, pronouns FROM entities WHERE campaign_id = ? "
+                "ORDER BY last_seen DESC, sessions DESC, name",
+                (campaign_id,),
+            ).fetchall()
+        return _rows_to_canon(rows, limit)
+
+    def update(self, campaign_id: str, canon: dict) -> None:
+        """
+        Folds one session's canon into the campaign. Entities are matched to
+        known ones by name and alias (see `merge_canon`); known names win ties.
+        """
+        character_names = get_profile(campaign_id).character_names
+        canon = merge_canon([canon], character_names)
+        seen = {entity_key(s) for _, name, aliases, _ in _canon_entries(canon) for s in [name, *aliases]}
+        now = time.time()
+
+        with self._lock:
+            stats = {
+                (kind, name): (sessions, first_seen, last_seen)
+                for kind, name, sessions, first_seen, last_seen in self._conn.execute(
+                    "SELECT kind, name, sessions, first_seen, last_seen FROM entities WHERE campaign_id = ?",
+                    (campaign_id,),
+                )
+            }
+            known = _rows_to_canon(self._conn.execute(
+                "SELECT kind, name, aliases, pronouns FROM entities WHERE campaign_id = ? ORDER BY first_seen, name",
+                (campaign_id,),
+            ))
+            merged = merge_canon([known, canon], character_names)
+
+            entity_rows = []
+            for kind, name, aliases, pronouns in _canon_entries(merged):
+                sessions, first_seen, last_seen = stats.get((kind, name), (0, now, now))
+                if any(entity_key(s) in seen for s in [name, *aliases]):
+                    sessions, last_seen = sessions + 1, now
+                entity_rows.append(
+                    (campaign_id, kind, name, json.dumps(aliases, ensure_ascii=False), pronouns, sessions, first_seen, last_seen)
+                )
+
+            with self._conn:
+                self._conn.execute("DELETE FROM entities WHERE campaign_id = ?", (campaign_id,))
+                self._conn.executemany("INSERT INTO entities VALUES (?, ?, ?, ?, ?, ?, ?, ?)", entity_rows)
+
+
+# --- Using known entities in a run ---
+
+def campaign_hints(known: dict | None) -> str:
+    """
+    Compact JSON of known NPCs, locations, items and creatures for the canon
+    prompt. Player characters are left out; they come from characters.json.
+    """
+    if not known:
+        return "{}"
+    hints = {kind: known.get(kind) for kind in KINDS if kind != "characters" and known.get(kind)}
+    return json.dumps(hints, ensure_ascii=False, separators=(",", ":"))
+
+
+def enrich_canon(canon: dict, known: dict | None, character_names: Iterable[str] | None = None) -> dict:
+    """
+    Adds what the campaign already knows (aliases, canonical spelling) to the
+    entities this session's canon mentions. Entities the session does not
+    mention are not added.
+    """
+    if not known:
+        return canon
+
+    canon = merge_canon([canon], character_names)
+    mentioned = {entity_key(s) for _, name, aliases, _ in _canon_entries(canon) for s in [name, *aliases]}
+    relevant = _empty_canon()
+    for kind, name, aliases, pronouns in _canon_entries(known):
+        if any(entity_key(s) in mentioned for s in [name, *aliases]):
+            _add_entry(relevant, kind, name, aliases, pronouns)
+
+    return merge_canon([relevant, canon], character_names)
+
+
+def load_known(campaign_id: str | None) -> Dict | None:
+    if not campaign_id:
+        return None
+    return get_campaign_store().known(campaign_id, limit=CAMPAIGN_HINT_LIMIT)
+
+
+_STORE: CampaignStore | None = None
+_STORE_LOCK = Lock()
+
+
+def get_campaign_store() -> CampaignStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = CampaignStore()
+        return _STORE
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any
+
+from app.config import CHECKPOINT_DIR
+
+
+def transcript_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def options_hash(options: Any) -> str:
+    """
+    Short stable hash of JSON-able run options (models, prompt hashes,
+    profile, ...), for keys that must change whenever the outputs would.
+    """
+    blob = json.dumps(options, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+class CheckpointStore:
+    """
+    One JSON file per completed stage, under CHECKPOINT_DIR/<key>/<run id>/.
+    The key is the transcript hash plus the hash of the run options, so a
+    resumed run only picks up stages produced for the same transcript,
+    campaign and configuration; each run writes its own directory, so runs
+    on the same transcript never see (or clear) each other's files.
+    Values round-trip through JSON, so tuples come back as lists.
+    """
+
+    def __init__(self, key: str, run_id: str, root: Path = CHECKPOINT_DIR):
+        self.key = key
+        self.run_id = run_id
+        self.dir = root / key / run_id
+        self.resumed_from: Path | None = None
+
+    def _path(self, stage: str) -> Path:
+        return self.dir / f"{stage}.json"
+
+    def has(self, stage: str) -> bool:
+        return self._path(stage).exists()
+
+    def load(self, stage: str) -> Any:
+        return json.loads(self._path(stage).read_text(encoding="utf-8"))
+
+    def save(self, stage: str, value: Any) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(stage)
+        tmp = path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(value, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)  # never leave a half-written checkpoint behind
+
+    def completed(self) -> list[str]:
+        if not self.dir.exists():
+            return []
+        return sorted(p.stem for p in self.dir.glob("*.json"))
+
+    def resume_latest(self) -> list[str]:
+        """
+        Copies the checkpoints of the most recent earlier run with the same
+        key into this run's directory; returns the stages found.
+        """
+        runs = [d for d in self.dir.parent.glob("*") if d.is_dir() and d != self.dir and any(d.glob("*.json"))]
+        if not runs:
+            return []
+        latest = max(runs, key=lambda d: d.stat().st_mtime)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        for path in latest.glob("*.json"):
+            shutil.copy2(path, self.dir / path.name)
+        self.resumed_from = latest
+        return self.completed()
+
+    def clear(self) -> None:
+        """
+        Removes this run's checkpoints, and those of the run it resumed
+        from, which this run has now completed.
+        """
+        for directory in (self.dir, self.resumed_from):
+            if directory is not None:
+                shutil.rmtree(directory, ignore_errors=True)
+        try:
+            self.dir.parent.rmdir()  # only once no other run uses the key
+        except OSError:
+            pass
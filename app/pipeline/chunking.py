@@ -1,8 +1,23 @@
+import re
+from functools import lru_cache
 from typing import List
+
+import numpy as np
 import tiktoken
-from app.config import MODEL_ANALYTICAL, MAX_CHUNK_TOKENS
+from app.config import (
+    CHUNK_OVERLAP_TOKENS,
+    CHUNK_SCENE_GAP_SECONDS,
+    CHUNK_STRATEGY,
+    MODEL_ANALYTICAL,
+    MAX_CHUNK_TOKENS,
+)
+from app.pipeline.metrics import timed
+
+# "[hh:mm:ss]" at the start of a transcript line (see app/pipeline/ingest.py)
+STAMP_RE = re.compile(r"^\s*\[(\d{1,2}):(\d{2}):(\d{2})\]")
 
 
+@lru_cache(maxsize=None)
 def _get_encoder(model: str):
     try:
         return tiktoken.encoding_for_model(model)
@@ -11,18 +26,169 @@ def _get_encoder(model: str):
 
 
 def count_tokens(text: str, model: str = MODEL_ANALYTICAL) -> int:
-    enc = _get_encoder(model)
-    return len(enc.encode(text))
+    """
+    For prompts and other short texts. Whole transcripts go through
+    `tokenize`, which keeps the encoding for the other stages.
+    """
+    return len(_get_encoder(model).encode_ordinary(text))
+
+
+class TokenizedTranscript:
+    """
+    A text encoded once: token ids (uint32) and, per token, the character
+    offset where it starts. Token counts, spans and chunk boundaries are
+    read from these arrays, and chunks are sliced from the original text
+    rather than decoded. A multi-byte character split across two tokens
+    belongs to the token it starts in.
+    """
+
+    __slots__ = ("text", "model", "tokens", "offsets")
+
+    def __init__(self, text: str, model: str = MODEL_ANALYTICAL):
+        enc = _get_encoder(model)
+        ids = enc.encode_ordinary(text)
+        self.text = text
+        self.model = model
+        self.tokens = np.array(ids, dtype=np.uint32)
+        self.offsets = self._char_offsets(enc, ids, text)
+
+    @staticmethod
+    def _char_offsets(enc, ids: List[int], text: str) -> np.ndarray:
+        lengths = np.fromiter((len(b) for b in enc.decode_tokens_bytes(ids)), dtype=np.int64, count=len(ids))
+        byte_starts = np.zeros(len(ids), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=byte_starts[1:])
+
+        data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        if len(data) == len(text):  # ASCII: bytes and characters line up
+            return byte_starts.astype(np.uint32)
+        # Character index of every byte: count the non-continuation bytes
+        char_of_byte = np.cumsum((data & 0xC0) != 0x80) - 1
+        return char_of_byte[byte_starts].astype(np.uint32)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def char_offset(self, token: int) -> int:
+        """
+        Character offset of token `token`; len(self) maps to the end of the text.
+        """
+        return len(self.text) if token >= len(self.tokens) else int(self.offsets[token])
+
+    def token_at(self, char: int) -> int:
+        """
+        Index of the token containing character offset `char`.
+        """
+        return max(0, int(np.searchsorted(self.offsets, char, side="right")) - 1)
+
+    def text_between(self, start: int, end: int) -> str:
+        return self.text[self.char_offset(start):self.char_offset(end)]
+
+    def turn_bounds(self, scene_gap: float = CHUNK_SCENE_GAP_SECONDS) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Token indexes where a line (a speaker turn) starts, and the subset
+        where a scene starts: after a blank line, or where the timestamps
+        jump by at least `scene_gap` seconds. Both include 0 and len(self).
+        """
+        starts, scenes = [], []
+        char, previous, blank = 0, None, False
+        for line in self.text.split("\n"):
+            if line.strip():
+                m = STAMP_RE.match(line)
+                stamp = int(m[1]) * 3600 + int(m[2]) * 60 + int(m[3]) if m else None
+                gap = stamp is not None and previous is not None and stamp - previous >= scene_gap
+                if blank or gap:
+                    scenes.append(char)
+                starts.append(char)
+                previous = stamp if stamp is not None else previous
+                blank = False
+            else:
+                blank = bool(starts)
+            char += len(line) + 1
+
+        # Each line starts at the token containing its first character
+        def to_tokens(chars: List[int]) -> np.ndarray:
+            tokens = np.searchsorted(self.offsets, np.array(chars, dtype=np.int64), side="right") - 1
+            return np.unique(np.concatenate(([0], tokens, [len(self)])))
+
+        return to_tokens(starts), to_tokens(scenes)
+
+    def chunk_bounds(
+        self,
+        max_tokens: int,
+        overlap_tokens: int = 0,
+        strategy: str = CHUNK_STRATEGY,
+    ) -> List[tuple[int, int]]:
+        """
+        Token spans of the chunks. "tokens" cuts every `max_tokens`; "turns"
+        packs whole turns up to `max_tokens`, ending at a scene break instead
+        when one falls in the second half of the chunk. A turn longer than a
+        chunk is cut by tokens. Each chunk after the first starts with up to
+        `overlap_tokens` of the previous one (whole turns for "turns", unless
+        the previous chunk ended in a hard cut) and always ends past it.
+        """
+        if strategy not in ("tokens", "turns"):
+            raise ValueError(f"Unknown CHUNK_STRATEGY: {strategy!r}")
+        overlap = max(0, min(overlap_tokens, max_tokens // 2))
+        total = len(self)
+        if strategy == "tokens":
+            last = max(total - overlap, 1) if total else 0
+            return [(i, min(i + max_tokens, total)) for i in range(0, last, max_tokens - overlap)]
+
+        turns, scenes = self.turn_bounds()
+        bounds: List[tuple[int, int]] = []
+        start, done = 0, 0  # `done`: end of the previous chunk; every chunk ends past it
+        while done < total:
+            limit = start + max_tokens
+            if limit >= total:
+                bounds.append((start, total))
+                break
+            # Last turn boundary that fits, preferring a scene break past the halfway point
+            end = int(turns[np.searchsorted(turns, limit, side="right") - 1])
+            scene = int(scenes[np.searchsorted(scenes, end, side="right") - 1])
+            if scene > max(start + max_tokens // 2, done):
+                end = scene
+            hard_cut = end <= done  # no turn boundary past the previous chunk fits
+            if hard_cut:
+                next_turn = int(turns[np.searchsorted(turns, done, side="right")])
+                if start < done and next_turn <= done + max_tokens:
+                    # The overlap leaves no room for the next whole turn: go without it
+                    start = done
+                    continue
+                end = limit  # a single turn longer than a chunk
+            bounds.append((start, end))
+            done = end
+
+            # Overlap only extends the next chunk backwards: to the first turn
+            # boundary within `overlap` of the end, or by tokens after a hard cut
+            back = int(turns[np.searchsorted(turns, end - overlap, side="left")])
+            start = end - overlap if hard_cut else min(back, end)
+        return bounds
+
+    def chunks(
+        self,
+        max_tokens: int = MAX_CHUNK_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        strategy: str = CHUNK_STRATEGY,
+    ) -> List[str]:
+        return [self.text_between(start, end) for start, end in self.chunk_bounds(max_tokens, overlap_tokens, strategy)]
 
 
-def chunk_text(text: str, max_tokens: int = MAX_CHUNK_TOKENS, model: str = MODEL_ANALYTICAL) -> List[str]:
-    enc = _get_encoder(model)
-    tokens = enc.encode(text)
-    chunks = []
+@lru_cache(maxsize=1)
+def tokenize(text: str, model: str = MODEL_ANALYTICAL) -> TokenizedTranscript:
+    """
+    Shared `TokenizedTranscript` for a transcript-sized text, so compaction's
+    token count and the chunker that follows it encode the text once. Only
+    the latest text is kept, so finished transcripts are not held in memory.
+    """
+    return TokenizedTranscript(text, model)
 
-    for i in range(0, len(tokens), max_tokens):
-        chunk_tokens = tokens[i:i + max_tokens]
-        chunk_text = enc.decode(chunk_tokens)
-        chunks.append(chunk_text)
 
-    return chunks
+@timed("chunk_text")
+def chunk_text(
+    text: str,
+    max_tokens: int = MAX_CHUNK_TOKENS,
+    model: str = MODEL_ANALYTICAL,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    strategy: str = CHUNK_STRATEGY,
+) -> List[str]:
+    return tokenize(text, model).chunks(max_tokens, overlap_tokens, strategy)
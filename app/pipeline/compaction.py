@@ -0,0 +1,152 @@
+import re
+from dataclasses import dataclass
+from typing import List
+
+from app.config import (
+    COMPACTION_BACKCHANNELS,
+    COMPACTION_DISCOURSE_FILLERS,
+    COMPACTION_DISFLUENCIES,
+    COMPACTION_KEEP_LINE_MAP,
+    COMPACTION_MAX_REPEAT_WORDS,
+    COMPACTION_OOC_PATTERNS,
+    COMPACTION_STUTTER_WORDS,
+)
+from app.pipeline.chunking import tokenize
+from app.pipeline.metrics import timed
+
+# "[hh:mm:ss] Speaker: text", with the timestamp and speaker both optional
+LINE_RE = re.compile(
+    r"^(?P<stamp>\[\d{1,2}:\d{2}:\d{2}\]\s*)?(?:(?P<speaker>[A-Z][\w'-]*(?: [A-Z][\w'-]*){0,2}):\s+)?(?P<text>.*)$"
+)
+
+
+def _alternation(words: List[str]) -> str:
+    return "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+
+
+# "um", "uhh" anywhere, with any trailing comma
+DISFLUENCY_RE = re.compile(rf"(?<![\w'-])(?:{_alternation(COMPACTION_DISFLUENCIES)})(?![\w'-])[,.]?\s*", re.I)
+
+# "like", "you know" only when set off as a filler: at the start of an
+# utterance or after a comma, and followed by a comma or the end
+DISCOURSE_RE = re.compile(rf"(^|,\s*)(?:{_alternation(COMPACTION_DISCOURSE_FILLERS)})(?:,\s*|\s*$)", re.I)
+
+# ASR stutter: the same 1..N words repeated back to back ("the the", "I think I think");
+# collapsed only when the phrase starts with a COMPACTION_STUTTER_WORDS word
+REPEAT_RE = re.compile(rf"\b(\w+(?:[ ']\w+){{0,{COMPACTION_MAX_REPEAT_WORDS - 1}}})(?:\s+\1\b)+", re.I)
+STUTTER_WORDS = {w.lower() for w in COMPACTION_STUTTER_WORDS}
+
+OOC_RE = re.compile("|".join(f"(?:{p})" for p in COMPACTION_OOC_PATTERNS), re.I) if COMPACTION_OOC_PATTERNS else None
+
+BACKCHANNELS = {b.lower() for b in COMPACTION_BACKCHANNELS}
+
+
+@dataclass
+class _Line:
+    stamp: str
+    speaker: str | None
+    text: str
+    first: int  # source line numbers (0-based) this line was built from
+    last: int
+
+    def format(self) -> str:
+        prefix = f"{self.speaker}: " if self.speaker else ""
+        return f"{self.stamp}{prefix}{self.text}"
+
+
+def _collapse_stutter(m: re.Match) -> str:
+    first = m.group(1).split()[0].lower()
+    return m.group(1) if first in STUTTER_WORDS else m.group(0)
+
+
+def clean_utterance(text: str) -> str:
+    text = DISFLUENCY_RE.sub("", text)
+    text = DISCOURSE_RE.sub(lambda m: m.group(1), text)
+    text = REPEAT_RE.sub(_collapse_stutter, text)
+    text = re.sub(r"\s+([,.!?])", r"\1", text)
+    text = re.sub(r"\s{2,}", " ", text)
+    return text.strip().lstrip(",. ").rstrip(", ")
+
+
+def _is_noise(text: str) -> bool:
+    if not text:
+        return True
+    return OOC_RE is not None and bool(OOC_RE.search(text))
+
+
+def _is_backchannel(line: _Line) -> bool:
+    return line.text.lower().strip(".!?, ") in BACKCHANNELS
+
+
+def _interrupts(lines: List[_Line], i: int) -> bool:
+    """
+    Whether backchannel line `i` (and any backchannels next to it) sits
+    between two lines of one other speaker, the first not a question: crosstalk
+    rather than an answer.
+    """
+    def neighbour(step: int) -> _Line | None:
+        j = i + step
+        while 0 <= j < len(lines) and lines[j].text and _is_backchannel(lines[j]):
+            j += step
+        if 0 <= j < len(lines) and lines[j].text:
+            return lines[j]
+        return None  # start, end or scene break
+
+    before, after, speaker = neighbour(-1), neighbour(1), lines[i].speaker
+    if before is None or after is None or not speaker or not before.speaker:
+        return False
+    return before.speaker == after.speaker != speaker and not before.text.endswith("?")
+
+
+@timed("compact_transcript")
+def compact_transcript(transcript: str, keep_line_map: bool = COMPACTION_KEEP_LINE_MAP) -> tuple[str, dict]:
+    """
+    Deterministic token diet run before any LLM stage: strips filler words and
+    ASR stutters, drops out-of-character lines and backchannels that interrupt
+    another speaker, and merges consecutive lines from the same speaker.
+    Blank lines are kept (collapsed to one) as scene breaks for the chunker.
+
+    Returns (compacted text, report). With `keep_line_map`, the report's
+    "line_map" gives, per output line, the [first, last] source line numbers
+    it was built from.
+    """
+    source_lines = transcript.splitlines()
+
+    # Cleaned lines; a blank line (scene break) has empty text
+    lines: List[_Line] = []
+    for number, raw in enumerate(source_lines):
+        if not raw.strip():
+            lines.append(_Line("", None, "", number, number))
+            continue
+        m = LINE_RE.match(raw.strip())
+        if m is None:
+            continue
+        text = clean_utterance(m.group("text"))
+        if not _is_noise(text):
+            lines.append(_Line(m.group("stamp") or "", m.group("speaker"), text, number, number))
+
+    out: List[_Line] = []
+    for i, line in enumerate(lines):
+        if not line.text:
+            if out and out[-1].text:
+                out.append(line)
+            continue
+        if _is_backchannel(line) and _interrupts(lines, i):
+            continue
+        if out and line.speaker and out[-1].speaker == line.speaker:
+            out[-1].text = f"{out[-1].text} {line.text}"
+            out[-1].last = line.last
+            continue
+        out.append(line)
+    if out and not out[-1].text:
+        out.pop()
+
+    compacted = "\n".join(line.format() for line in out)
+    report = {
+        "lines_before": len(source_lines),
+        "lines_after": len(out),
+        "tokens_before": len(tokenize(transcript)),
+        "tokens_after": len(tokenize(compacted)),  # the chunker reuses this encoding
+        "line_map": [[line.first, line.last] for line in out] if keep_line_map else None,
+    }
+    return compacted, report
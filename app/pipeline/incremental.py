@@ -0,0 +1,215 @@
+import hashlib
+import json
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict
+
+from app.config import CHUNK_STORE_PATH
+
+
+def chunk_hash(chunk: str, namespace: str = "") -> str:
+    """
+    Key of a chunk's outputs; `namespace` identifies what else they depend
+    on (see `chunk_namespaces` in app/pipeline/summarizer.py).
+    """
+    data = chunk.encode("utf-8")
+    if namespace:
+        data = namespace.encode("utf-8") + b"\0" + data
+    return hashlib.sha256(data).hexdigest()
+
+
+class ChunkStore:
+    """
+    Chunk-level outputs (analytical summary, digest + action log) keyed by
+    the hash of the chunk text and its namespace, plus an index of processed transcripts so an
+    upload can be recognised as an extension of an earlier one.
+
+    Each indexed transcript keeps what its run prepared (location map,
+    normalized text, chunks) and the hash of the settings that preparation
+    depends on, so an extension can reuse the prefix exactly as it was chunked.
+    """
+
+    def __init__(self, path: Path = CHUNK_STORE_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_outputs (
+                chunk_hash TEXT NOT NULL,
+                kind       TEXT NOT NULL,
+                value      TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (chunk_hash, kind)
+            );
+            CREATE TABLE IF NOT EXISTS transcripts (
+                transcript_hash TEXT PRIMARY KEY,
+                length          INTEGER NOT NULL,
+                source          TEXT,
+                chunk_count     INTEGER NOT NULL,
+                created_at      REAL NOT NULL,
+                preparation     TEXT NOT NULL DEFAULT '',
+                prepared        TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_transcripts_length ON transcripts(length);
+            """
+        )
+        # stores created before `preparation`/`prepared` existed
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(transcripts)")}
+        if "prepared" not in columns:
+            self._conn.execute("ALTER TABLE transcripts ADD COLUMN preparation TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("ALTER TABLE transcripts ADD COLUMN prepared TEXT")
+        self._conn.commit()
+
+    # --- chunk outputs ---
+
+    def get(self, digest: str, kind: str) -> Any | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM chunk_outputs WHERE chunk_hash = ? AND kind = ?", (digest, kind)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, digest: str, kind: str, value: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO chunk_outputs (chunk_hash, kind, value, created_at) VALUES (?, ?, ?, ?)",
+                (digest, kind, json.dumps(value, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+
+    # --- transcript index ---
+
+    def record_transcript(
+        self,
+        transcript: str,
+        transcript_hash: str,
+        source: str | None,
+        chunk_count: int,
+        preparation: str = "",
+        prepared: dict | None = None,
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transcripts "
+                "(transcript_hash, length, source, chunk_count, created_at, preparation, prepared) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    transcript_hash,
+                    len(transcript),
+                    source,
+                    chunk_count,
+                    time.time(),
+                    preparation,
+                    json.dumps(prepared, ensure_ascii=False) if prepared is not None else None,
+                ),
+            )
+            self._conn.commit()
+
+    def find_prefix(self, transcript: str, preparation: str = "") -> dict | None:
+        """
+        Longest previously processed transcript that `transcript` starts with,
+        among those prepared under the same `preparation` hash. The prefix
+        hashes for all stored lengths come from one pass over the transcript,
+        so the cost is one hash of it however many transcripts are stored.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT transcript_hash, length, source, chunk_count FROM transcripts "
+                "WHERE length < ? AND preparation = ? AND prepared IS NOT NULL",
+                (len(transcript), preparation),
+            ).fetchall()
+
+        by_length: Dict[int, Dict[str, tuple]] = {}
+        for digest, length, source, chunk_count in rows:
+            by_length.setdefault(length, {})[digest] = (source, chunk_count)
+
+        found = None
+        hasher, position = hashlib.sha256(), 0
+        for length in sorted(by_length):
+            hasher.update(transcript[position:length].encode("utf-8"))
+            position = length
+            digest = hasher.copy().hexdigest()
+            if digest in by_length[length]:
+                source, chunk_count = by_length[length][digest]
+                found = {"transcript_hash": digest, "length": length, "source": source, "chunk_count": chunk_count}
+        if found is None:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT prepared FROM transcripts WHERE transcript_hash = ?", (found["transcript_hash"],)
+            ).fetchone()
+        found["prepared"] = json.loads(row[0])
+        return found
+
+
+class ChunkReuse:
+    """
+    Per-run wrapper for incremental runs: serves unchanged chunks from the
+    store instead of calling the model, and stores every fresh chunk output.
+    Runs without incremental mode do not use it, so they add nothing to the
+    store.
+    """
+
+    def __init__(self, store: ChunkStore):
+        self.store = store
+        self.reused: Counter = Counter()
+        self.computed: Counter = Counter()
+        self._lock = Lock()
+
+    def wrap(self, kind: str, fn: Callable[[str], Any], namespace: str = "") -> Callable[[str], Any]:
+        def run(chunk: str) -> Any:
+            digest = chunk_hash(chunk, namespace)
+            cached = self.store.get(digest, kind)
+            if cached is not None:
+                with self._lock:
+                    self.reused[kind] += 1
+                return cached
+
+            value = fn(chunk)
+            self.store.put(digest, kind, value)
+            with self._lock:
+                self.computed[kind] += 1
+            return value
+
+        return run
+
+    def wrap_split(self, kinds: tuple[str, ...], fn: Callable[[str], tuple], namespace: str = "") -> Callable[[str], tuple]:
+        """
+        Like `wrap`, for a function returning one value per kind. Each value is
+        stored under its own kind, so outputs are shared with `wrap(kind, ...)`
+        callers; a chunk is reused only when every kind is present.
+        """
+        def run(chunk: str) -> tuple:
+            digest = chunk_hash(chunk, namespace)
+            cached = [self.store.get(digest, kind) for kind in kinds]
+            if all(value is not None for value in cached):
+                with self._lock:
+                    self.reused.update(kinds)
+                return tuple(cached)
+
+            values = fn(chunk)
+            for kind, value in zip(kinds, values):
+                self.store.put(digest, kind, value)
+            with self._lock:
+                self.computed.update(kinds)
+            return values
+
+        return run
+
+
+_STORE: ChunkStore | None = None
+_STORE_LOCK = Lock()
+
+
+def get_chunk_store() -> ChunkStore:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = ChunkStore()
+        return _STORE
@@ -0,0 +1,237 @@
+import codecs
+import re
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, List
+
+from app.config import CHUNK_SCENE_GAP_SECONDS, UPLOAD_READ_CHUNK_BYTES, UPLOAD_ZIP_MAX_MEMBER_BYTES
+
+SUBTITLE_SUFFIXES = (".vtt", ".srt")
+TRANSCRIPT_SUFFIXES = (".txt", *SUBTITLE_SUFFIXES)
+
+TIMING_RE = re.compile(
+    r"(?P<start>(?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})\s*-->\s*(?P<end>(?:\d+:)?\d{1,2}:\d{2}[.,]\d{1,3})"
+)
+VOICE_RE = re.compile(r"<v(?:\.[\w.-]+)?\s+([^>]+)>")
+TAG_RE = re.compile(r"</?[^>]+>")
+SPEAKER_PREFIX_RE = re.compile(r"^\s*(?:\[([^\]]{1,40})\]|([A-Z][\w'-]*(?: [A-Z][\w'-]*){0,2})):\s+")
+
+# How many trailing words of the previous cue to check for rolling-caption overlap
+ROLLING_OVERLAP_WORDS = 40
+# Shorter repeats are left alone ("yes" / "Yes."), as are cues from another
+# speaker or starting more than this long after the previous cue ended
+ROLLING_OVERLAP_MIN_WORDS = 3
+ROLLING_OVERLAP_MAX_GAP_SECONDS = 2.0
+
+# A cue without a speaker label continues the current turn only when it
+# follows the previous cue this closely. Any turn also ends at a scene-sized
+# gap (CHUNK_SCENE_GAP_SECONDS, so the chunker still sees it) or once it has
+# this many words.
+UNLABELLED_CUE_MAX_GAP_SECONDS = 2.0
+SUBTITLE_TURN_MAX_WORDS = 300
+
+
+@dataclass
+class Turn:
+    start: float
+    speaker: str | None
+    text: str
+
+    def format(self) -> str:
+        total = int(self.start)
+        stamp = f"[{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}]"
+        if self.speaker:
+            return f"{stamp} {self.speaker}: {self.text}"
+        return f"{stamp} {self.text}"
+
+
+def _parse_timestamp(value: str) -> float:
+    parts = value.replace(",", ".").split(":")
+    seconds = float(parts[-1])
+    minutes = int(parts[-2]) if len(parts) >= 2 else 0
+    hours = int(parts[-3]) if len(parts) >= 3 else 0
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _strip_overlap(previous: List[str], current: List[str], min_words: int = ROLLING_OVERLAP_MIN_WORDS) -> List[str]:
+    """
+    Rolling captions repeat the tail of the previous cue at the start of the
+    next one. Drop the longest prefix of `current` (at least `min_words`
+    long) that ends `previous`.
+    """
+    tail = previous[-ROLLING_OVERLAP_WORDS:]
+    for size in range(min(len(tail), len(current)), max(min_words, 1) - 1, -1):
+        if tail[-size:] == current[:size]:
+            return current[size:]
+    return current
+
+
+class SubtitleParser:
+    """
+    Incremental WebVTT/SRT parser. Feed it lines one at a time; completed
+    speaker turns are returned as soon as the speaker changes, so only the
+    current cue block and the current turn are ever held in memory.
+    """
+
+    def __init__(self):
+        self._block: List[str] = []
+        self._turn: Turn | None = None
+        self._turn_words: List[str] = []
+        self._last_words: List[str] = []
+        self._last_end: float | None = None
+
+    def feed(self, line: str) -> List[Turn]:
+        if line.strip():
+            self._block.append(line.strip())
+            return []
+        return self._finish_block()
+
+    def close(self) -> List[Turn]:
+        done = self._finish_block()
+        if self._turn is not None:
+            done.append(self._emit())
+        return done
+
+    def _finish_block(self) -> List[Turn]:
+        block, self._block = self._block, []
+        # Headers, NOTE/STYLE/REGION blocks and stray lines have no timing line
+        timing_idx = next((i for i, line in enumerate(block) if TIMING_RE.search(line)), None)
+        if timing_idx is None:
+            return []
+
+        timing = TIMING_RE.search(block[timing_idx])
+        start, end = _parse_timestamp(timing.group("start")), _parse_timestamp(timing.group("end"))
+        raw = " ".join(block[timing_idx + 1:])
+        if not raw:
+            return []
+
+        speaker = None
+        voice = VOICE_RE.search(raw)
+        if voice:
+            speaker = voice.group(1).strip()
+        text = TAG_RE.sub("", raw).strip()
+        prefix = SPEAKER_PREFIX_RE.match(text)
+        if prefix:
+            speaker = (prefix.group(1) or prefix.group(2)).strip()
+            text = text[prefix.end():]
+
+        # Only a cue from the same speaker (or unlabelled) that follows the
+        # previous one closely can be a rolling-caption repeat of it
+        words = text.split()
+        gap = start - self._last_end if self._last_end is not None else None
+        same_speaker = speaker is None or (self._turn is not None and speaker == self._turn.speaker)
+        close = gap is not None and gap <= ROLLING_OVERLAP_MAX_GAP_SECONDS
+        if same_speaker and close:
+            words = _strip_overlap(self._last_words, words)
+        else:
+            self._last_words = []
+        self._last_words = (self._last_words + words)[-ROLLING_OVERLAP_WORDS:]
+        self._last_end = max(end, self._last_end or 0.0)
+        if not words:
+            return []
+
+        done = []
+        if self._turn is not None and self._ends_turn(speaker, gap):
+            done.append(self._emit())
+
+        if self._turn is None:
+            self._turn = Turn(start=start, speaker=speaker, text="")
+        self._turn_words.extend(words)
+        return done
+
+    def _ends_turn(self, speaker: str | None, gap: float | None) -> bool:
+        if speaker is not None and speaker != self._turn.speaker:
+            return True
+        if speaker is None and (gap is None or gap > UNLABELLED_CUE_MAX_GAP_SECONDS):
+            return True
+        return (gap is not None and gap >= CHUNK_SCENE_GAP_SECONDS) or len(self._turn_words) >= SUBTITLE_TURN_MAX_WORDS
+
+    def _emit(self) -> Turn:
+        turn, self._turn = self._turn, None
+        turn.text = " ".join(self._turn_words)
+        self._turn_words = []
+        return turn
+
+
+def parse_subtitles(lines: Iterable[str]) -> Iterator[Turn]:
+    parser = SubtitleParser()
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.close()
+
+
+async def iter_upload_lines(file, chunk_size: int = UPLOAD_READ_CHUNK_BYTES) -> AsyncIterator[str]:
+    """
+    Reads an UploadFile in fixed-size pieces and yields decoded lines.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="ignore")
+    pending = ""
+    while True:
+        data = await file.read(chunk_size)
+        if not data:
+            break
+        pending += decoder.decode(data)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def read_transcript(file) -> str:
+    """
+    Streams an upload into transcript text. Subtitle files are reduced to
+    one "[hh:mm:ss] Speaker: text" line per speaker turn.
+    """
+    lines = iter_upload_lines(file)
+
+    if not file.filename.lower().endswith(SUBTITLE_SUFFIXES):
+        return "\n".join([line async for line in lines])
+
+    parser = SubtitleParser()
+    out: List[str] = []
+    async for line in lines:
+        out.extend(turn.format() for turn in parser.feed(line))
+    out.extend(turn.format() for turn in parser.close())
+    return "\n".join(out)
+
+
+def transcript_from_bytes(name: str, data: bytes) -> str:
+    """
+    Same as `read_transcript`, for a file already in memory.
+    """
+    text = data.decode("utf-8-sig", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+    if not name.lower().endswith(SUBTITLE_SUFFIXES):
+        return text
+    return "\n".join(turn.format() for turn in parse_subtitles(text.splitlines()))
+
+
+def read_transcript_file(path: Path) -> str:
+    """
+    Same as `read_transcript`, for a file on disk.
+    """
+    return transcript_from_bytes(path.name, path.read_bytes())
+
+
+def read_zip_transcripts(file: BinaryIO) -> tuple[List[tuple[str, str]], List[str]]:
+    """
+    Transcripts in a zip archive, in name order. Returns ([(member name,
+    text)], skipped member names): directories are ignored, and other file
+    types, macOS metadata and members over UPLOAD_ZIP_MAX_MEMBER_BYTES are
+    skipped. Raises zipfile.BadZipFile for anything that is not a zip.
+    """
+    transcripts, skipped = [], []
+    with zipfile.ZipFile(file) as archive:
+        for info in sorted(archive.infolist(), key=lambda i: i.filename):
+            if info.is_dir():
+                continue
+            path = PurePosixPath(info.filename)
+            hidden = path.name.startswith(".") or "__MACOSX" in path.parts
+            if hidden or not path.name.lower().endswith(TRANSCRIPT_SUFFIXES) or info.file_size > UPLOAD_ZIP_MAX_MEMBER_BYTES:
+                skipped.append(info.filename)
+                continue
+            transcripts.append((info.filename, transcript_from_bytes(path.name, archive.read(info))))
+    return transcripts, skipped
@@ -0,0 +1,169 @@
+import re
+from collections import Counter
+from typing import Iterable, List
+
+from app.pipeline.profiles import get_profile
+
+# --- Canon merge ---
+
+def entity_key(name: str) -> str:
+    """
+    Case, punctuation, spacing and article-insensitive form of an entity name:
+    "Al'Kesh", "al kesh" and "the Alkesh" all map to "alkesh".
+    """
+    words = re.findall(r"\w+", name.casefold())
+    if len(words) > 1 and words[0] == "the":
+        words = words[1:]
+    return "".join(words)
+
+
+class _EntityGroups:
+    """
+    Groups mentions of the same entity across fragments. Two mentions belong
+    together when any of their names or aliases share an `entity_key`.
+    """
+
+    def __init__(self, preferred: Iterable[str] = ()):
+        self.preferred = {entity_key(name): name for name in preferred}
+        self.groups: List[dict | None] = []
+        self.index: dict[str, int] = {}
+
+    def add(self, name: str, aliases: Iterable[str] = (), pronouns: str = "") -> None:
+        spellings = [s for s in [name, *aliases] if isinstance(s, str) and entity_key(s)]
+        if not spellings:
+            return
+        keys = {entity_key(s) for s in spellings}
+
+        hits = sorted({self.index[k] for k in keys if k in self.index})
+        if hits:
+            gid = hits[0]
+            for other in hits[1:]:
+                self._fold(other, into=gid)
+        else:
+            gid = len(self.groups)
+            self.groups.append({"names": Counter(), "spellings": {}, "pronouns": ""})
+
+        group = self.groups[gid]
+        group["names"][spellings[0]] += 1
+        for spelling in spellings:
+            group["spellings"].setdefault(entity_key(spelling), spelling)
+        if pronouns and not group["pronouns"]:
+            group["pronouns"] = pronouns
+        for k in keys:
+            self.index[k] = gid
+
+    def _fold(self, gid: int, into: int) -> None:
+        source, target = self.groups[gid], self.groups[into]
+        target["names"].update(source["names"])
+        for k, spelling in source["spellings"].items():
+            target["spellings"].setdefault(k, spelling)
+            self.index[k] = into
+        if source["pronouns"] and not target["pronouns"]:
+            target["pronouns"] = source["pronouns"]
+        self.groups[gid] = None
+
+    def resolved(self) -> List[tuple[str, List[str], str]]:
+        """
+        (canonical name, aliases, pronouns) per entity, in first-seen order.
+        The canonical name is the configured one if any spelling matches it,
+        otherwise the name used most often (ties go to the earliest).
+        """
+        out = []
+        for group in self.groups:
+            if group is None:
+                continue
+            preferred = [self.preferred[k] for k in group["spellings"] if k in self.preferred]
+            canonical = preferred[0] if preferred else max(group["names"], key=group["names"].get)
+            own = entity_key(canonical)
+            aliases = [s for k, s in group["spellings"].items() if k != own]
+            out.append((canonical, aliases, group["pronouns"]))
+        return out
+
+
+def _dict_entries(value) -> Iterable[tuple[str, list, str]]:
+    """
+    Normalizes the shapes the model returns for characters / npcs:
+    {"Name": {"aliases": [...], "pronouns": "..."}}, {"Name": [...]} or ["Name", ...].
+    """
+    if isinstance(value, dict):
+        for name, data in value.items():
+            if isinstance(data, dict):
+                yield name, data.get("aliases") or [], data.get("pronouns") or ""
+            elif isinstance(data, list):
+                yield name, data, ""
+            else:
+                yield name, [], ""
+    elif isinstance(value, list):
+        for name in value:
+            if isinstance(name, str):
+                yield name, [], ""
+
+
+def merge_canon(fragments: List[dict], character_names: Iterable[str] | None = None) -> dict:
+    """
+    Deterministic merge of per-chunk canon fragments, in chunk order.
+    Entities are deduplicated by normalized name and alias. Player characters
+    take their canonical name from `character_names` (default: the default
+    campaign profile's).
+    """
+    if character_names is None:
+        character_names = get_profile().character_names
+    characters = _EntityGroups(preferred=character_names)
+    npcs = _EntityGroups()
+    lists = {key: _EntityGroups() for key in ("locations", "items", "creatures")}
+
+    for fragment in fragments:
+        if not isinstance(fragment, dict):
+            continue
+        for name, aliases, pronouns in _dict_entries(fragment.get("characters")):
+            characters.add(name, aliases, pronouns)
+        for name, aliases, _ in _dict_entries(fragment.get("npcs")):
+            npcs.add(name, aliases)
+        for key, groups in lists.items():
+            for name in fragment.get(key) or []:
+                if isinstance(name, str):
+                    groups.add(name)
+
+    return {
+        "characters": {
+            name: {"aliases": aliases, "pronouns": pronouns}
+            for name, aliases, pronouns in characters.resolved()
+        },
+        "npcs": {name: aliases for name, aliases, _ in npcs.resolved()},
+        **{key: [name for name, _, _ in groups.resolved()] for key, groups in lists.items()},
+    }
+
+
+# --- Timeline merge ---
+
+# Timeline events this close to a chunk boundary are compared against the
+# previous chunk's last events, so an event seen by both chunks is kept once.
+BOUNDARY_WINDOW = 3
+
+
+def merge_timelines(fragments: List[dict]) -> dict:
+    """
+    Stitches per-chunk timelines in chunk order. Events repeated across a
+    chunk boundary are kept once; simultaneous-event groups are renumbered.
+    """
+    timeline: List[str] = []
+    simultaneous: dict[str, list] = {}
+    tail: List[str] = []
+
+    for fragment in fragments:
+        if not isinstance(fragment, dict):
+            continue
+
+        events = [e for e in fragment.get("timeline") or [] if isinstance(e, str) and e.strip()]
+        for i, event in enumerate(events):
+            if i < BOUNDARY_WINDOW and entity_key(event) in tail:
+                continue
+            timeline.append(event)
+        tail = [entity_key(e) for e in events[-BOUNDARY_WINDOW:]]
+
+        groups = fragment.get("simultaneous_events") or {}
+        for group in groups.values() if isinstance(groups, dict) else groups:
+            if group:
+                simultaneous[f"group_{len(simultaneous) + 1}"] = group
+
+    return {"timeline": timeline, "simultaneous_events": simultaneous}
@@ -0,0 +1,277 @@
+import contextvars
+import functools
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from threading import Lock
+from typing import Callable, Dict, List, Tuple
+
+# --- Prometheus-style registry ---
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape_label_value(value) -> str:
+    # Text exposition format: backslash, double quote and line feed are escaped
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: dict | None = None) -> str:
+    pairs = list(key) + sorted((extra or {}).items())
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # label key -> (per-bucket counts, sum, count)
+        self._values: Dict[LabelKey, Tuple[List[int], float, int]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _labels(labels)
+        with self._lock:
+            counts, total, n = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            idx = bisect_left(self.buckets, value)
+            if idx < len(counts):
+                counts[idx] += 1
+            self._values[key] = (counts, total + value, n + 1)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, n) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {n}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {n}")
+        return lines
+
+
+class Gauge:
+    """
+    Read at scrape time from a callback.
+    """
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {self.read()}"]
+
+
+REGISTRY: List[object] = []
+
+
+def _register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+
+def register_gauge(name: str, help_text: str, read: Callable[[], float]) -> Gauge:
+    return _register(Gauge(name, help_text, read))
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+LLM_SECONDS = _register(Histogram("ttrpg_llm_request_seconds", "Wall time of LLM calls."))
+LLM_TOKENS = _register(Counter("ttrpg_llm_tokens_total", "Tokens used by LLM calls."))
+LLM_CALLS = _register(Counter("ttrpg_llm_calls_total", "LLM calls, split by cache result."))
+LLM_RETRIES = _register(Counter("ttrpg_llm_retries_total", "Retried LLM requests."))
+LLM_CACHE_LOOKUPS = _register(Counter("ttrpg_llm_cache_lookups_total", "LLM response cache lookups by result (hit/miss)."))
+CHUNK_FALLBACKS = _register(Counter("ttrpg_chunk_fused_fallbacks_total", "Fused chunk responses that failed validation."))
+STEP_SECONDS = _register(Histogram("ttrpg_step_seconds", "Wall time of local pipeline steps."))
+STAGE_SECONDS = _register(Histogram("ttrpg_stage_seconds", "Wall time of pipeline stages."))
+RUN_SECONDS = _register(Histogram("ttrpg_pipeline_seconds", "Wall time of full pipeline runs."))
+RUNS = _register(Counter("ttrpg_pipeline_runs_total", "Pipeline runs by outcome."))
+
+
+# --- Per-run trace ---
+
+@dataclass
+class Span:
+    kind: str  # "llm" | "step"
+    name: str
+    seconds: float
+    start: float
+    model: str | None = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    retries: int = 0
+    cached: bool = False
+
+
+@dataclass
+class Trace:
+    started: float = field(default_factory=time.perf_counter)
+    spans: List[Span] = field(default_factory=list)
+    _lock: Lock = field(default_factory=Lock, repr=False)
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = list(self.spans)
+
+        by_name: Dict[str, dict] = {}
+        for span in spans:
+            agg = by_name.setdefault(span.name, {
+                "kind": span.kind, "calls": 0, "seconds": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0,
+                "retries": 0, "cache_hits": 0,
+            })
+            agg["calls"] += 1
+            agg["seconds"] = round(agg["seconds"] + span.seconds, 3)
+            agg["prompt_tokens"] += span.prompt_tokens
+            agg["completion_tokens"] += span.completion_tokens
+            agg["cached_prompt_tokens"] += span.cached_prompt_tokens
+            agg["retries"] += span.retries
+            agg["cache_hits"] += int(span.cached)
+
+        return {
+            "totals": {
+                "llm_calls": sum(1 for s in spans if s.kind == "llm"),
+                "prompt_tokens": sum(s.prompt_tokens for s in spans),
+                "completion_tokens": sum(s.completion_tokens for s in spans),
+                "cached_prompt_tokens": sum(s.cached_prompt_tokens for s in spans),
+                "retries": sum(s.retries for s in spans),
+            },
+            "by_name": by_name,
+            "spans": [asdict(s) for s in spans],
+        }
+
+
+_CURRENT_TRACE: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("trace", default=None)
+
+
+@contextmanager
+def trace_run():
+    """
+    Collects every LLM call and timed step made while the block runs,
+    including those on worker threads submitted via `submit_with_context`.
+    """
+    trace = Trace()
+    token = _CURRENT_TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _CURRENT_TRACE.reset(token)
+
+
+def current_trace() -> Trace | None:
+    return _CURRENT_TRACE.get()
+
+
+def _offset(trace: Trace | None, t0: float) -> float:
+    return round(t0 - trace.started, 3) if trace is not None else 0.0
+
+
+def record_llm_call(
+    stage: str | None,
+    model: str,
+    seconds: float,
+    started: float,
+    prompt_tokens: int = 0,
+    completion_tokens: int = 0,
+    cached_prompt_tokens: int = 0,
+    retries: int = 0,
+    cached: bool = False,
+) -> None:
+    stage = stage or "unknown"
+    LLM_CALLS.inc(stage=stage, model=model, cache="hit" if cached else "miss")
+    if not cached:
+        LLM_SECONDS.observe(seconds, stage=stage, model=model)
+        LLM_TOKENS.inc(prompt_tokens, stage=stage, model=model, type="prompt")
+        LLM_TOKENS.inc(completion_tokens, stage=stage, model=model, type="completion")
+        # Part of the prompt tokens, billed at the provider's cached rate
+        LLM_TOKENS.inc(cached_prompt_tokens, stage=stage, model=model, type="cached_prompt")
+    if retries:
+        LLM_RETRIES.inc(retries, stage=stage, model=model)
+
+    trace = current_trace()
+    if trace is not None:
+        trace.add(Span(
+            kind="llm", name=stage, seconds=round(seconds, 4), start=_offset(trace, started),
+            model=model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+            cached_prompt_tokens=cached_prompt_tokens, retries=retries, cached=cached,
+        ))
+
+
+@contextmanager
+def timed_step(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        STEP_SECONDS.observe(seconds, step=name)
+        trace = current_trace()
+        if trace is not None:
+            trace.add(Span(kind="step", name=name, seconds=round(seconds, 4), start=_offset(trace, t0)))
+
+
+def timed(name: str):
+    """
+    Decorator form of `timed_step`.
+    """
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with timed_step(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def submit_with_context(pool, fn, *args):
+    """
+    pool.submit that carries the caller's context (and so its trace) into
+    the worker thread. Each task gets its own copy; a Context cannot be
+    entered by two threads at once.
+    """
+    return pool.submit(contextvars.copy_context().run, fn, *args)
@@ -1,10 +1,241 @@
-from app.models.openai_client import openai
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, TypeVar
 
+import openai
 
-def chat_completion(model: str, prompt: str, temperature: float = 0.2) -> str:
-    resp = openai.chat.completions.create(
+from app.config import (
+    LLM_CACHE_BYPASS_STAGES,
+    LLM_CACHE_ENABLED,
+    LLM_COMPLETION_TOKEN_ESTIMATE,
+    LLM_MAX_RETRIES,
+    LLM_PROMPT_CACHE_KEY,
+)
+from app.models.openai_client import get_async_client, run_sync
+from app.pipeline.cache import cache_key, get_response_cache
+from app.pipeline.chunking import count_tokens
+from app.pipeline.metrics import LLM_RETRIES, record_llm_call
+from app.pipeline.parallel import run_on_pool
+from app.pipeline.ratelimit import backoff_delay, get_bucket
+
+# Besides these, any 5xx, timeouts and connection errors are retried
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def _usage(usage) -> tuple[int, int, int]:
+    """
+    (prompt tokens, completion tokens, prompt tokens served from the
+    provider's prompt cache).
+    """
+    if usage is None:
+        return 0, 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    return usage.prompt_tokens or 0, usage.completion_tokens or 0, cached
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, openai.APIConnectionError):  # includes timeouts
+        return True
+    return isinstance(error, openai.APIStatusError) and (
+        error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    )
+
+
+async def _create(
+    model: str, prompt: str, temperature: float, on_token: Callable[[str], None] | None, **extra
+) -> tuple[str, tuple[int, int, int], dict]:
+    """
+    One API call. Returns (content, `_usage`, headers).
+    """
+    raw = await get_async_client().chat.completions.with_raw_response.create(
         model=model,
         messages=[{"role": "user", "content": prompt}],
         temperature=temperature,
+        **({"stream": True, "stream_options": {"include_usage": True}} if on_token is not None else {}),
+        **extra,
     )
-    return resp.choices[0].message.content
+    if on_token is None:
+        resp = raw.parse()
+        return resp.choices[0].message.content, _usage(getattr(resp, "usage", None)), raw.headers
+
+    parts = []
+    usage = None
+    async for chunk in raw.parse():
+        # The final chunk carries usage and no choices
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            on_token(delta)
+    return "".join(parts), _usage(usage), raw.headers
+
+
+async def _complete(
+    model: str,
+    prompt: str,
+    temperature: float,
+    estimate: int,
+    on_token: Callable[[str], None] | None,
+    **extra,
+) -> tuple[str, tuple[int, int, int], int]:
+    """
+    `_create` within the model's rate limit budget, retried with backoff.
+    A stream that already delivered text is not retried (the deltas cannot
+    be taken back). Returns (content, usage, retries).
+    """
+    bucket = get_bucket(model)
+    streamed = False
+
+    def emit(delta: str) -> None:
+        nonlocal streamed
+        streamed = True
+        on_token(delta)
+
+    retries = 0
+    while True:
+        await bucket.acquire(estimate)
+        try:
+            content, usage, headers = await _create(
+                model, prompt, temperature, emit if on_token is not None else None, **extra
+            )
+        except openai.OpenAIError as e:
+            bucket.settle(estimate, 0)
+            if streamed or retries >= LLM_MAX_RETRIES or not _retryable(e):
+                raise
+            retries += 1
+            response = getattr(e, "response", None)
+            delay = backoff_delay(retries, response.headers if response is not None else None)
+            if getattr(e, "status_code", None) == 429:
+                bucket.pause(delay)  # everyone using this model waits, not just this call
+            else:
+                await asyncio.sleep(delay)
+            continue
+
+        bucket.observe(headers)
+        bucket.settle(estimate, usage[0] + usage[1] or estimate)
+        return content, usage, retries
+
+
+T = TypeVar("T")
+
+# Rate limit bucket for Batch API requests (file uploads/downloads, batch
+# create/retrieve): charged one request each, no tokens
+BATCH_API_BUCKET = "batch-api"
+
+
+async def _call_with_retries(call: Callable[[], Awaitable[T]], bucket_name: str) -> tuple[T, int]:
+    """
+    `call()` within the bucket's request budget, retried with backoff like
+    chat calls. Returns (result, retries).
+    """
+    bucket = get_bucket(bucket_name)
+    retries = 0
+    while True:
+        await bucket.acquire(0)
+        try:
+            return await call(), retries
+        except openai.OpenAIError as e:
+            if retries >= LLM_MAX_RETRIES or not _retryable(e):
+                raise
+            retries += 1
+            response = getattr(e, "response", None)
+            delay = backoff_delay(retries, response.headers if response is not None else None)
+            if getattr(e, "status_code", None) == 429:
+                bucket.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+
+
+def api_call(operation: str, call: Callable[[openai.AsyncOpenAI], Awaitable[T]]) -> T:
+    """
+    A non-chat API request (Batch API files and batches) through the shared
+    client, rate limited and retried like chat calls. `call` gets the client
+    and returns the request's awaitable, e.g.
+    `api_call("batches.retrieve", lambda c: c.batches.retrieve(batch_id))`.
+    """
+    client = get_async_client()
+    result, retries = run_sync(_call_with_retries(lambda: call(client), BATCH_API_BUCKET))
+    if retries:
+        LLM_RETRIES.inc(retries, stage=operation, model=BATCH_API_BUCKET)
+    return result
+
+
+def chat_completion(
+    model: str,
+    prompt: str,
+    temperature: float = 0.2,
+    stage: str | None = None,
+    on_token: Callable[[str], None] | None = None,
+    response_format: dict | None = None,
+) -> str:
+    """
+    `stage` names the pipeline step making the call; it is used for cache
+    hit/miss accounting and for LLM_CACHE_BYPASS_STAGES.
+    With `on_token`, the response is streamed and each text delta is passed
+    to it as it arrives (a cache hit arrives as a single delta).
+    `response_format` is passed through to the API (structured output).
+    """
+    started = time.perf_counter()
+    use_cache = LLM_CACHE_ENABLED and stage not in LLM_CACHE_BYPASS_STAGES
+    if use_cache:
+        cache = get_response_cache()
+        key = cache_key(model, prompt, temperature, response_format)
+        cached = cache.get(key, stage)
+        if cached is not None:
+            record_llm_call(stage, model, time.perf_counter() - started, started, cached=True)
+            if on_token is not None:
+                on_token(cached)
+            return cached
+
+    extra = {"response_format": response_format} if response_format is not None else {}
+    if LLM_PROMPT_CACHE_KEY and stage:
+        extra["prompt_cache_key"] = stage
+    estimate = count_tokens(prompt, model) + LLM_COMPLETION_TOKEN_ESTIMATE
+    # Every model call takes a slot of the shared pool (CHUNK_CONCURRENCY),
+    # including stage-level ones made from stage threads
+    content, (prompt_tokens, completion_tokens, cached_prompt_tokens), retries = run_on_pool(
+        lambda: run_sync(_complete(model, prompt, temperature, estimate, on_token, **extra))
+    )
+
+    record_llm_call(
+        stage,
+        model,
+        time.perf_counter() - started,
+        started,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cached_prompt_tokens=cached_prompt_tokens,
+        retries=retries,
+    )
+
+    if use_cache and content:
+        cache.put(key, model, content)
+    return content
+
+
+@dataclass(frozen=True)
+class ChatRequest:
+    """
+    A chat call described without making it, so the same prompt can go
+    through `chat_completion` or the Batch API (see `app.pipeline.batch`).
+    """
+    model: str
+    prompt: str
+    temperature: float
+    stage: str
+    response_format: dict | None = None
+
+    def run(self, on_token: Callable[[str], None] | None = None) -> str:
+        return chat_completion(
+            self.model,
+            self.prompt,
+            self.temperature,
+            stage=self.stage,
+            on_token=on_token,
+            response_format=self.response_format,
+        )
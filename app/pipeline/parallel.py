@@ -0,0 +1,181 @@
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_EXCEPTION, Future, wait
+from contextlib import contextmanager
+from threading import Condition, Lock, Thread, local
+from typing import Callable, Dict, Iterable, List, TypeVar
+
+from app.config import CHUNK_CONCURRENCY
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# --- Sessions ---
+# Work submitted to the shared pool is attributed to the session (a run) in
+# whose context it was submitted, with that session's scheduling weight.
+
+DEFAULT_SESSION = ("default", 1)
+
+_SESSION: contextvars.ContextVar[tuple[str, int]] = contextvars.ContextVar("session", default=DEFAULT_SESSION)
+
+
+@contextmanager
+def session(session_id: str, weight: int = 1):
+    """
+    Attributes pool work submitted inside the block (including from stage
+    threads started with `submit_with_context`) to `session_id`.
+    """
+    token = _SESSION.set((session_id, max(1, weight)))
+    try:
+        yield
+    finally:
+        _SESSION.reset(token)
+
+
+class FairExecutor:
+    """
+    A fixed set of worker threads serving one task queue per session. Sessions
+    take turns in proportion to their weight (stride scheduling): each task
+    started advances its session's pass by 1 / weight, and the session with
+    the lowest pass goes next. A session with a thousand queued chunk calls
+    therefore cannot hold up one with ten. A session that (re)joins starts at
+    the current pass, so it gets no credit for time it spent idle.
+
+    Tasks run in a copy of the submitter's context (trace, session).
+    A task submitted with `front` goes ahead of its session's queued tasks
+    (not ahead of other sessions).
+    """
+
+    def __init__(self, workers: int, name: str = "llm"):
+        self._cond = Condition()
+        self._queues: Dict[str, deque] = {}
+        self._weights: Dict[str, int] = {}
+        self._pass: Dict[str, float] = {}
+        self._clock = 0.0
+        for i in range(workers):
+            Thread(target=self._work, name=f"{name}_{i}", daemon=True).start()
+
+    def submit(self, fn: Callable[..., T], *args, front: bool = False) -> Future:
+        context = contextvars.copy_context()
+        session_id, weight = _SESSION.get()
+        future: Future = Future()
+        with self._cond:
+            queue = self._queues.get(session_id)
+            if queue is None:
+                queue = self._queues[session_id] = deque()
+                self._pass[session_id] = max(self._pass.get(session_id, 0.0), self._clock)
+            self._weights[session_id] = weight
+            if front:
+                queue.appendleft((future, context, fn, args))
+            else:
+                queue.append((future, context, fn, args))
+            self._cond.notify()
+        return future
+
+    def pending(self) -> Dict[str, int]:
+        """
+        Queued (not yet started) tasks per session.
+        """
+        with self._cond:
+            return {session_id: len(queue) for session_id, queue in self._queues.items()}
+
+    def _next(self):
+        # Caller holds the condition
+        session_id = min(self._queues, key=self._pass.__getitem__)
+        queue = self._queues[session_id]
+        task = queue.popleft()
+        self._clock = self._pass[session_id]
+        self._pass[session_id] += 1 / self._weights[session_id]
+        if not queue:
+            del self._queues[session_id]
+            # Idle sessions at or behind the clock would restart from it anyway
+            for idle in [s for s, p in self._pass.items() if p <= self._clock and s not in self._queues]:
+                del self._pass[idle], self._weights[idle]
+        return task
+
+    def _work(self) -> None:
+        _WORKER.active = True
+        while True:
+            with self._cond:
+                while not self._queues:
+                    self._cond.wait()
+                future, context, fn, args = self._next()
+            if not future.set_running_or_notify_cancel():
+                continue  # cancelled while queued
+            try:
+                result = context.run(fn, *args)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+
+# One process-wide pool for leaf LLM calls, so concurrent stages (and
+# concurrent runs) share the same CHUNK_CONCURRENCY bound, fairly.
+_POOL: FairExecutor | None = None
+_POOL_LOCK = Lock()
+_WORKER = local()  # .active is set on the pool's own threads
+
+
+def _get_pool() -> FairExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = FairExecutor(CHUNK_CONCURRENCY)
+        return _POOL
+
+
+def pending_calls() -> Dict[str, int]:
+    return _POOL.pending() if _POOL is not None else {}
+
+
+def run_on_pool(fn: Callable[[], T]) -> T:
+    """
+    Runs one call on the shared pool as part of the current session, ahead
+    of the session's queued chunk work, and waits for it. On a pool thread
+    (a chunk task) it runs inline, since that task already holds a slot.
+    """
+    if getattr(_WORKER, "active", False):
+        return fn()
+    return _get_pool().submit(fn, front=True).result()
+
+
+def fan_out(tasks: List[Callable[[], T]]) -> List[T]:
+    """
+    Runs zero-argument callables on the shared bounded pool, as part of the
+    current session.
+    Results come back in the same order as `tasks`.
+    The first failure cancels anything not yet started and is re-raised.
+
+    Tasks must not call fan_out themselves; nested waits on a bounded
+    pool can deadlock.
+    """
+    if not tasks:
+        return []
+
+    pool = _get_pool()
+    futures = [pool.submit(task) for task in tasks]
+    done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+    for fut in done:
+        if fut.exception() is not None:
+            for other in pending:
+                other.cancel()
+            raise fut.exception()
+    return [fut.result() for fut in futures]
+
+
+def map_ordered(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    on_result: Callable[[int, R], None] | None = None,
+) -> List[R]:
+    """
+    `on_result(index, value)` fires as each item finishes, in completion order.
+    """
+    def run(index: int, item: T) -> R:
+        value = fn(item)
+        if on_result is not None:
+            on_result(index, value)
+        return value
+
+    return fan_out([lambda i=i, item=item: run(i, item) for i, item in enumerate(items)])
@@ -1,34 +1,46 @@
-import json
-from pathlib import Path
-from app.config import OUTPUT_DIR
+import re
 
-def save_outputs(result: dict, source_name: str | None = None) -> dict:
+from app.config import EXPORT_MARKDOWN, OUTPUT_DIR
+from app.pipeline.artifacts import get_artifact_store
+from app.pipeline.metrics import timed
+
+@timed("save_outputs")
+def save_outputs(result: dict, source_name: str | None, run_id: str) -> dict:
     """
     Saves:
-      - full JSON result
-      - GM recap as Markdown
-      - Player story recap as Markdown
+      - the full result (including the trace) as a compressed artifact bundle
+      - GM and player recaps as Markdown, if EXPORT_MARKDOWN is set
     """
+    artifact = get_artifact_store().save(run_id, result)
+    saved = {"run_id": run_id, "etag": artifact.digest, "codec": artifact.codec, "bytes": artifact.size}
+    if not EXPORT_MARKDOWN:
+        return saved
 
-    # Base filename
-    session_base = source_name.rsplit(".", 1)[0] if source_name else "session_output"
-
-    # --- JSON ----
-    json_path = OUTPUT_DIR / f"{session_base}_summary.json"
-    json_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    # Base filename; the run id keeps re-uploads of the same file apart.
+    # Only the last path component is used ("campaign.zip/s01.txt" -> "s01").
+    file_name = re.split(r"[\\/]", source_name)[-1] if source_name else ""
+    session_base = file_name.rsplit(".", 1)[0] or "session_output"
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
     # --- GM Markdown ----
-    gm_md = f"# GM Recap — {session_base}\n\n" + result.get("gm_final_summary", "")
-    gm_path = OUTPUT_DIR / f"{session_base}_gm_recap.md"
-    gm_path.write_text(gm_md, encoding="utf-8")
+    gm_path = OUTPUT_DIR / f"{session_base}_{run_id}_gm_recap.md"
+    gm_path.write_text(gm_recap_markdown(result), encoding="utf-8")
 
     # --- Player Markdown ----
-    player_md = f"# Player Recap — {session_base}\n\n" + result.get("player_final_story", "")
-    player_path = OUTPUT_DIR / f"{session_base}_player_recap.md"
-    player_path.write_text(player_md, encoding="utf-8")
-
-    return {
-        "json": str(json_path),
-        "gm_markdown": str(gm_path),
-        "player_markdown": str(player_path),
-    }
+    player_path = OUTPUT_DIR / f"{session_base}_{run_id}_player_recap.md"
+    player_path.write_text(player_recap_markdown(result), encoding="utf-8")
+
+    return {**saved, "gm_markdown": str(gm_path), "player_markdown": str(player_path)}
+
+
+def _title(result: dict) -> str:
+    source = result.get("source")
+    return source.rsplit(".", 1)[0] if source else "session_output"
+
+
+def gm_recap_markdown(result: dict) -> str:
+    return f"# GM Recap — {_title(result)}\n\n" + result.get("gm_final_summary", "")
+
+
+def player_recap_markdown(result: dict) -> str:
+    return f"# Player Recap — {_title(result)}\n\n" + result.get("player_final_story", "")
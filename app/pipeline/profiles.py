@@ -0,0 +1,82 @@
+"""
+Campaign profiles: the character map (aliases, pronouns) and optional known
+locations for one table, read from CAMPAIGN_PROFILE_DIR/<campaign_id>.json.
+Campaigns without a profile file use CHARACTER_MAP_FILE.
+
+Profiles are loaded on first use, not at import. Each one builds its alias
+resolver once and is cached (LRU) by path and modification time, so editing
+a profile file takes effect on the next run without a restart.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List
+
+from app.config import CAMPAIGN_PROFILE_DIR, CHARACTER_MAP_FILE, PROFILE_CACHE_SIZE
+from app.pipeline.utils import AliasResolver
+
+# Campaign ids double as file names
+CAMPAIGN_ID_RE = re.compile(r"^[A-Za-z0-9][\w.-]{0,63}$")
+
+
+@dataclass(frozen=True)
+class CampaignProfile:
+    """
+    Expected structure of a profile file (characters.json uses the same):
+    {
+      "characters": {
+          "Graak": { "aliases": [...], "pronouns": "he/him" },
+          ...
+      },
+      "locations": ["Sunken Tomb", ...]      # optional
+    }
+    """
+
+    path: Path
+    aliases: Dict[str, List[str]]
+    pronouns: Dict[str, str]
+    locations: List[str] = field(default_factory=list)
+    resolver: AliasResolver = field(init=False, repr=False, compare=False)
+    character_hints: str = field(init=False, repr=False, compare=False)  # JSON for the canon prompt
+
+    def __post_init__(self):
+        object.__setattr__(self, "resolver", AliasResolver(self.aliases))
+        hints = json.dumps({"aliases": self.aliases, "pronouns": self.pronouns}, ensure_ascii=False)
+        object.__setattr__(self, "character_hints", hints)
+
+    @property
+    def character_names(self) -> List[str]:
+        return list(self.aliases)
+
+
+def profile_path(campaign_id: str | None) -> Path:
+    if not campaign_id:
+        return CHARACTER_MAP_FILE
+    if not CAMPAIGN_ID_RE.match(campaign_id):
+        raise ValueError(f"Invalid campaign id: {campaign_id!r}")
+    path = CAMPAIGN_PROFILE_DIR / f"{campaign_id}.json"
+    return path if path.exists() else CHARACTER_MAP_FILE
+
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def _load_profile(path: Path, mtime_ns: int) -> CampaignProfile:
+    # mtime_ns is part of the cache key only: a changed file is a new entry
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        characters = data["characters"]
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid campaign profile {path}: {e}") from e
+
+    return CampaignProfile(
+        path=path,
+        aliases={canonical: info["aliases"] for canonical, info in characters.items()},
+        pronouns={canonical: info.get("pronouns", "") for canonical, info in characters.items()},
+        locations=list(data.get("locations") or []),
+    )
+
+
+def get_profile(campaign_id: str | None = None) -> CampaignProfile:
+    path = profile_path(campaign_id)
+    return _load_profile(path, path.stat().st_mtime_ns)
@@ -0,0 +1,255 @@
+"""
+Deterministic QA pre-check for the final recaps, run before (and usually
+instead of) the LLM QA call.
+
+Both recaps are checked against an index of every name the run knows: the
+extracted canon, the campaign profile's character map and the location
+normalization map. It flags
+- real player names, alias spellings and location variants that were not
+  normalized to their canonical name,
+- names close to, but not the same as, a known name (misspellings),
+- capitalized names that appear nowhere in canon,
+- he/she pronouns that contradict a character's configured pronouns.
+
+Findings point at the recap paragraph ("passage") they were found in, so
+the LLM QA pass only has to read those passages.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from rapidfuzz import fuzz, process
+
+from app.config import QA_IGNORED_NAMES, QA_NAME_SIMILARITY
+from app.pipeline.merge import entity_key
+from app.pipeline.profiles import CampaignProfile, get_profile
+
+# Runs of capitalized words ("Sunken Tomb", "Graak"), possessive stripped
+NAME_RUN_RE = re.compile(r"[A-Z][\w-]*(?:['’]s\b)?(?:\s+[A-Z][\w-]*(?:['’]s\b)?)*")
+POSSESSIVE_RE = re.compile(r"['’]s$")
+
+SENTENCE_RE = re.compile(r"[^.!?]+[.!?]*")
+LIST_MARKER_RE = re.compile(r"^\s*(?:[#>*-]+|\d+[.)])\s*")
+WORD_RE = re.compile(r"[a-z]+")
+
+# Capitalized mid-sentence after a missing full stop or inside quotes; never names
+COMMON_WORDS = {
+    "the", "a", "an", "and", "but", "or", "so", "then", "when", "while", "as", "after", "before",
+    "meanwhile", "later", "with", "in", "on", "at", "of", "to", "from", "it", "its", "he", "she",
+    "they", "we", "you", "his", "her", "their", "our", "your", "this", "that", "these", "those",
+    "there", "here", "what", "who", "why", "how", "if", "no", "yes", "not", "all", "one",
+}
+
+# Findings keep at most this much of the sentence they were found in
+SENTENCE_CHARS = 300
+
+PRONOUN_SETS = {
+    "he": {"he", "him", "his", "himself"},
+    "she": {"she", "her", "hers", "herself"},
+}
+
+
+@dataclass
+class EntityIndex:
+    """
+    Every known name by `entity_key`. `canonical` maps keys of canonical
+    names to themselves, `variants` maps other known spellings to their
+    canonical name, with the reason they are known.
+    """
+
+    canonical: Dict[str, str] = field(default_factory=dict)
+    variants: Dict[str, tuple[str, str]] = field(default_factory=dict)
+    words: set = field(default_factory=set)  # keys of single words inside canonical names
+    people: set = field(default_factory=set)  # canonical names of characters and NPCs
+    pronouns: Dict[str, set] = field(default_factory=dict)  # canonical character -> {"he", "him", ...}
+
+    def add(self, name: str) -> None:
+        key = entity_key(name)
+        if not key:
+            return
+        self.canonical.setdefault(key, name)
+        self.variants.pop(key, None)
+        self.words.update(entity_key(w) for w in name.split())
+
+    def add_variant(self, variant: str, canonical: str, kind: str) -> None:
+        key = entity_key(variant)
+        if key and key not in self.canonical:
+            self.variants.setdefault(key, (canonical, kind))
+
+    def set_pronouns(self, name: str, pronouns: str) -> None:
+        declared = set(WORD_RE.findall(pronouns.lower()))
+        if declared and name not in self.pronouns:
+            self.pronouns[name] = declared
+
+
+def build_index(canon: dict, location_map: dict, profile: CampaignProfile) -> EntityIndex:
+    index = EntityIndex()
+    characters = canon.get("characters") or {}
+    npcs = canon.get("npcs") or {}
+
+    for name in [*profile.aliases, *characters, *npcs]:
+        index.add(name)
+        index.people.add(name)
+    for key in ("locations", "items", "creatures"):
+        for name in canon.get(key) or []:
+            if isinstance(name, str):
+                index.add(name)
+    for canonical in set(location_map.values()):
+        index.add(canonical)
+    for name in QA_IGNORED_NAMES:
+        index.add(name)
+
+    for name, aliases in profile.aliases.items():
+        for alias in aliases:
+            index.add_variant(alias, name, "player_name")
+    for name, info in characters.items():
+        aliases = info.get("aliases") if isinstance(info, dict) else None
+        for alias in aliases or []:
+            index.add_variant(alias, name, "variant")
+    for name, aliases in npcs.items():
+        for alias in aliases or []:
+            index.add_variant(alias, name, "variant")
+    for variant, canonical in location_map.items():
+        index.add_variant(variant, canonical, "location_variant")
+
+    # The profile is the source of truth for pronouns, canon fills the gaps
+    for name, pronouns in profile.pronouns.items():
+        index.set_pronouns(name, pronouns or "")
+    for name, info in characters.items():
+        if isinstance(info, dict):
+            index.set_pronouns(name, info.get("pronouns") or "")
+    return index
+
+
+# --- Recap scanning ---
+
+def passages(text: str) -> List[str]:
+    """
+    Paragraphs of a recap (blank-line separated), the unit findings refer to.
+    """
+    return [p.strip() for p in re.split(r"\n\s*\n", text or "") if p.strip()]
+
+
+def _is_heading(line: str) -> bool:
+    body = LIST_MARKER_RE.sub("", line).strip("*_ :")
+    return line.lstrip().startswith("#") or (len(body.split()) <= 6 and not body.endswith((".", "!", "?")))
+
+
+def _sentences(passage: str):
+    """
+    Yields (sentence, is_heading) per line; a new line, a list marker or a
+    colon starts a new sentence.
+    """
+    for line in passage.splitlines():
+        heading = _is_heading(line)
+        body = LIST_MARKER_RE.sub("", line)
+        for part in re.split(r":\s+", body):
+            for m in SENTENCE_RE.finditer(part):
+                sentence = m.group(0).strip().lstrip("\"'“‘(*_").strip()
+                if sentence:
+                    yield sentence, heading
+
+
+def _close_name(index: EntityIndex, key: str) -> str | None:
+    if len(key) < 4:
+        return None
+    match = process.extractOne(key, list(index.canonical), scorer=fuzz.ratio, score_cutoff=QA_NAME_SIMILARITY)
+    return index.canonical[match[0]] if match else None
+
+
+def _check_run(index: EntityIndex, words: List[str], sentence_start: bool, heading: bool) -> tuple[List[dict], List[str]]:
+    """
+    Findings for one run of capitalized words, plus the canonical names it refers to.
+    """
+    words = [POSSESSIVE_RE.sub("", w) for w in words]
+    phrase = " ".join(words)
+    key = entity_key(phrase)
+    if key in index.canonical:
+        return [], [index.canonical[key]]
+    if key in index.variants:
+        canonical, kind = index.variants[key]
+        return [{"kind": kind, "text": phrase, "expected": canonical}], [canonical]
+
+    findings, names, unknown = [], [], []
+    for i, word in enumerate(words):
+        k = entity_key(word)
+        if k in index.canonical:
+            names.append(index.canonical[k])
+        elif k in index.variants:
+            canonical, kind = index.variants[k]
+            findings.append({"kind": kind, "text": word, "expected": canonical})
+            names.append(canonical)
+        elif k not in index.words:
+            unknown.append((i, word, k))
+
+    for i, word, k in unknown:
+        close = _close_name(index, k)
+        if close is not None:
+            findings.append({"kind": "misspelled", "text": word, "expected": close})
+            names.append(close)
+        elif not heading and not (i == 0 and sentence_start) and len(k) > 1 and k not in COMMON_WORDS:
+            findings.append({"kind": "unknown_name", "text": word, "expected": None})
+    return findings, names
+
+
+def _pronoun_findings(index: EntityIndex, sentence: str, names: List[str]) -> List[dict]:
+    # Only sentences naming a single person, who has configured pronouns, are judged
+    people = {n for n in names if n in index.people}
+    if len(people) != 1 or not people <= index.pronouns.keys():
+        return []
+    name = people.pop()
+    declared = index.pronouns[name]
+    words = WORD_RE.findall(sentence.lower())
+    findings = []
+    for group, forms in PRONOUN_SETS.items():
+        if group in declared:
+            continue
+        used = sorted(forms.intersection(words))
+        if used:
+            findings.append({"kind": "pronoun", "text": ", ".join(used), "expected": f"{name}: {'/'.join(sorted(declared))}"})
+    return findings
+
+
+def check_recap(index: EntityIndex, text: str) -> List[dict]:
+    """
+    Findings for one recap, each reported once per passage.
+    """
+    findings = []
+    for number, passage in enumerate(passages(text)):
+        seen = set()
+        for sentence, heading in _sentences(passage):
+            names: List[str] = []
+            found: List[dict] = []
+            for m in NAME_RUN_RE.finditer(sentence):
+                run_findings, run_names = _check_run(index, m.group(0).split(), m.start() == 0, heading)
+                found.extend(run_findings)
+                names.extend(run_names)
+            if not heading and not any(f["kind"] == "unknown_name" for f in found):
+                found.extend(_pronoun_findings(index, sentence, names))
+            for f in found:
+                if (f["kind"], f["text"]) not in seen:
+                    seen.add((f["kind"], f["text"]))
+                    findings.append({**f, "passage": number, "sentence": sentence[:SENTENCE_CHARS]})
+    return findings
+
+
+def local_qa(
+    gm_final: str,
+    player_final: str,
+    canon: dict,
+    location_map: dict,
+    profile: CampaignProfile | None = None,
+) -> dict:
+    """
+    Returns {"clean", "issues", "flagged"}: the findings per recap and the
+    text of every passage with at least one finding.
+    """
+    index = build_index(canon or {}, location_map or {}, profile or get_profile())
+    issues, flagged = [], []
+    for recap, text in (("gm_final", gm_final), ("player_final", player_final)):
+        found = check_recap(index, text)
+        issues.extend({"recap": recap, **f} for f in found)
+        paragraphs = passages(text)
+        for number in sorted({f["passage"] for f in found}):
+            flagged.append({"recap": recap, "passage": number, "text": paragraphs[number]})
+    return {"clean": not issues, "issues": issues, "flagged": flagged}
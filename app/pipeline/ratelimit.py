@@ -0,0 +1,143 @@
+import asyncio
+import random
+import re
+import time
+from typing import Dict, Mapping
+
+from app.config import (
+    DEFAULT_RATE_LIMIT,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+    MODEL_RATE_LIMITS,
+)
+
+
+class TokenBucket:
+    """
+    Requests-per-minute and tokens-per-minute budget for one model, refilled
+    continuously. Callers are served in arrival order. Lives on the client's
+    event loop (see app/models/openai_client.py) and is not thread-safe.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm, self.tpm = rpm, tpm
+        self.requests, self.tokens = float(rpm), float(tpm)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock: asyncio.Lock | None = None
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self.updated
+        self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+        self.updated = now
+
+    async def acquire(self, tokens: int) -> None:
+        # A single call bigger than the whole bucket still has to go through
+        tokens = min(tokens, self.tpm)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    wait = max((1 - self.requests) * 60 / self.rpm, (tokens - self.tokens) * 60 / self.tpm)
+                    if wait <= 0:
+                        self.requests -= 1
+                        self.tokens -= tokens
+                        return
+                await asyncio.sleep(wait)
+
+    def settle(self, estimated: int, actual: int) -> None:
+        """
+        Corrects the up-front charge once the real usage is known.
+        """
+        self._refill(time.monotonic())
+        self.tokens = min(self.tpm, self.tokens + estimated - actual)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Holds every caller of this model back, e.g. after a 429.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        """
+        Aligns the local budget with the server's x-ratelimit-* headers, which
+        also count usage by other processes sharing the key.
+        """
+        self._refill(time.monotonic())
+        remaining = headers.get("x-ratelimit-remaining-tokens")
+        if remaining is not None and remaining.isdigit():
+            self.tokens = min(self.tokens, float(remaining))
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is not None and remaining.isdigit():
+            self.requests = min(self.requests, float(remaining))
+            if int(remaining) == 0:
+                self.pause(parse_duration(headers.get("x-ratelimit-reset-requests")) or 1.0)
+
+
+_BUCKETS: Dict[str, TokenBucket] = {}
+
+
+def get_bucket(model: str) -> TokenBucket:
+    # Only touched from the client's event loop, so no lock is needed
+    bucket = _BUCKETS.get(model)
+    if bucket is None:
+        bucket = _BUCKETS[model] = TokenBucket(*MODEL_RATE_LIMITS.get(model, DEFAULT_RATE_LIMIT))
+    return bucket
+
+
+# --- Backoff ---
+
+# "1s", "6m0s", "20ms", "1h2m3.5s" (x-ratelimit-reset-* format)
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def parse_duration(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _UNIT_SECONDS[unit] for amount, unit in parts)
+
+
+def server_delay(headers: Mapping[str, str] | None) -> float | None:
+    """
+    How long the server asked us to wait, if it said: retry-after-ms,
+    Retry-After (seconds), or the later of the x-ratelimit-reset-* values.
+    """
+    if not headers:
+        return None
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    delay = parse_duration(headers.get("retry-after"))
+    if delay is not None:
+        return delay
+    resets = [parse_duration(headers.get(h)) for h in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+def backoff_delay(attempt: int, headers: Mapping[str, str] | None = None) -> float:
+    """
+    Seconds to wait before retry number `attempt` (1-based): what the server
+    asked for if anything, otherwise exponential backoff with jitter.
+    """
+    delay = server_delay(headers)
+    if delay is not None:
+        return min(delay, LLM_BACKOFF_MAX_SECONDS)
+    ceiling = min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1))
+    return random.uniform(ceiling / 2, ceiling)
@@ -0,0 +1,69 @@
+from typing import Callable, Dict, List
+
+from app.config import REDUCE_GROUP_TOKENS
+from app.pipeline.chunking import count_tokens
+from app.pipeline.parallel import map_ordered
+
+
+def measure(items: List[str]) -> int:
+    return sum(count_tokens(item) for item in items)
+
+
+def split_budget(budget: int, sizes: Dict[str, int]) -> Dict[str, int]:
+    """
+    Shares `budget` between inputs in proportion to their current size.
+    """
+    total = sum(sizes.values())
+    if total <= budget:
+        return dict(sizes)
+    return {name: budget * size // total for name, size in sizes.items()}
+
+
+def _groups(sizes: List[int], group_tokens: int) -> List[List[int]]:
+    """
+    Consecutive items packed into groups of at most `group_tokens`. If that
+    would leave every item alone, items are paired instead, so each level of
+    the reduction makes progress.
+    """
+    groups: List[List[int]] = []
+    total = 0
+    for i, size in enumerate(sizes):
+        if groups and total + size <= group_tokens:
+            groups[-1].append(i)
+            total += size
+        else:
+            groups.append([i])
+            total = size
+    if all(len(g) == 1 for g in groups):
+        groups = [list(range(i, min(i + 2, len(sizes)))) for i in range(0, len(sizes), 2)]
+    return groups
+
+
+def tree_reduce(
+    items: List[str],
+    merge: Callable[[List[str]], str],
+    budget: int,
+    group_tokens: int = REDUCE_GROUP_TOKENS,
+) -> dict:
+    """
+    Merges consecutive `items` with `merge` (one LLM call per group, groups
+    in parallel), level by level, until their total fits `budget` or one
+    item is left. Order is preserved; items that fit are returned as-is.
+
+    Returns {"items", "levels", "calls", "tokens_before", "tokens_after"}.
+    """
+    sizes = [count_tokens(item) for item in items]
+    report = {"levels": 0, "calls": 0, "tokens_before": sum(sizes)}
+
+    while len(items) > 1 and sum(sizes) > budget:
+        groups = _groups(sizes, group_tokens)
+        merged = map_ordered(
+            lambda group: items[group[0]] if len(group) == 1 else merge([items[i] for i in group]),
+            groups,
+        )
+        report["levels"] += 1
+        report["calls"] += sum(1 for g in groups if len(g) > 1)
+        sizes = [sizes[g[0]] if len(g) == 1 else count_tokens(item) for g, item in zip(groups, merged)]
+        items = merged
+
+    return {"items": items, **report, "tokens_after": sum(sizes)}
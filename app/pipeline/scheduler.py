@@ -0,0 +1,158 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import STAGE_CONCURRENCY
+from app.pipeline.checkpoints import CheckpointStore
+from app.pipeline.metrics import submit_with_context
+
+
+@dataclass
+class Stage:
+    """
+    A named pipeline step. `func` is called with the outputs of `inputs`,
+    positionally and in the declared order.
+    """
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+
+
+# progress(event, stage_name, data). The scheduler emits "started", "failed",
+# and "finished"/"restored" with the stage's value as data; stages may emit
+# their own events (e.g. per-chunk results, streamed tokens) the same way.
+ProgressCallback = Callable[[str, str, Any], None]
+
+
+@dataclass
+class StageRun:
+    results: Dict[str, Any]
+    timings: Dict[str, Tuple[float, float]] = field(default_factory=dict)
+    critical_path: List[str] = field(default_factory=list)
+    restored: List[str] = field(default_factory=list)
+
+    def summary(self) -> dict:
+        return {
+            "restored": self.restored,
+            "stages": {
+                name: {"start": round(start, 3), "end": round(end, 3), "seconds": round(end - start, 3)}
+                for name, (start, end) in self.timings.items()
+            },
+            "critical_path": self.critical_path,
+            "wall_seconds": round(max((end for _, end in self.timings.values()), default=0.0), 3),
+        }
+
+
+def _validate(stages: List[Stage], seeds: Dict[str, Any]) -> None:
+    names = set(seeds)
+    for stage in stages:
+        if stage.name in names:
+            raise ValueError(f"Duplicate stage name: {stage.name}")
+        names.add(stage.name)
+
+    for stage in stages:
+        missing = [i for i in stage.inputs if i not in names]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown inputs: {missing}")
+
+    # Kahn's algorithm: anything left over sits on a cycle
+    remaining = {s.name: set(s.inputs) - set(seeds) for s in stages}
+    while remaining:
+        ready = [n for n, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Stage graph has a cycle among: {sorted(remaining)}")
+        for n in ready:
+            del remaining[n]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+
+def _critical_path(stages: List[Stage], timings: Dict[str, Tuple[float, float]]) -> List[str]:
+    by_name = {s.name: s for s in stages}
+    if not timings:
+        return []
+
+    # Walk back from the last stage to finish through whichever input finished last
+    current = max(timings, key=lambda n: timings[n][1])
+    path = [current]
+    while True:
+        inputs = [i for i in by_name[current].inputs if i in timings]
+        if not inputs:
+            break
+        current = max(inputs, key=lambda n: timings[n][1])
+        path.append(current)
+
+    return list(reversed(path))
+
+
+def run_stages(
+    stages: List[Stage],
+    seeds: Dict[str, Any],
+    max_workers: int = STAGE_CONCURRENCY,
+    progress: Optional[ProgressCallback] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+    resume: bool = False,
+) -> StageRun:
+    """
+    Runs each stage as soon as all of its inputs are available.
+    `seeds` are precomputed values that stages may depend on.
+
+    With a checkpoint store, every completed stage is persisted; with
+    `resume`, stages that already have a checkpoint are loaded instead of run.
+    """
+    notify = progress or (lambda event, name, data=None: None)
+    _validate(stages, seeds)
+
+    results: Dict[str, Any] = dict(seeds)
+    timings: Dict[str, Tuple[float, float]] = {}
+    restored: List[str] = []
+    pending = list(stages)
+
+    if checkpoints is not None and resume:
+        for stage in list(pending):
+            if checkpoints.has(stage.name):
+                results[stage.name] = checkpoints.load(stage.name)
+                restored.append(stage.name)
+                pending.remove(stage)
+                notify("restored", stage.name, results[stage.name])
+    running = {}
+    t0 = time.perf_counter()
+
+    def _timed(stage: Stage, args: list):
+        start = time.perf_counter() - t0
+        notify("started", stage.name, None)
+        try:
+            value = stage.func(*args)
+        except Exception:
+            notify("failed", stage.name, None)
+            raise
+        if checkpoints is not None:
+            checkpoints.save(stage.name, value)
+        notify("finished", stage.name, value)
+        return value, start, time.perf_counter() - t0
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            for stage in [s for s in pending if all(i in results for i in s.inputs)]:
+                pending.remove(stage)
+                args = [results[i] for i in stage.inputs]
+                running[submit_with_context(pool, _timed, stage, args)] = stage
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage = running.pop(fut)
+                if fut.exception() is not None:
+                    for other in running:
+                        other.cancel()
+                    raise fut.exception()
+                value, start, end = fut.result()
+                results[stage.name] = value
+                timings[stage.name] = (start, end)
+
+    return StageRun(
+        results=results,
+        timings=timings,
+        critical_path=_critical_path(stages, timings),
+        restored=restored,
+    )
@@ -1,4 +1,7 @@
-from typing import Dict, List
+import time
+import uuid
+from functools import partial
+from typing import Callable, Dict, List
 import json
 
 from app.pipeline.postprocess import save_outputs
@@ -6,7 +9,9 @@ from app.pipeline.utils import (
     fuzzy_replace_real_names_with_characters,
     load_prompt,
     format_prompt,
-    normalize_locations
+    normalize_locations,
+    prompt_templates_hash,
+    ExactStreamRewriter,
 )
 from app.config import (
     MODEL_ANALYTICAL,
@@ -15,38 +20,139 @@ from app.config import (
     MODEL_GM_FINAL,
     MODEL_PLAYER_FINAL,
     MODEL_QA,
-    CHARACTER_ALIASES,  # from your existing config / characters.json
-    CHARACTER_PRONOUNS,
-    CHARACTER_DATA,
+    KEEP_CHECKPOINTS_ON_SUCCESS,
+    CHUNK_OVERLAP_TOKENS,
+    CHUNK_SCENE_GAP_SECONDS,
+    CHUNK_STRATEGY,
+    COMPACTION_BACKCHANNELS,
+    COMPACTION_DISCOURSE_FILLERS,
+    COMPACTION_DISFLUENCIES,
+    COMPACTION_ENABLED,
+    COMPACTION_MAX_REPEAT_WORDS,
+    COMPACTION_OOC_PATTERNS,
+    COMPACTION_STUTTER_WORDS,
+    EXTRACTION_MODE,
+    FUSED_CHUNK_CALLS,
+    MAX_CHUNK_TOKENS,
+    QA_IGNORED_NAMES,
+    QA_INPUT_BUDGET,
+    QA_MODE,
+    QA_NAME_SIMILARITY,
+    REDUCE_GROUP_TOKENS,
+    SYNTHESIS_INPUT_BUDGET,
 )
-from app.pipeline.chunking import chunk_text
-from app.pipeline.models import chat_completion
-
-def replace_real_names_with_characters(text: str) -> str:
-    for canonical, info in CHARACTER_DATA["characters"].items():
-        aliases = info.get("aliases", [])
-        for alias in aliases:
-            text = text.replace(alias, canonical)
-    return text
+from app.pipeline.campaign import campaign_hints, enrich_canon, get_campaign_store, load_known
+from app.pipeline.checkpoints import CheckpointStore, options_hash, transcript_hash
+from app.pipeline.chunking import chunk_text, count_tokens
+from app.pipeline.compaction import compact_transcript
+from app.pipeline.incremental import ChunkReuse, get_chunk_store
+from app.pipeline.merge import merge_canon, merge_timelines
+from app.pipeline.metrics import CHUNK_FALLBACKS, RUN_SECONDS, RUNS, STAGE_SECONDS, trace_run
+from app.pipeline.models import ChatRequest, chat_completion
+from app.pipeline.parallel import map_ordered
+from app.pipeline.profiles import CampaignProfile, get_profile
+from app.pipeline.qa_local import local_qa
+from app.pipeline.reduce import measure, split_budget, tree_reduce
+from app.pipeline.scheduler import ProgressCallback, Stage, StageRun, run_stages
+
+def replace_real_names_with_characters(text: str, profile: CampaignProfile | None = None) -> str:
+    return (profile or get_profile()).resolver.replace_exact(text)
 
 # --- Chunk-level steps ---
 
-def summarize_chunk_analytical(chunk: str) -> str:
+# Each step is split into a *_request builder and the call itself, so the
+# Batch API mode (app/pipeline/batch.py) sends exactly the same prompts.
+
+def analytical_request(chunk: str) -> ChatRequest:
     template = load_prompt("gm_analytical.txt")
     prompt = format_prompt(template, chunk=chunk)
-    return chat_completion(MODEL_ANALYTICAL, prompt, temperature=0.2)
+    return ChatRequest(MODEL_ANALYTICAL, prompt, 0.2, "chunk_analytical")
 
 
-def summarize_chunk_narrative(chunk: str) -> str:
+def narrative_request(chunk: str) -> ChatRequest:
     template = load_prompt("narrative_digest.txt")
     prompt = format_prompt(template, chunk=chunk)
-    return chat_completion(MODEL_NARRATIVE, prompt, temperature=0.5)
+    return ChatRequest(MODEL_NARRATIVE, prompt, 0.5, "chunk_narrative")
 
 
-def extract_actions(chunk_digest: str) -> str:
+def actions_request(chunk_digest: str) -> ChatRequest:
     template = load_prompt("narrative_action_extract.txt")
     prompt = format_prompt(template, chunk_digest=chunk_digest)
-    return chat_completion(MODEL_NARRATIVE, prompt, temperature=0.3)
+    return ChatRequest(MODEL_NARRATIVE, prompt, 0.3, "chunk_actions")
+
+
+def summarize_chunk_analytical(chunk: str) -> str:
+    return analytical_request(chunk).run()
+
+
+def summarize_chunk_narrative(chunk: str) -> str:
+    return narrative_request(chunk).run()
+
+
+def extract_actions(chunk_digest: str) -> str:
+    return actions_request(chunk_digest).run()
+
+
+def summarize_chunk_story(chunk: str) -> tuple[str, str]:
+    """
+    Narrative digest for a chunk, chained straight into its action log.
+    """
+    digest = summarize_chunk_narrative(chunk)
+    return digest, extract_actions(digest)
+
+
+# --- Fused chunk call (FUSED_CHUNK_CALLS) ---
+
+CHUNK_FUSED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "analytical_summary": {"type": "string"},
+        "narrative_digest": {"type": "string"},
+        "action_log": {"type": "string"},
+    },
+    "required": ["analytical_summary", "narrative_digest", "action_log"],
+    "additionalProperties": False,
+}
+
+
+def fused_request(chunk: str) -> ChatRequest:
+    template = load_prompt("chunk_fused.txt")
+    prompt = format_prompt(template, chunk=chunk)
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {"name": "chunk_outputs", "strict": True, "schema": CHUNK_FUSED_SCHEMA},
+    }
+    return ChatRequest(MODEL_ANALYTICAL, prompt, 0.3, "chunk_fused", response_format)
+
+
+def parse_fused(text: str) -> tuple[str, list[str]]:
+    """
+    Validates a fused response against CHUNK_FUSED_SCHEMA.
+    Returns (analytical summary, [narrative digest, action log]).
+    """
+    data = safe_json_loads(text)
+    if not isinstance(data, dict):
+        raise ValueError("Fused chunk response is not a JSON object.")
+    invalid = [
+        key for key in CHUNK_FUSED_SCHEMA["required"]
+        if not isinstance(data.get(key), str) or not data[key].strip()
+    ]
+    if invalid:
+        raise ValueError(f"Fused chunk response has missing or empty fields: {invalid}")
+    return data["analytical_summary"], [data["narrative_digest"], data["action_log"]]
+
+
+def summarize_chunk_fused(chunk: str) -> tuple[str, list[str]]:
+    """
+    All three chunk outputs from one call. If the response does not validate,
+    this chunk (only) falls back to the three-call path.
+    """
+    try:
+        return parse_fused(fused_request(chunk).run())
+    except ValueError:
+        CHUNK_FALLBACKS.inc()
+        return summarize_chunk_analytical(chunk), list(summarize_chunk_story(chunk))
+
 
 def safe_json_loads(text: str):
     if not text or not text.strip():
@@ -69,18 +175,34 @@ def safe_json_loads(text: str):
 
 # --- New: canon & timeline extraction ---
 
-def extract_canon(transcript: str) -> dict:
+def canon_request(transcript: str, known_entities: str = "{}", profile: CampaignProfile | None = None) -> ChatRequest:
+    """
+    `known_entities` is the campaign's compact hint JSON (`campaign_hints`);
+    character hints come from the campaign profile.
+    """
     template = load_prompt("canon_extract.txt")
-    hints = json.dumps({
-    "aliases": CHARACTER_ALIASES,
-    "pronouns": CHARACTER_PRONOUNS
-}, ensure_ascii=False)
     prompt = format_prompt(
         template,
         raw_transcript=transcript,
-        character_hints=hints,
+        character_hints=(profile or get_profile()).character_hints,
+        known_entities=known_entities,
     )
-    response = chat_completion(MODEL_ANALYTICAL, prompt, temperature=0.0)
+    return ChatRequest(MODEL_ANALYTICAL, prompt, 0.0, "canon")
+
+
+def timeline_request(transcript: str, canon: dict) -> ChatRequest:
+    template = load_prompt("timeline_extract.txt")
+    canon_json = json.dumps(canon, ensure_ascii=False)
+    prompt = format_prompt(
+        template,
+        raw_transcript=transcript,
+        canon=canon_json,
+    )
+    return ChatRequest(MODEL_ANALYTICAL, prompt, 0.0, "timeline")
+
+
+def extract_canon(transcript: str, known_entities: str = "{}", profile: CampaignProfile | None = None) -> dict:
+    response = canon_request(transcript, known_entities, profile).run()
 
     try:
         return safe_json_loads(response)
@@ -92,15 +214,49 @@ def extract_timeline(transcript: str, canon: dict) -> dict:
     """
     Use the full transcript and canonical entities to build a factual timeline.
     """
-    template = load_prompt("timeline_extract.txt")
-    canon_json = json.dumps(canon, ensure_ascii=False)
-    prompt = format_prompt(
-        template,
-        raw_transcript=transcript,
-        canon=canon_json,
-    )
-    response = chat_completion(MODEL_ANALYTICAL, prompt, temperature=0.0)
-    return safe_json_loads(response)
+    return safe_json_loads(timeline_request(transcript, canon).run())
+
+
+def extract_chunk_canon_timeline(
+    chunk: str,
+    known_entities: str = "{}",
+    profile: CampaignProfile | None = None,
+) -> tuple[dict, dict]:
+    """
+    Canon and timeline fragments for one chunk (chunked extraction mode).
+    The fragments are merged by `merge_canon` / `merge_timelines`.
+    """
+    canon = extract_canon(chunk, known_entities, profile)
+    return canon, extract_timeline(chunk, canon)
+
+
+def use_chunked_extraction(chunks: List[str], mode: str = EXTRACTION_MODE) -> bool:
+    # "auto" goes by the chunks the run already cut, so sizing the transcript
+    # costs no extra encoding
+    if mode not in ("single", "chunked", "auto"):
+        raise ValueError(f"Unknown EXTRACTION_MODE: {mode!r}")
+    if mode == "auto":
+        return len(chunks) > 1
+    return mode == "chunked"
+
+# --- Merging synthesis inputs (tree reduction, see app/pipeline/reduce.py) ---
+
+def merge_analytical_summaries(summaries: List[str]) -> str:
+    template = load_prompt("gm_merge.txt")
+    prompt = format_prompt(template, analytical_summaries="\n\n".join(summaries))
+    return chat_completion(MODEL_ANALYTICAL, prompt, temperature=0.2, stage="merge_analytical")
+
+
+def merge_narrative_digests(digests: List[str]) -> str:
+    template = load_prompt("narrative_merge.txt")
+    prompt = format_prompt(template, narrative_digests="\n\n".join(digests))
+    return chat_completion(MODEL_NARRATIVE, prompt, temperature=0.4, stage="merge_narrative")
+
+
+def merge_action_logs(action_logs: List[str]) -> str:
+    template = load_prompt("action_merge.txt")
+    prompt = format_prompt(template, action_logs="\n\n".join(action_logs))
+    return chat_completion(MODEL_NARRATIVE, prompt, temperature=0.2, stage="merge_actions")
 
 # --- Synthesis & finals ---
 
@@ -108,7 +264,7 @@ def synthesize_gm_document(analytical_summaries: List[str]) -> str:
     combined = "\n\n".join(analytical_summaries)
     template = load_prompt("gm_synthesis.txt")
     prompt = format_prompt(template, analytical_summaries=combined)
-    return chat_completion(MODEL_SYNTHESIS, prompt, temperature=0.2)
+    return chat_completion(MODEL_SYNTHESIS, prompt, temperature=0.2, stage="gm_synthesis")
 
 
 def synthesize_narrative_document(
@@ -133,19 +289,19 @@ def synthesize_narrative_document(
         action_logs=actions_text,
         canon_entities=canon_text,
     )
-    return chat_completion(MODEL_SYNTHESIS, prompt, temperature=0.3)
+    return chat_completion(MODEL_SYNTHESIS, prompt, temperature=0.3, stage="narrative_synthesis")
 
 
-def produce_gm_final(gm_synthesis: str) -> str:
+def produce_gm_final(gm_synthesis: str, on_token: Callable[[str], None] | None = None) -> str:
     template = load_prompt("gm_final.txt")
     prompt = format_prompt(template, gm_synthesis=gm_synthesis)
-    return chat_completion(MODEL_GM_FINAL, prompt, temperature=0.2)
+    return chat_completion(MODEL_GM_FINAL, prompt, temperature=0.2, stage="gm_final", on_token=on_token)
 
 
-def produce_player_story(narrative_synthesis: str) -> str:
+def produce_player_story(narrative_synthesis: str, on_token: Callable[[str], None] | None = None) -> str:
     template = load_prompt("player_story.txt")
     prompt = format_prompt(template, narrative_synthesis=narrative_synthesis)
-    return chat_completion(MODEL_PLAYER_FINAL, prompt, temperature=0.8)
+    return chat_completion(MODEL_PLAYER_FINAL, prompt, temperature=0.8, stage="player_final", on_token=on_token)
 
 
 def qa_check(
@@ -164,76 +320,567 @@ def qa_check(
         analytical_summaries=analytical_combined,
         narrative_digests=narrative_combined,
     )
-    return chat_completion(MODEL_QA, prompt, temperature=0.0)
+    return chat_completion(MODEL_QA, prompt, temperature=0.0, stage="qa")
 
 
-def run_pipeline(transcript: str, source_name: str | None = None) -> Dict:
-    # Step 0: normalize character names first
-    transcript = fuzzy_replace_real_names_with_characters(transcript)
+def qa_flagged_check(local: dict, canon: dict) -> str:
+    """
+    LLM QA over only the passages the local pre-check flagged; skipped (with
+    a one-line report) when nothing was flagged.
+    """
+    if local["clean"]:
+        return "Local QA pre-check found no issues; LLM QA skipped."
+    findings = [{k: v for k, v in issue.items() if k != "sentence"} for issue in local["issues"]]
+    passages = "\n\n".join(f"[{p['recap']} #{p['passage']}]\n{p['text']}" for p in local["flagged"])
+    template = load_prompt("qa_flagged.txt")
+    prompt = format_prompt(
+        template,
+        canon=json.dumps(canon, ensure_ascii=False),
+        findings=json.dumps(findings, ensure_ascii=False),
+        passages=passages,
+    )
+    return chat_completion(MODEL_QA, prompt, temperature=0.0, stage="qa")
+
+
+# --- Stage graph ---
+
+def normalize_transcript(
+    transcript: str,
+    known_locations: List[str] | None = None,
+    profile: CampaignProfile | None = None,
+    location_map: dict | None = None,
+) -> tuple[str, dict]:
+    # Character names first, then locations (the profile's own locations
+    # anchor normalization alongside the campaign store's)
+    profile = profile or get_profile()
+    transcript = fuzzy_replace_real_names_with_characters(transcript, profile.resolver)
+    return normalize_locations(
+        transcript, profile.character_names, [*profile.locations, *(known_locations or [])], location_map
+    )
+
+
+# An incremental run's `prefix` is the `find_prefix` match for its transcript:
+# the prefix keeps the location map, prepared text and chunks its own run
+# produced, and only the text after it is normalized, compacted and chunked.
+
+def appended_text(transcript: str, prefix: dict | None) -> str:
+    return transcript[prefix["length"]:] if prefix else transcript
+
+
+def join_prefix(prefix: dict | None, text: str) -> str:
+    if not prefix:
+        return text
+    return "\n".join(part for part in (prefix["prepared"]["text"].rstrip("\n"), text.lstrip("\n")) if part)
 
-    character_names = list(CHARACTER_ALIASES.keys())
 
-    # 1) Normalize names (uses characters.json via CHARACTER_ALIASES)
-    transcript, location_map = normalize_locations(transcript, character_names)
+def prefix_chunks(prefix: dict | None, text: str) -> List[str]:
+    if not prefix:
+        return chunk_text(text)
+    return [*prefix["prepared"]["chunks"], *(chunk_text(text) if text.strip() else [])]
 
-    # 2) Extract canon (characters, locations, items, creatures) from full transcript
-    canon = extract_canon(transcript)
 
+def prefix_location_map(prefix: dict | None, location_map: dict) -> dict:
+    return {**prefix["prepared"]["location_map"], **location_map} if prefix else location_map
+
+
+def prepare_transcript(
+    transcript: str,
+    known: dict | None = None,
+    profile: CampaignProfile | None = None,
+    prefix: dict | None = None,
+    compaction: bool = COMPACTION_ENABLED,
+) -> dict:
+    """
+    The prepared text, chunks and location map `run_pipeline` produces for a
+    raw transcript (same normalization, compaction and chunking), for work
+    done outside the graph and for the transcript index.
+    """
+    location_map = prefix["prepared"]["location_map"] if prefix else None
+    text, locations = normalize_transcript(
+        appended_text(transcript, prefix), (known or {}).get("locations"), profile, location_map
+    )
+    if compaction:
+        text, _ = compact_transcript(text)
+    return {
+        "text": join_prefix(prefix, text),
+        "chunks": prefix_chunks(prefix, text),
+        "location_map": prefix_location_map(prefix, locations),
+    }
 
-    # 3) Extract timeline from full transcript using canon
-    timeline_data = extract_timeline(transcript, canon)
-    timeline = timeline_data.get("timeline", [])
-    simultaneous_events = timeline_data.get("simultaneous_events", {})
 
-    # 4) Chunk for per-piece analysis/summaries
-    chunks = chunk_text(transcript)
+def transcript_chunks(
+    transcript: str,
+    known: dict | None = None,
+    profile: CampaignProfile | None = None,
+    prefix: dict | None = None,
+) -> List[str]:
+    return prepare_transcript(transcript, known, profile, prefix)["chunks"]
 
-    analytical: List[str] = []
-    action_logs: List[str] = []
-    narrative_digests: List[str] = []
 
-    for ch in chunks:
-        analytical.append(summarize_chunk_analytical(ch))
+def _gm_final(
+    gm_synth: str,
+    on_token: Callable[[str], None] | None = None,
+    profile: CampaignProfile | None = None,
+) -> str:
+    # Streamed deltas get the same name replacement as the finished text, so
+    # real player names never reach /events subscribers
+    profile = profile or get_profile()
+    stream = ExactStreamRewriter(profile.resolver, on_token) if on_token is not None else None
+    text = produce_gm_final(gm_synth, on_token=stream.feed if stream is not None else None)
+    if stream is not None:
+        stream.close()
+    return replace_real_names_with_characters(text, profile)
 
-        digest = summarize_chunk_narrative(ch)
-        narrative_digests.append(digest)
 
-        actions = extract_actions(digest)
-        action_logs.append(actions)
+def _story_budgets(timeline_data: dict, chunk_story: list, canon: dict) -> Dict[str, int]:
+    """
+    Splits what SYNTHESIS_INPUT_BUDGET leaves after the timeline and canon
+    between the digests and the action logs.
+    """
+    fixed = count_tokens(json.dumps(timeline_data, ensure_ascii=False)) + count_tokens(json.dumps(canon, ensure_ascii=False))
+    sizes = {
+        "digests": measure([digest for digest, _ in chunk_story]),
+        "actions": measure([actions for _, actions in chunk_story]),
+    }
+    return split_budget(max(SYNTHESIS_INPUT_BUDGET - fixed, REDUCE_GROUP_TOKENS), sizes)
 
-    # 5) GM synthesis from analytical summaries
-    gm_synth = synthesize_gm_document(analytical)
 
-    # 6) Narrative synthesis from timeline + canon + chunk outputs
-    narrative_synth = synthesize_narrative_document(
-        timeline=timeline,
-        simultaneous_events=simultaneous_events,
-        narrative_digests=narrative_digests,
-        action_logs=action_logs,
+def _narrative_synthesis(timeline_data: dict, digests: dict, actions: dict, canon: dict) -> str:
+    return synthesize_narrative_document(
+        timeline=timeline_data.get("timeline", []),
+        simultaneous_events=timeline_data.get("simultaneous_events", {}),
+        narrative_digests=digests["items"],
+        action_logs=actions["items"],
         canon=canon,
     )
 
-    # 7) Final outputs
-    gm_final_raw = produce_gm_final(gm_synth)
-    gm_final = replace_real_names_with_characters(gm_final_raw)
-    player_final = produce_player_story(narrative_synth)
-    qa = qa_check(gm_final, player_final, analytical, narrative_digests)
+
+def _qa(gm_final: str, player_final: str, analytical: dict, digests: dict) -> str:
+    # The synthesis-level reductions, merged further if the finals leave
+    # less room than QA_INPUT_BUDGET
+    analytical, digests = analytical["items"], digests["items"]
+    room = max(QA_INPUT_BUDGET - count_tokens(gm_final) - count_tokens(player_final), REDUCE_GROUP_TOKENS)
+    budgets = split_budget(room, {"analytical": measure(analytical), "digests": measure(digests)})
+    analytical = tree_reduce(analytical, merge_analytical_summaries, budgets["analytical"])["items"]
+    digests = tree_reduce(digests, merge_narrative_digests, budgets["digests"])["items"]
+    return qa_check(gm_final, player_final, analytical, digests)
+
+
+# Stages whose values are worth pushing to clients as they complete.
+# The rest (normalized transcript, chunks, ...) are internal plumbing.
+STREAMED_STAGES = {
+    "canon",
+    "timeline",
+    "location_map",
+    "chunk_analytical",
+    "chunk_story",
+    "gm_synthesis",
+    "narrative_synthesis",
+    "gm_final",
+    "player_final",
+    "qa_local",
+    "qa",
+}
+
+
+def build_stages(
+    chunk_reuse: ChunkReuse | None = None,
+    progress: ProgressCallback | None = None,
+    extraction_mode: str = EXTRACTION_MODE,
+    fused_chunks: bool = FUSED_CHUNK_CALLS,
+    compaction: bool = COMPACTION_ENABLED,
+    known: dict | None = None,
+    profile: CampaignProfile | None = None,
+    qa_mode: str = QA_MODE,
+    prefix: dict | None = None,
+) -> List[Stage]:
+    """
+    The pipeline as a DAG. Each stage starts as soon as its inputs exist, so
+    canon/timeline, chunk work and the GM and player branches overlap.
+
+    When `extraction_mode` calls for it (`use_chunked_extraction` on the
+    chunks), canon and timeline are extracted per chunk in parallel and
+    merged locally instead of from one whole-transcript prompt;
+    "chunk_extraction" is None otherwise.
+    With `fused_chunks`, each chunk is sent once (`summarize_chunk_fused`) and
+    chunk_analytical / chunk_story are split out of the combined result.
+    With `compaction`, filler and table talk are stripped from the normalized
+    transcript before anything reads it.
+    Summaries, digests and action logs over the synthesis token budget are
+    merged in a parallel tree reduction before synthesis and QA.
+    `known` is the campaign's entity snapshot (`load_known`): its locations
+    anchor location normalization and its entities are hints for canon.
+    `profile` is the campaign profile (character map); default: characters.json.
+    With `qa_mode` "local", the final recaps are checked locally
+    (`app.pipeline.qa_local`) and only flagged passages go to the LLM QA
+    call; "full" sends the recaps with all summaries and digests.
+    With `prefix` (an earlier run over the start of this transcript, see
+    `ChunkStore.find_prefix`), its location map, prepared text and chunks
+    are kept as they were and only the appended text is prepared.
+
+    With `progress`, chunk stages report each chunk as it completes ("chunk"
+    events) and the final recaps stream their text deltas ("token" events).
+    """
+    analytical_fn = summarize_chunk_analytical
+    story_fn = summarize_chunk_story
+    profile = profile or get_profile()
+    hints = campaign_hints(known)
+    extraction_fn = partial(extract_chunk_canon_timeline, known_entities=hints, profile=profile)
+    fused_fn = summarize_chunk_fused
+    if chunk_reuse is not None:
+        namespaces = chunk_namespaces(profile, hints)
+        analytical_fn = chunk_reuse.wrap("analytical", analytical_fn, namespaces["analytical"])
+        story_fn = chunk_reuse.wrap("story", story_fn, namespaces["story"])
+        extraction_fn = chunk_reuse.wrap("canon_timeline", extraction_fn, namespaces["canon_timeline"])
+        fused_fn = chunk_reuse.wrap_split(("analytical", "story"), fused_fn, namespaces["analytical"])
+
+    def per_chunk(stage: str):
+        if progress is None:
+            return None
+        return lambda index, value: progress("chunk", stage, {"index": index, "value": value})
+
+    def tokens(stage: str):
+        if progress is None:
+            return None
+        return lambda delta: progress("token", stage, delta)
+
+    # With a `prefix`, "normalized" and "compacted" cover only the text
+    # after it; "transcript", "chunks" and "location_map" are the whole session
+    prepared = "compacted" if compaction else "normalized"
+    preparation = [
+        *([Stage("compacted", lambda n: compact_transcript(n[0]), ("normalized",))] if compaction else []),
+        Stage("transcript", lambda p: join_prefix(prefix, p[0]), (prepared,)),
+        Stage("chunks", lambda p: prefix_chunks(prefix, p[0]), (prepared,)),
+    ]
+
+    def chunk_extraction(chunks: List[str]) -> list | None:
+        if not use_chunked_extraction(chunks, extraction_mode):
+            return None
+        return map_ordered(extraction_fn, chunks, on_result=per_chunk("chunk_extraction"))
+
+    def canon_stage(parts: list | None, transcript: str) -> dict:
+        if parts is None:
+            found = extract_canon(transcript, hints, profile)
+        else:
+            found = merge_canon([part for part, _ in parts], profile.character_names)
+        return enrich_canon(found, known, profile.character_names)
+
+    def timeline_stage(parts: list | None, transcript: str, canon: dict) -> dict:
+        if parts is None:
+            return extract_timeline(transcript, canon)
+        return merge_timelines([tl for _, tl in parts])
+
+    extraction = [
+        Stage("chunk_extraction", chunk_extraction, ("chunks",)),
+        Stage("canon", canon_stage, ("chunk_extraction", "transcript")),
+        Stage("timeline", timeline_stage, ("chunk_extraction", "transcript", "canon")),
+    ]
+
+    if fused_chunks:
+        on_analytical, on_story = per_chunk("chunk_analytical"), per_chunk("chunk_story")
+
+        def on_fused(index: int, value: tuple) -> None:
+            on_analytical(index, value[0])
+            on_story(index, value[1])
+
+        on_result = on_fused if progress is not None else None
+        chunk_work = [
+            Stage("chunk_fused", lambda chunks: map_ordered(fused_fn, chunks, on_result=on_result), ("chunks",)),
+            Stage("chunk_analytical", lambda fused: [a for a, _ in fused], ("chunk_fused",)),
+            Stage("chunk_story", lambda fused: [story for _, story in fused], ("chunk_fused",)),
+        ]
+    else:
+        chunk_work = [
+            Stage(
+                "chunk_analytical",
+                lambda chunks: map_ordered(analytical_fn, chunks, on_result=per_chunk("chunk_analytical")),
+                ("chunks",),
+            ),
+            Stage(
+                "chunk_story",
+                lambda chunks: map_ordered(story_fn, chunks, on_result=per_chunk("chunk_story")),
+                ("chunks",),
+            ),
+        ]
+
+    # Synthesis inputs are merged down to SYNTHESIS_INPUT_BUDGET first
+    # (a no-op while they fit)
+    reduction = [
+        Stage(
+            "gm_reduced",
+            lambda analytical: tree_reduce(analytical, merge_analytical_summaries, SYNTHESIS_INPUT_BUDGET),
+            ("chunk_analytical",),
+        ),
+        Stage("story_budget", _story_budgets, ("timeline", "chunk_story", "canon")),
+        Stage(
+            "digests_reduced",
+            lambda story, budget: tree_reduce([d for d, _ in story], merge_narrative_digests, budget["digests"]),
+            ("chunk_story", "story_budget"),
+        ),
+        Stage(
+            "actions_reduced",
+            lambda story, budget: tree_reduce([a for _, a in story], merge_action_logs, budget["actions"]),
+            ("chunk_story", "story_budget"),
+        ),
+    ]
+
+    if qa_mode == "local":
+        qa = Stage("qa", qa_flagged_check, ("qa_local", "canon"))
+    elif qa_mode == "full":
+        qa = Stage("qa", _qa, ("gm_final", "player_final", "gm_reduced", "digests_reduced"))
+    else:
+        raise ValueError(f"Unknown QA_MODE: {qa_mode!r}")
+
+    return [
+        Stage(
+            "normalized",
+            lambda raw: normalize_transcript(
+                appended_text(raw, prefix),
+                (known or {}).get("locations"),
+                profile,
+                prefix["prepared"]["location_map"] if prefix else None,
+            ),
+            ("raw_transcript",),
+        ),
+        *preparation,
+        Stage("location_map", lambda n: prefix_location_map(prefix, n[1]), ("normalized",)),
+        *extraction,
+        *chunk_work,
+        *reduction,
+        Stage("gm_synthesis", lambda reduced: synthesize_gm_document(reduced["items"]), ("gm_reduced",)),
+        Stage("narrative_synthesis", _narrative_synthesis, ("timeline", "digests_reduced", "actions_reduced", "canon")),
+        Stage("gm_final", partial(_gm_final, on_token=tokens("gm_final"), profile=profile), ("gm_synthesis",)),
+        Stage("player_final", partial(produce_player_story, on_token=tokens("player_final")), ("narrative_synthesis",)),
+        Stage(
+            "qa_local",
+            partial(local_qa, profile=profile),
+            ("gm_final", "player_final", "canon", "location_map"),
+        ),
+        qa,
+    ]
+
+
+# --- Run keys ---
+
+CHUNK_PROMPTS = [
+    "gm_analytical.txt",
+    "narrative_digest.txt",
+    "narrative_action_extract.txt",
+    "chunk_fused.txt",
+    "canon_extract.txt",
+    "timeline_extract.txt",
+]
+
+
+def _profile_options(profile: CampaignProfile) -> dict:
+    return {"characters": profile.character_hints, "locations": profile.locations}
+
+
+def chunk_namespaces(profile: CampaignProfile, hints: str) -> Dict[str, str]:
+    """
+    Chunk store namespace per kind of chunk output: a hash of everything the
+    output depends on besides the chunk text (models, prompts, character map
+    and, for canon/timeline, the campaign hints), so stored outputs are never
+    reused across configurations or campaigns.
+    """
+    chunk = options_hash({
+        "models": [MODEL_ANALYTICAL, MODEL_NARRATIVE],
+        "prompts": prompt_templates_hash(CHUNK_PROMPTS),
+        "profile": _profile_options(profile),
+    })
+    canon = options_hash({"chunk": chunk, "known_entities": hints})
+    return {"analytical": chunk, "story": chunk, "canon_timeline": canon}
+
+
+def _preparation_options(profile: CampaignProfile) -> dict:
+    return {
+        "profile": _profile_options(profile),
+        "chunking": [MAX_CHUNK_TOKENS, CHUNK_STRATEGY, CHUNK_OVERLAP_TOKENS, CHUNK_SCENE_GAP_SECONDS],
+        "compaction": COMPACTION_ENABLED and [
+            COMPACTION_MAX_REPEAT_WORDS,
+            COMPACTION_DISFLUENCIES,
+            COMPACTION_DISCOURSE_FILLERS,
+            COMPACTION_BACKCHANNELS,
+            COMPACTION_OOC_PATTERNS,
+            COMPACTION_STUTTER_WORDS,
+        ],
+    }
+
+
+def preparation_hash(profile: CampaignProfile) -> str:
+    """
+    Hash of the settings a transcript's prepared text and chunks depend on
+    (campaign known locations aside, which only steer the appended text);
+    an incremental run only extends a prefix prepared under the same hash.
+    """
+    return options_hash(_preparation_options(profile))
+
+
+def _run_options(
+    campaign_id: str | None,
+    known: dict | None,
+    profile: CampaignProfile,
+    prefix: dict | None,
+) -> dict:
+    """
+    Everything a run's stage outputs depend on besides the transcript; part
+    of the checkpoint key, so `resume` never mixes configurations.
+    """
+    return {
+        "campaign_id": campaign_id,
+        "known": known,
+        **_preparation_options(profile),
+        "prefix": prefix["transcript_hash"] if prefix else None,
+        "models": [MODEL_ANALYTICAL, MODEL_NARRATIVE, MODEL_SYNTHESIS, MODEL_GM_FINAL, MODEL_PLAYER_FINAL, MODEL_QA],
+        "prompts": prompt_templates_hash(),
+        "extraction": EXTRACTION_MODE,
+        "fused_chunks": FUSED_CHUNK_CALLS,
+        "budgets": [SYNTHESIS_INPUT_BUDGET, QA_INPUT_BUDGET, REDUCE_GROUP_TOKENS],
+        "qa": [QA_MODE, QA_NAME_SIMILARITY, QA_IGNORED_NAMES],
+    }
+
+
+def _assemble_result(
+    run: StageRun,
+    source_name: str | None,
+    key: str,
+    incremental: bool,
+    parent: dict | None,
+    chunk_reuse: ChunkReuse,
+) -> Dict:
+    out = run.results
+
+    chunk_story = out["chunk_story"]
 
     result = {
         "source": source_name,
-        "chunk_count": len(chunks),
-        "canon": canon,
-        "timeline": timeline,
-        "simultaneous_events": simultaneous_events,
-        "chunk_analytical_summaries": analytical,
-        "chunk_narrative_digests": narrative_digests,
-        "chunk_action_logs": action_logs,
-        "gm_synthesis": gm_synth,
-        "player_synthesis": narrative_synth,
-        "gm_final_summary": gm_final,
-        "player_final_story": player_final,
-        "qa_report": qa,
+        "transcript_hash": key,
+        "chunk_count": len(out["chunks"]),
+        "extraction_mode": "single" if out["chunk_extraction"] is None else "chunked",
+        "compaction": out["compacted"][1] if "compacted" in out else None,
+        "canon": out["canon"],
+        "timeline": out["timeline"].get("timeline", []),
+        "simultaneous_events": out["timeline"].get("simultaneous_events", {}),
+        "chunk_analytical_summaries": out["chunk_analytical"],
+        "chunk_narrative_digests": [digest for digest, _ in chunk_story],
+        "chunk_action_logs": [actions for _, actions in chunk_story],
+        "gm_synthesis": out["gm_synthesis"],
+        "player_synthesis": out["narrative_synthesis"],
+        "gm_final_summary": out["gm_final"],
+        "player_final_story": out["player_final"],
+        "qa_report": out["qa"],
+        "qa_local": out["qa_local"],
+        "reduction": {
+            name: {k: v for k, v in out[f"{name}_reduced"].items() if k != "items"}
+            for name in ("gm", "digests", "actions")
+        },
+        "schedule": run.summary(),
+        "incremental": {
+            "enabled": incremental,
+            "extends": {k: v for k, v in parent.items() if k != "prepared"} if parent else None,
+            "reused": dict(chunk_reuse.reused),
+            "computed": dict(chunk_reuse.computed),
+        },
     }
+    return result
+
 
-    save_outputs(result, source_name)
+def run_pipeline(
+    transcript: str,
+    source_name: str | None = None,
+    progress: ProgressCallback | None = None,
+    resume: bool = False,
+    incremental: bool = False,
+    campaign_id: str | None = None,
+    known: dict | None = None,
+    run_id: str | None = None,
+    profile: CampaignProfile | None = None,
+) -> Dict:
+    """
+    Every stage is checkpointed under the transcript hash and a hash of the
+    run options (campaign, profile, models, prompts, settings). With
+    `resume`, stages completed by the latest earlier (failed) run with the
+    same key are reloaded, not recomputed.
+
+    With `incremental`, chunk-level outputs for chunks whose text is unchanged
+    since an earlier run (e.g. the first part of a session uploaded in parts)
+    are reused, and only new chunks go to the model before re-synthesis; the
+    run's own chunk outputs are stored for later uploads (runs without
+    `incremental` store nothing). If
+    the transcript extends one run before, that run's prepared prefix
+    (location map, text, chunk boundaries) is kept and only the appended
+    text is normalized, compacted and chunked.
+
+    With `campaign_id`, entities known from the campaign's earlier sessions
+    guide canon extraction and location normalization, and this session's
+    canon is folded back into the campaign store afterwards. `known` pins
+    the entity snapshot to use instead of the campaign's current one. The
+    character map is the campaign's profile unless `profile` is given.
+
+    The result is stored as an artifact bundle under `run_id` (a fresh one
+    if not given), which the result carries as "run_id".
+    """
+    key = transcript_hash(transcript)
+    run_id = run_id or uuid.uuid4().hex
+
+    chunk_store = get_chunk_store()
+    chunk_reuse = ChunkReuse(chunk_store)
+    if known is None:
+        known = load_known(campaign_id)
+    if profile is None:
+        profile = get_profile(campaign_id)
+    preparation = preparation_hash(profile)
+    parent = chunk_store.find_prefix(transcript, preparation) if incremental else None
+
+    options = options_hash(_run_options(campaign_id, known, profile, parent))
+    checkpoints = CheckpointStore(f"{key}-{options}", run_id)
+    if resume:
+        checkpoints.resume_latest()
+
+    def notify(event: str, stage: str, data=None) -> None:
+        if progress is not None:
+            progress(event, stage, data if stage in STREAMED_STAGES else None)
+
+    with trace_run() as trace:
+        try:
+            run = run_stages(
+                build_stages(
+                    chunk_reuse if incremental else None,
+                    notify if progress is not None else None,
+                    known=known,
+                    profile=profile,
+                    prefix=parent,
+                ),
+                {"raw_transcript": transcript},
+                progress=notify,
+                checkpoints=checkpoints,
+                resume=resume,
+            )
+        except Exception:
+            RUNS.inc(outcome="failed")
+            raise
+        result = _assemble_result(run, source_name, key, incremental, parent, chunk_reuse)
+        if incremental:
+            prepared = {
+                "text": run.results["transcript"],
+                "chunks": run.results["chunks"],
+                "location_map": run.results["location_map"],
+            }
+            chunk_store.record_transcript(transcript, key, source_name, result["chunk_count"], preparation, prepared)
+        if campaign_id:
+            result["campaign_id"] = campaign_id
+            get_campaign_store().update(campaign_id, result["canon"])
+
+        for name, (start, end) in run.timings.items():
+            STAGE_SECONDS.observe(end - start, stage=name)
+        RUN_SECONDS.observe(time.perf_counter() - trace.started)
+        RUNS.inc(outcome="success")
+
+        result["run_id"] = run_id
+        result["trace"] = trace.to_dict()
+        save_outputs(result, source_name, run_id)
+
+    if not KEEP_CHECKPOINTS_ON_SUCCESS:
+        checkpoints.clear()
     return result
+
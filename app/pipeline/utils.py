@@ -1,11 +1,14 @@
+import hashlib
+import math
 import re
+from bisect import bisect_left, bisect_right
 from pathlib import Path
+from threading import Lock
 from app.config import BASE_DIR
-from app.config import CHARACTER_ALIASES
 from app.config import PROTECTED_WORDS
+from app.pipeline.metrics import timed
 from rapidfuzz import fuzz, process
 from collections import Counter
-from difflib import SequenceMatcher
 
 def get_prompts_dir() -> Path:
     return BASE_DIR / "pipeline" / "prompts"
@@ -18,21 +21,25 @@ def load_prompt(name: str) -> str:
     return path.read_text(encoding="utf-8")
 
 
+def prompt_templates_hash(names: list[str] | None = None) -> str:
+    """
+    Hash of the given prompt templates (default: all of them), so stored
+    outputs can be keyed on the prompts that produced them.
+    """
+    paths = [get_prompts_dir() / n for n in names] if names else sorted(get_prompts_dir().glob("*.txt"))
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(path.name.encode("utf-8") + b"\0" + path.read_bytes() + b"\0")
+    return digest.hexdigest()[:16]
+
+
 def format_prompt(template: str, **kwargs) -> str:
     return template.format(**kwargs)
 
 # -------------------------
-# STEP 1 — Prepare alias map
+# STEP 1 — Alias maps are built per campaign profile (AliasResolver below,
+# app/pipeline/profiles.py)
 # -------------------------
-ALIAS_MAP = {}
-SHORT_ALIASES = set()
-
-for character, aliases in CHARACTER_ALIASES.items():
-    for alias in aliases:
-        if len(alias) <= 3:
-            SHORT_ALIASES.add(alias.lower())
-        else:
-            ALIAS_MAP[alias] = character
 
 
 # -------------------------
@@ -80,63 +87,188 @@ def looks_like_location(token: str, prev: str = "", next_: str = "") -> bool:
 
 
 # -------------------------
-# STEP 4 — Fuzzy replacer
+# STEP 4 — Alias resolver
 # -------------------------
 FUZZ_THRESHOLD = 88  # was 80; now stricter
 
+TOKEN_RE = re.compile(r"\b[\w#'-]+\b")
 
-def fuzzy_replace_real_names_with_characters(text: str) -> str:
-    tokens = re.findall(r"\b[\w#'-]+\b", text)
-    new_tokens = []
-    length = len(tokens)
+# Memo entries kept per resolver before it is reset
+MEMO_LIMIT = 200_000
 
-    for i, tok in enumerate(tokens):
-        lower = tok.lower()
-        prev_tok = tokens[i - 1] if i > 0 else ""
-        next_tok = tokens[i + 1] if i + 1 < length else ""
 
-        # → Rule: protect non-names
-        if looks_like_location(tok, prev_tok, next_tok):
-            new_tokens.append(tok)
-            continue
+class AliasResolver:
+    """
+    Precompiled alias matching for one character map.
 
-        # → Rule: exact short alias match
-        if lower in SHORT_ALIASES:
-            # Only replace if the word is capitalized (real name)
-            if tok[0].isupper():
-                # find correct mapping
-                for character, aliases in CHARACTER_ALIASES.items():
-                    if lower in [a.lower() for a in aliases]:
-                        new_tokens.append(character)
-                        break
-                else:
-                    new_tokens.append(tok)
-            else:
-                new_tokens.append(tok)
-            continue
+    - `rewrite` resolves each distinct token once (memoized); all unseen
+      candidates are fuzzy-matched in a single batched `process.cdist` call.
+      The memo is shared by threads: each call resolves into its own dict
+      and merges new entries into the memo under a lock.
+    - `replace_exact` swaps exact aliases for canonical names using one
+      compiled, longest-first alternation.
+    Both rewrite the text in a single pass and keep all other characters as-is.
+    """
 
-        # → Rule: fuzzy match only if token looks like a name
-        if not tok[0].isupper():
-            new_tokens.append(tok)
-            continue
+    def __init__(self, character_aliases: dict[str, list[str]], threshold: int = FUZZ_THRESHOLD):
+        self.threshold = threshold
+        self.alias_map: dict[str, str] = {}
+        self.short_aliases: dict[str, str] = {}
 
-        if len(tok) < 3:
-            new_tokens.append(tok)
-            continue
+        for character, aliases in character_aliases.items():
+            for alias in aliases:
+                if len(alias) <= 3:
+                    self.short_aliases.setdefault(alias.lower(), character)
+                else:
+                    self.alias_map[alias] = character
+        self.alias_keys = list(self.alias_map.keys())
+
+        exact = {alias: character for character, aliases in character_aliases.items() for alias in aliases}
+        self._exact_map: dict[str, str] = {}
+        for alias, character in exact.items():
+            self._exact_map.setdefault(alias, character)
+        alternation = "|".join(re.escape(a) for a in sorted(self._exact_map, key=len, reverse=True))
+        self._exact_re = re.compile(rf"(?<!\w)(?:{alternation})(?!\w)") if alternation else None
+        # Words in the longest alias; streamed text is held back this many words
+        self.max_alias_words = max((len(a.split()) for a in self._exact_map), default=1)
+
+        self._memo: dict[str, str | None] = {}
+        self._memo_lock = Lock()
+        self._seed_memo()
+
+    def _seed_memo(self) -> None:
+        # callers hold _memo_lock (or own the resolver, in __init__)
+        self._memo.clear()
+        # An exact alias always scores 100, so it needs no fuzzy lookup
+        self._memo.update(self.alias_map)
+
+    def _resolve_local(self, tok: str) -> tuple[bool, str | None]:
+        """
+        Rules that need no fuzzy matching. Returns (decided, replacement).
+        """
+        lower = tok.lower()
+        if lower in self.short_aliases:
+            # Only replace if the word is capitalized (real name)
+            return True, self.short_aliases[lower] if tok[0].isupper() else None
+        if not tok[0].isupper() or len(tok) < 3:
+            return True, None
+        return False, None
+
+    def _resolve_batch(self, tokens: set[str]) -> dict[str, str | None]:
+        """
+        Replacement (or None) for every token; the fuzzy matching runs
+        outside the lock.
+        """
+        with self._memo_lock:
+            resolved = {tok: self._memo[tok] for tok in tokens if tok in self._memo}
+
+        fresh: dict[str, str | None] = {}
+        fuzzy: list[str] = []
+        for tok in tokens:
+            if tok in resolved:
+                continue
+            decided, replacement = self._resolve_local(tok)
+            if decided:
+                fresh[tok] = replacement
+            else:
+                fuzzy.append(tok)
+
+        if fuzzy and self.alias_keys:
+            scores = process.cdist(
+                fuzzy,
+                self.alias_keys,
+                scorer=fuzz.WRatio,
+                score_cutoff=self.threshold,
+                workers=-1,
+            )
+            best = scores.argmax(axis=1)
+            for row, tok in enumerate(fuzzy):
+                col = int(best[row])
+                fresh[tok] = self.alias_map[self.alias_keys[col]] if scores[row, col] >= self.threshold else None
+        else:
+            fresh.update(dict.fromkeys(fuzzy))
+
+        with self._memo_lock:
+            if len(self._memo) + len(fresh) > MEMO_LIMIT:
+                self._seed_memo()
+            self._memo.update(fresh)
+        resolved.update(fresh)
+        return resolved
+
+    def rewrite(self, text: str) -> str:
+        matches = list(TOKEN_RE.finditer(text))
+        resolved = self._resolve_batch({m.group(0) for m in matches})
+
+        out = []
+        last = 0
+        length = len(matches)
+        for i, m in enumerate(matches):
+            tok = m.group(0)
+            replacement = resolved[tok]
+            if replacement is None or replacement == tok:
+                continue
 
-        # Perform fuzzy lookup
-        match, score, _ = process.extractOne(
-            tok,
-            list(ALIAS_MAP.keys()),
-            scorer=fuzz.WRatio
-        )
+            prev_tok = matches[i - 1].group(0) if i > 0 else ""
+            next_tok = matches[i + 1].group(0) if i + 1 < length else ""
 
-        if score >= FUZZ_THRESHOLD:
-            new_tokens.append(ALIAS_MAP[match])
-        else:
-            new_tokens.append(tok)
+            # → Rule: protect non-names
+            if looks_like_location(tok, prev_tok, next_tok):
+                continue
 
-    return " ".join(new_tokens)
+            out.append(text[last:m.start()])
+            out.append(replacement)
+            last = m.end()
+
+        out.append(text[last:])
+        return "".join(out)
+
+    def replace_exact(self, text: str) -> str:
+        if self._exact_re is None:
+            return text
+        return self._exact_re.sub(lambda m: self._exact_map[m.group(0)], text)
+
+
+class ExactStreamRewriter:
+    """
+    `AliasResolver.replace_exact` for text arriving in deltas (streamed
+    recaps). Text is passed on once more than `max_alias_words` words follow
+    it (so every alias starting in it is complete), and never in the middle
+    of an alias; the concatenated output equals `replace_exact` of the whole
+    text.
+    """
+
+    def __init__(self, resolver: AliasResolver, emit):
+        self.resolver = resolver
+        self.emit = emit
+        self._pending = ""
+
+    def feed(self, delta: str) -> None:
+        self._pending += delta
+        words = [m.start() for m in re.finditer(r"\S+", self._pending)]
+        if len(words) <= self.resolver.max_alias_words:
+            return
+        cut = words[-self.resolver.max_alias_words]
+        if self.resolver._exact_re is not None:
+            for m in self.resolver._exact_re.finditer(self._pending):
+                if m.start() >= cut:
+                    break
+                cut = max(cut, m.end())
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        self.emit(self.resolver.replace_exact(ready))
+
+    def close(self) -> None:
+        if self._pending:
+            ready, self._pending = self._pending, ""
+            self.emit(self.resolver.replace_exact(ready))
+
+
+@timed("fuzzy_replace_real_names_with_characters")
+def fuzzy_replace_real_names_with_characters(text: str, resolver: AliasResolver | None = None) -> str:
+    if resolver is None:
+        from app.pipeline.profiles import get_profile  # profiles imports this module
+
+        resolver = get_profile().resolver
+    return resolver.rewrite(text)
 
 LOCATION_PATTERNS = [
     r"\bthe ([A-Z][a-zA-Z]+(?: [A-Z][a-zA-Z]+)*)\b",
@@ -147,28 +279,46 @@ LOCATION_PATTERNS = [
     r"\b([A-Z][a-zA-Z]+ Hall)\b",
 ]
 
-def extract_location_candidates(transcript: str, character_names: list[str]) -> list[str]:
-    raw_candidates = []
+# Compiled once; each is scanned separately, since matches of different
+# patterns overlap ("in Crypt Room" is both "Crypt" and "Crypt Room")
+LOCATION_RES = [re.compile(pat) for pat in LOCATION_PATTERNS]
 
-    for pat in LOCATION_PATTERNS:
-        for match in re.findall(pat, transcript):
-            if isinstance(match, tuple):
-                match = match[0]
-            if match not in character_names:
-                raw_candidates.append(match)
+# Minimum rapidfuzz ratio (0-100) for two candidates to be the same place
+LOCATION_SIMILARITY = 72
 
-    # Count occurrences
-    counts = Counter(raw_candidates)
 
-    # Keep candidates that appear at least twice (filters noise)
-    candidates = [loc for loc, c in counts.items() if c >= 1]
+def count_location_candidates(transcript: str, character_names: list[str]) -> Counter:
+    excluded = set(character_names)
+    counts = Counter()
+    for pattern in LOCATION_RES:
+        for candidate in pattern.findall(transcript):
+            if candidate not in excluded:
+                counts[candidate] += 1
+    return counts
+
+
+def extract_location_candidates(transcript: str, character_names: list[str]) -> list[str]:
+    return sorted(count_location_candidates(transcript, character_names))
+
 
-    return sorted(set(candidates))
+def _length_window(length: int, threshold: int) -> tuple[int, int]:
+    # ratio = 200 * matches / (len_a + len_b) and matches <= the shorter length,
+    # so two strings can only reach `threshold` within this length range.
+    lo = math.ceil(length * threshold / (200 - threshold))
+    hi = math.floor(length * (200 - threshold) / threshold)
+    return lo, hi
 
-def similar(a: str, b: str, threshold: float = 0.72) -> bool:
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio() >= threshold
 
-def cluster_locations(locations: list[str]) -> dict[str, list[str]]:
+def cluster_locations(locations: list[str], threshold: int = LOCATION_SIMILARITY) -> dict[str, list[str]]:
+    """
+    Greedy clustering: each unclaimed candidate (in input order) claims every
+    other unclaimed candidate similar to it. Only candidates in a compatible
+    length block are scored.
+    """
+    position = {loc: i for i, loc in enumerate(locations)}
+    by_length = sorted(locations, key=len)
+    lengths = [len(loc) for loc in by_length]
+
     clusters = {}
     used = set()
 
@@ -179,38 +329,74 @@ def cluster_locations(locations: list[str]) -> dict[str, list[str]]:
         clusters[loc] = [loc]
         used.add(loc)
 
-        for other in locations:
-            if other in used:
-                continue
-            if similar(loc, other):
-                clusters[loc].append(other)
-                used.add(other)
+        lo, hi = _length_window(len(loc), threshold)
+        block = [o for o in by_length[bisect_left(lengths, lo):bisect_right(lengths, hi)] if o not in used]
+        if not block:
+            continue
+
+        matches = process.extract(
+            loc,
+            block,
+            scorer=fuzz.ratio,
+            processor=str.lower,
+            score_cutoff=threshold,
+            limit=None,
+        )
+        for other in sorted((m[0] for m in matches), key=position.__getitem__):
+            clusters[loc].append(other)
+            used.add(other)
 
     return clusters
 
-def pick_canonical_name(cluster: list[str], transcript: str) -> str:
-    # Pick the version with the highest frequency in transcript
-    counts = {name: transcript.count(name) for name in cluster}
-    return max(counts, key=counts.get)
 
-def normalize_locations(transcript: str, character_names: list[str]) -> tuple[str, dict]:
-    # Step 1: extract candidates
-    candidates = extract_location_candidates(transcript, character_names)
+def pick_canonical_name(cluster: list[str], counts: Counter) -> str:
+    # Pick the version with the highest frequency in transcript
+    return max(cluster, key=lambda name: counts.get(name, 0))
+
+
+@timed("normalize_locations")
+def normalize_locations(
+    transcript: str,
+    character_names: list[str],
+    known_locations: list[str] | None = None,
+    location_map: dict | None = None,
+) -> tuple[str, dict]:
+    """
+    `known_locations` (e.g. from the campaign store) seed the clusters and
+    always win as the canonical spelling of any variant close to them.
+    `location_map` is a map settled by an earlier run (e.g. over the first
+    part of an appended transcript): its variants keep their canonical form,
+    and those forms anchor the clustering ahead of `known_locations`.
+    """
+    fixed = location_map or {}
+
+    # Step 1: extract candidates and their frequencies
+    counts = count_location_candidates(transcript, character_names)
+    anchors = [*fixed.values(), *(known_locations or [])]
+    known = [loc for loc in dict.fromkeys(anchors) if loc not in character_names]
+    known_set = set(known)
+    candidates = known + [c for c in sorted(counts) if c not in known_set and c not in fixed]
 
     # Step 2: cluster similar names
     clusters = cluster_locations(candidates)
 
-    canon_map = {}
+    canon_map = {v: fixed[v] for v in counts if v in fixed}
 
     # Step 3: choose canonical form
     for base, variants in clusters.items():
-        canonical = pick_canonical_name(variants, transcript)
+        anchors = [v for v in variants if v in known_set]
+        canonical = anchors[0] if anchors else pick_canonical_name(variants, counts)
         for v in variants:
-            canon_map[v] = canonical
+            if v in counts and v not in fixed:
+                canon_map[v] = canonical
+
+    # Step 4: apply all replacements in one pass
+    replacements = {old: new for old, new in canon_map.items() if old != new}
+    if not replacements:
+        return transcript, canon_map
 
-    # Step 4: apply replacements
-    normalized = transcript
-    for old, new in canon_map.items():
-        normalized = re.sub(rf"\b{old}\b", new, normalized)
+    alternation = "|".join(re.escape(v) for v in sorted(replacements, key=len, reverse=True))
+    pattern = re.compile(rf"\b(?:{alternation})\b")
+    normalized = pattern.sub(lambda m: replacements[m.group(0)], transcript)
 
     return normalized, canon_map
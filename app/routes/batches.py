@@ -0,0 +1,113 @@
+import zipfile
+from typing import List
+
+from fastapi import APIRouter, File, Form, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from app.config import JOB_DEFAULT_PRIORITY, JOB_PRIORITIES, UPLOAD_BATCH_MAX_FILES
+from app.jobs import Batch, QueueFullError, job_manager
+from app.pipeline.ingest import TRANSCRIPT_SUFFIXES, read_transcript, read_zip_transcripts
+from app.pipeline.profiles import get_profile
+
+router = APIRouter(tags=["batches"])
+
+
+def _get_batch(batch_id: str) -> Batch:
+    batch = job_manager.get_batch(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail=f"Unknown batch: {batch_id}")
+    return batch
+
+
+async def _read_files(files: List[UploadFile]) -> tuple[List[tuple[str, str]], List[str]]:
+    """
+    (name, transcript) for every upload and every transcript inside uploaded
+    zip archives, plus the zip members that were skipped.
+    """
+    transcripts, skipped = [], []
+    for file in files:
+        name = file.filename or ""
+        if name.lower().endswith(".zip"):
+            try:
+                found, ignored = await run_in_threadpool(read_zip_transcripts, file.file)
+            except zipfile.BadZipFile as e:
+                raise HTTPException(status_code=400, detail=f"{name}: not a valid zip archive ({e}).")
+            transcripts.extend((f"{name}/{member}", text) for member, text in found)
+            skipped.extend(f"{name}/{member}" for member in ignored)
+        elif name.lower().endswith(TRANSCRIPT_SUFFIXES):
+            try:
+                transcripts.append((name, await read_transcript(file)))
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to read {name}: {e}")
+        else:
+            raise HTTPException(status_code=400, detail=f"{name}: only .txt, .vtt, .srt or .zip files are supported.")
+
+        if len(transcripts) > UPLOAD_BATCH_MAX_FILES:
+            raise HTTPException(status_code=413, detail=f"At most {UPLOAD_BATCH_MAX_FILES} transcripts per batch.")
+    return transcripts, skipped
+
+
+@router.post("/batches", status_code=202)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    resume: bool = Form(False),
+    incremental: bool = Form(False),
+    campaign_id: str | None = Form(None),
+    priority: str = Form(JOB_DEFAULT_PRIORITY),
+):
+    """
+    Queues one job per transcript (uploaded directly or inside zip archives).
+    The jobs run side by side and share the LLM call pool fairly, so a long
+    session does not hold up the short ones.
+    """
+    if priority not in JOB_PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown priority {priority!r}; expected one of {sorted(JOB_PRIORITIES)}.")
+    try:
+        await run_in_threadpool(get_profile, campaign_id or None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    transcripts, skipped = await _read_files(files)
+    empty = [name for name, text in transcripts if not text.strip()]
+    skipped.extend(empty)
+    transcripts = [(text, name) for name, text in transcripts if text.strip()]
+    if not transcripts:
+        raise HTTPException(status_code=400, detail="No non-empty transcripts in the upload.")
+
+    try:
+        batch = job_manager.submit_batch(
+            transcripts,
+            resume=resume,
+            incremental=incremental,
+            campaign_id=campaign_id or None,
+            priority=priority,
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+
+    return JSONResponse(
+        {
+            "batch_id": batch.id,
+            "status_url": f"/api/batches/{batch.id}",
+            "jobs": [
+                {"job_id": job_id, "source": job_manager.get(job_id).source_name, "status_url": f"/api/jobs/{job_id}"}
+                for job_id in batch.job_ids
+            ],
+            "skipped": skipped,
+        },
+        status_code=202,
+    )
+
+
+@router.get("/batches")
+async def list_batches():
+    return {"batches": [batch.to_dict(job_manager.jobs) for batch in job_manager.batches.values()]}
+
+
+@router.get("/batches/{batch_id}")
+async def batch_status(batch_id: str):
+    """
+    Per-session status and stage progress, plus the batch's wall time once
+    every session has finished.
+    """
+    return _get_batch(batch_id).to_dict(job_manager.jobs)
@@ -0,0 +1,89 @@
+import json
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.jobs import Job, job_manager
+from app.pipeline.parallel import pending_calls
+
+router = APIRouter(tags=["jobs"])
+
+
+def _get_job(job_id: str) -> Job:
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@router.get("/jobs")
+async def list_jobs():
+    return {
+        "queue_depth": job_manager.queue_depth(),
+        "workers": job_manager.workers,
+        "pending_llm_calls": pending_calls(),  # per job: chunk-level calls waiting for the shared pool
+        "jobs": [job.to_dict() for job in job_manager.jobs.values()],
+    }
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    return _get_job(job_id).to_dict()
+
+
+@router.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    job = _get_job(job_id)
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job is still {job.status}.")
+    return JSONResponse(job.result)
+
+
+def _sse(event_id: int, event: str, payload: dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """
+    Server-sent events: every stage result as soon as it is produced
+    ("finished"/"restored"), each chunk's summaries ("chunk"), and the final
+    recaps token by token ("token"). Ends with a "done" or "error" event.
+    Reconnecting clients can send Last-Event-ID to skip what they have seen.
+    """
+    job = _get_job(job_id)
+    last_id = request.headers.get("last-event-id")
+    start = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+
+    async def stream():
+        seen = start
+        while True:
+            while seen < len(job.events):
+                item = job.events[seen]
+                yield _sse(seen, item["event"], {"stage": item["stage"], "data": item["data"]})
+                seen += 1
+
+            if job.status in ("done", "failed") and seen >= len(job.events):
+                if job.status == "done":
+                    yield _sse(seen, "done", {
+                        "job_id": job.id,
+                        "result_url": f"/api/jobs/{job.id}/result",
+                        "run_url": f"/api/runs/{job.id}",
+                    })
+                else:
+                    yield _sse(seen, "error", {"job_id": job.id, "error": job.error})
+                return
+
+            if await request.is_disconnected():
+                return
+            before = len(job.events)
+            await job.wait_for_events(seen)
+            if len(job.events) == before and job.status not in ("done", "failed"):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
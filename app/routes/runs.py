@@ -0,0 +1,105 @@
+import json
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+from starlette.concurrency import run_in_threadpool
+from app.pipeline.artifacts import CODECS, Artifact, get_artifact_store
+from app.pipeline.postprocess import gm_recap_markdown, player_recap_markdown
+
+router = APIRouter(tags=["runs"])
+
+# Bundles never change once written, so clients may keep them
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def _get_artifact(run_id: str) -> Artifact:
+    artifact = get_artifact_store().get(run_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run: {run_id}")
+    return artifact
+
+
+def _validators(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+
+def _not_modified(request: Request, etag: str) -> Response | None:
+    """
+    A 304 response if the client's If-None-Match already covers `etag`.
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return None
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    if "*" in tags or etag in tags:
+        return Response(status_code=304, headers=_validators(etag))
+    return None
+
+
+async def _bundle(artifact: Artifact) -> dict:
+    return await run_in_threadpool(get_artifact_store().load, artifact)
+
+
+@router.get("/runs")
+async def list_runs(transcript_hash: str | None = None, limit: int = 50):
+    runs = get_artifact_store().runs(transcript_hash, min(max(limit, 1), 500))
+    return {"runs": [artifact.to_dict() for artifact in runs]}
+
+
+@router.get("/runs/{run_id}")
+async def run_result(run_id: str, request: Request):
+    """
+    The full result bundle. Clients accepting the bundle's codec get the
+    stored bytes as-is, with a matching Content-Encoding.
+    """
+    artifact = _get_artifact(run_id)
+    etag = f'"{artifact.digest}"'
+    if (cached := _not_modified(request, etag)) is not None:
+        return cached
+
+    encoding = CODECS[artifact.codec][1]
+    accepted = {e.split(";")[0].strip() for e in request.headers.get("accept-encoding", "").split(",")}
+    if encoding in accepted:
+        raw = await run_in_threadpool(get_artifact_store().raw, artifact)
+        headers = {"Content-Encoding": encoding, "Vary": "Accept-Encoding", **_validators(etag)}
+        return Response(raw, media_type="application/json", headers=headers)
+
+    bundle = await _bundle(artifact)
+    return JSONResponse(bundle, headers={"Vary": "Accept-Encoding", **_validators(etag)})
+
+
+@router.get("/runs/{run_id}/gm")
+async def run_gm_recap(run_id: str, request: Request):
+    artifact = _get_artifact(run_id)
+    etag = f'"{artifact.digest}-gm"'
+    if (cached := _not_modified(request, etag)) is not None:
+        return cached
+    bundle = await _bundle(artifact)
+    return PlainTextResponse(gm_recap_markdown(bundle), media_type="text/markdown", headers=_validators(etag))
+
+
+@router.get("/runs/{run_id}/player")
+async def run_player_recap(run_id: str, request: Request):
+    artifact = _get_artifact(run_id)
+    etag = f'"{artifact.digest}-player"'
+    if (cached := _not_modified(request, etag)) is not None:
+        return cached
+    bundle = await _bundle(artifact)
+    return PlainTextResponse(player_recap_markdown(bundle), media_type="text/markdown", headers=_validators(etag))
+
+
+@router.get("/runs/{run_id}/outputs/{name}")
+async def run_output(run_id: str, name: str, request: Request):
+    """
+    One field of the result, e.g. canon, timeline, qa_report,
+    chunk_analytical_summaries or trace.
+    """
+    artifact = _get_artifact(run_id)
+    etag = f'"{artifact.digest}-{name}"'
+    if (cached := _not_modified(request, etag)) is not None:
+        return cached
+    bundle = await _bundle(artifact)
+    if name not in bundle:
+        raise HTTPException(status_code=404, detail=f"Run {run_id} has no output {name!r}; available: {sorted(bundle)}")
+    body = json.dumps(bundle[name], ensure_ascii=False)
+    return Response(body, media_type="application/json", headers=_validators(etag))
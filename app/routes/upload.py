@@ -1,20 +1,60 @@
-from fastapi import APIRouter, UploadFile, HTTPException
+from fastapi import APIRouter, Form, UploadFile, HTTPException
 from fastapi.responses import JSONResponse
-from app.pipeline.summarizer import run_pipeline
+from starlette.concurrency import run_in_threadpool
+from app.config import JOB_DEFAULT_PRIORITY, JOB_PRIORITIES
+from app.jobs import QueueFullError, job_manager
+from app.pipeline.ingest import read_transcript
+from app.pipeline.profiles import get_profile
 
 router = APIRouter(tags=["upload"])
 
 
-@router.post("/upload")
-async def upload_transcript(file: UploadFile):
+@router.post("/upload", status_code=202)
+async def upload_transcript(
+    file: UploadFile,
+    resume: bool = Form(False),
+    incremental: bool = Form(False),
+    campaign_id: str | None = Form(None),
+    priority: str = Form(JOB_DEFAULT_PRIORITY),
+):
     if not file.filename.lower().endswith((".txt", ".vtt", ".srt")):
         raise HTTPException(status_code=400, detail="Only .txt, .vtt, or .srt files are supported for now.")
+    if priority not in JOB_PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown priority {priority!r}; expected one of {sorted(JOB_PRIORITIES)}.")
 
-    raw_bytes = await file.read()
+    # Loads (or re-loads, if its file changed) the campaign's profile, so a
+    # bad id or profile file is reported here rather than by the job
     try:
-        text = raw_bytes.decode("utf-8", errors="ignore")
+        await run_in_threadpool(get_profile, campaign_id or None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        text = await read_transcript(file)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to decode file as UTF-8: {e}")
+        raise HTTPException(status_code=400, detail=f"Failed to read transcript: {e}")
+
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="Transcript is empty.")
+
+    try:
+        job = job_manager.submit(
+            text,
+            source_name=file.filename,
+            resume=resume,
+            incremental=incremental,
+            campaign_id=campaign_id or None,
+            priority=priority,
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
 
-    result = run_pipeline(text, source_name=file.filename)
-    return JSONResponse(result)
+    return JSONResponse(
+        {
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": f"/api/jobs/{job.id}",
+            "result_url": f"/api/jobs/{job.id}/result",
+        },
+        status_code=202,
+    )
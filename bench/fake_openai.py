@@ -0,0 +1,464 @@
+"""
+Local stand-in for the OpenAI chat completions, files and batches APIs.
+
+    python -m bench.fake_openai --port 8765 --latency 0.3 --error-rate 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+
+Canon and timeline prompts get canned JSON so the pipeline's JSON parsing
+succeeds; every other prompt gets filler text of a configurable length.
+Batches complete `batch_latency` seconds after they are created. With `rpm`,
+chat calls over the limit get 429s, and every chat response carries
+x-ratelimit-* headers like the real API. Repeated prompt prefixes are
+reported as cached tokens, as with the API's automatic prompt caching.
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.config import CHARACTER_ALIASES, CHARACTER_PRONOUNS
+
+
+@dataclass
+class FakeSettings:
+    latency: float = 0.2         # seconds per call (mean)
+    jitter: float = 0.05         # +/- uniform jitter on latency
+    error_rate: float = 0.0      # fraction of calls answered with 429/500
+    retry_after: float = 1.0     # Retry-After sent with 429s
+    completion_words: int = 200  # length of filler responses
+    stream_pieces: int = 20      # deltas per streamed response
+    batch_latency: float = 1.0   # seconds from batch creation to completion
+    rpm: int = 0                 # chat requests per minute before 429s (0 = unlimited)
+
+
+def canon_payload() -> dict:
+    return {
+        "characters": {
+            name: {"aliases": aliases, "pronouns": CHARACTER_PRONOUNS.get(name, "")}
+            for name, aliases in CHARACTER_ALIASES.items()
+        },
+        "npcs": {"Larry": ["Lary"]},
+        "locations": ["Alkesh", "Sunken Tomb"],
+        "items": ["torch", "bronze key"],
+        "creatures": ["mummy", "scorpion"],
+    }
+
+
+def timeline_payload() -> dict:
+    return {
+        "timeline": [f"Event {i}: the party pressed deeper into the tomb." for i in range(1, 21)],
+        "simultaneous_events": {"group_1": ["Graak held the door.", "Lirel searched the altar."]},
+    }
+
+
+def fused_payload() -> dict:
+    return {
+        "analytical_summary": "1. Major Events\n- The party entered the tomb.",
+        "narrative_digest": "Torchlight trembled on the tomb walls as the party pressed on.",
+        "action_log": "ACTION LOG:\n- Character: Graak\n  Action: Held the door.",
+    }
+
+
+# (marker found in the prompt, response factory). First match wins.
+CANNED_RESPONSES = [
+    ("Canon Extractor", lambda: json.dumps(canon_payload())),
+    ("Timeline Extractor", lambda: json.dumps(timeline_payload())),
+    ('"analytical_summary"', lambda: json.dumps(fused_payload())),
+]
+
+FILLER = (
+    "The torchlight guttered as the party moved through the dust-choked hall "
+    "and the sand shifted under their boots while something waited below"
+).split()
+
+
+def respond_to(prompt: str, settings: FakeSettings) -> str:
+    for marker, factory in CANNED_RESPONSES:
+        if marker in prompt:
+            return factory()
+    return " ".join(FILLER[i % len(FILLER)] for i in range(settings.completion_words))
+
+
+class PromptCache:
+    """
+    Prefixes of earlier prompts, in blocks of BLOCK_CHARS (~128 tokens at 4
+    characters per token) from MIN_CHARS (~1024 tokens) on, like the API's
+    prompt caching.
+    """
+
+    MIN_CHARS = 4096
+    BLOCK_CHARS = 512
+
+    def __init__(self):
+        self.prefixes: set[bytes] = set()
+        self.lock = threading.Lock()
+
+    def cached_chars(self, prompt: str) -> int:
+        """
+        Length of the longest cached prefix of `prompt`; caches its own prefixes.
+        """
+        digest = hashlib.sha1()
+        cached, miss = 0, False
+        for end in range(self.BLOCK_CHARS, len(prompt) + 1, self.BLOCK_CHARS):
+            digest.update(prompt[end - self.BLOCK_CHARS:end].encode("utf-8"))
+            if end < self.MIN_CHARS:
+                continue
+            key = digest.digest()
+            with self.lock:
+                if not miss and key in self.prefixes:
+                    cached = end
+                else:
+                    miss = True
+                    self.prefixes.add(key)
+        return cached
+
+
+def _completion(req: dict, content: str, cached_chars: int = 0) -> dict:
+    prompt = "\n".join(str(m.get("content", "")) for m in req.get("messages", []))
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": req.get("model"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+            "prompt_tokens_details": {"cached_tokens": cached_chars // 4},
+        },
+    }
+
+
+class FakeBatches:
+    """
+    In-memory files + batches. Each batch is answered on a timer thread.
+    """
+
+    def __init__(self, settings: FakeSettings, stats: dict):
+        self.settings = settings
+        self.stats = stats
+        self.files: dict[str, dict] = {}
+        self.batches: dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def add_file(self, name: str, data: bytes, purpose: str) -> dict:
+        file = {
+            "id": f"file-{uuid.uuid4().hex}",
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": name,
+            "purpose": purpose,
+            "status": "processed",
+        }
+        with self.lock:
+            self.files[file["id"]] = {**file, "data": data}
+        return file
+
+    def create(self, req: dict) -> dict:
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": req.get("endpoint"),
+            "input_file_id": req.get("input_file_id"),
+            "completion_window": req.get("completion_window"),
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            "metadata": req.get("metadata"),
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+        timer = threading.Timer(self.settings.batch_latency, self._complete, (batch["id"],))
+        timer.daemon = True
+        timer.start()
+        return batch
+
+    def _complete(self, batch_id: str) -> None:
+        with self.lock:
+            batch = self.batches[batch_id]
+            data = self.files[batch["input_file_id"]]["data"]
+
+        out = []
+        failed = 0
+        for line in data.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if random.random() < self.settings.error_rate:
+                failed += 1
+                out.append({
+                    "id": f"batch_req_{uuid.uuid4().hex}",
+                    "custom_id": row["custom_id"],
+                    "response": {"status_code": 500, "body": {"error": {"message": "Internal error"}}},
+                    "error": None,
+                })
+                continue
+            body = row["body"]
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+            out.append({
+                "id": f"batch_req_{uuid.uuid4().hex}",
+                "custom_id": row["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "request_id": uuid.uuid4().hex,
+                    "body": _completion(body, respond_to(prompt, self.settings)),
+                },
+                "error": None,
+            })
+
+        output = self.add_file(f"{batch_id}_output.jsonl", "".join(json.dumps(r) + "\n" for r in out).encode(), "batch_output")
+        with self.lock:
+            self.stats["batch_requests"] += len(out)
+            batch.update(
+                status="completed",
+                output_file_id=output["id"],
+                completed_at=int(time.time()),
+                request_counts={"total": len(out), "completed": len(out) - failed, "failed": failed},
+            )
+
+
+def make_handler(settings: FakeSettings, stats: dict, batches: FakeBatches):
+    lock = threading.Lock()
+    window: deque = deque()  # start times of chat requests in the last minute
+    prompt_cache = PromptCache()
+
+    def admit() -> tuple[bool, dict]:
+        """
+        Sliding-window RPM check. Returns (allowed, x-ratelimit-* headers).
+        """
+        if not settings.rpm:
+            return True, {}
+        now = time.monotonic()
+        with lock:
+            while window and window[0] <= now - 60:
+                window.popleft()
+            allowed = len(window) < settings.rpm
+            if allowed:
+                window.append(now)
+            reset = max(0.0, window[0] + 60 - now) if window else 0.0
+            remaining = settings.rpm - len(window)
+        return allowed, {
+            "x-ratelimit-limit-requests": str(settings.rpm),
+            "x-ratelimit-remaining-requests": str(remaining),
+            "x-ratelimit-reset-requests": f"{reset:.3f}s",
+        }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status: int, payload: dict, headers: dict | None = None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self) -> bytes:
+            length = int(self.headers.get("Content-Length", 0))
+            return self.rfile.read(length)
+
+        def _read_json(self) -> dict:
+            return json.loads(self._read_body() or b"{}")
+
+        def _not_found(self):
+            self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def do_GET(self):
+            path = self.path.rstrip("/")
+            parts = path.split("/")
+            if "/batches/" in path:
+                batch = batches.batches.get(parts[-1])
+                if batch is None:
+                    self._not_found()
+                    return
+                self._json(200, batch)
+            elif path.endswith("/content") and "/files/" in path:
+                file = batches.files.get(parts[-2])
+                if file is None:
+                    self._not_found()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(file["data"])))
+                self.end_headers()
+                self.wfile.write(file["data"])
+            else:
+                self._not_found()
+
+        def _upload_file(self):
+            # multipart/form-data with "purpose" and "file" fields
+            head = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode()
+            message = BytesParser(policy=HTTP).parsebytes(head + self._read_body())
+            fields = {}
+            for part in message.iter_parts():
+                fields[part.get_param("name", header="content-disposition")] = part
+            upload = fields["file"]
+            purpose = fields["purpose"].get_payload(decode=True).decode()
+            file = batches.add_file(upload.get_filename(), upload.get_payload(decode=True), purpose)
+            self._json(200, file)
+
+        def do_POST(self):
+            path = self.path.rstrip("/")
+            if path.endswith("/files"):
+                self._upload_file()
+                return
+            if path.endswith("/batches"):
+                self._json(200, batches.create(self._read_json()))
+                return
+            if not path.endswith("/chat/completions"):
+                self._not_found()
+                return
+
+            req = self._read_json()
+            with lock:
+                stats["requests"] += 1
+
+            allowed, limit_headers = admit()
+            if not allowed:
+                with lock:
+                    stats["rate_limited"] += 1
+                self._json(
+                    429,
+                    {"error": {"message": "Rate limit reached for requests", "type": "requests"}},
+                    limit_headers,
+                )
+                return
+
+            time.sleep(max(0.0, settings.latency + random.uniform(-settings.jitter, settings.jitter)))
+
+            if random.random() < settings.error_rate:
+                with lock:
+                    stats["errors"] += 1
+                if random.random() < 0.5:
+                    self._json(
+                        429,
+                        {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                        {"Retry-After": str(settings.retry_after)},
+                    )
+                else:
+                    self._json(500, {"error": {"message": "Internal error", "type": "server_error"}})
+                return
+
+            prompt = "\n".join(str(m.get("content", "")) for m in req.get("messages", []))
+            completion = _completion(req, respond_to(prompt, settings), prompt_cache.cached_chars(prompt))
+
+            if not req.get("stream"):
+                self._json(200, completion, limit_headers)
+                return
+
+            content = completion["choices"][0]["message"]["content"]
+            usage = completion["usage"]
+            base = {"id": completion["id"], "created": completion["created"], "model": completion["model"]}
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            for k, v in limit_headers.items():
+                self.send_header(k, v)
+            self.end_headers()
+            step = max(1, len(content) // settings.stream_pieces)
+            for i in range(0, len(content), step):
+                chunk = {
+                    **base,
+                    "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if (req.get("stream_options") or {}).get("include_usage"):
+                final = {**base, "object": "chat.completion.chunk", "choices": [], "usage": usage}
+                self.wfile.write(f"data: {json.dumps(final)}\n\n".encode("utf-8"))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+    return Handler
+
+
+class FakeOpenAIServer:
+    """
+    Runs the stand-in on a background thread:
+
+        with FakeOpenAIServer(FakeSettings(latency=0.1)) as server:
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+    """
+
+    def __init__(self, settings: FakeSettings | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.settings = settings or FakeSettings()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0, "batch_requests": 0}
+        self.batches = FakeBatches(self.settings, self.stats)
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.settings, self.stats, self.batches))
+        self.httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/"
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=FakeSettings.latency)
+    parser.add_argument("--jitter", type=float, default=FakeSettings.jitter)
+    parser.add_argument("--error-rate", type=float, default=FakeSettings.error_rate)
+    parser.add_argument("--retry-after", type=float, default=FakeSettings.retry_after)
+    parser.add_argument("--completion-words", type=int, default=FakeSettings.completion_words)
+    parser.add_argument("--batch-latency", type=float, default=FakeSettings.batch_latency)
+    parser.add_argument("--rpm", type=int, default=FakeSettings.rpm)
+    args = parser.parse_args()
+
+    settings = FakeSettings(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        retry_after=args.retry_after,
+        completion_words=args.completion_words,
+        batch_latency=args.batch_latency,
+        rpm=args.rpm,
+    )
+    server = FakeOpenAIServer(settings, host=args.host, port=args.port)
+    print(f"Fake OpenAI listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Offline benchmarks: local normalization/chunking steps and end-to-end
+run_pipeline against the fake OpenAI server. No API key or network needed.
+
+    python -m bench.run                      # run and print results
+    python -m bench.run --write-baseline     # save results to bench/baseline.json
+    python -m bench.run --compare            # fail if slower than the baseline
+    python -m bench.run --sessions 8         # also N sessions at once, as a batch upload runs them
+
+Results are machine-readable JSON, keyed "<benchmark>@<size>".
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from bench.fake_openai import FakeOpenAIServer, FakeSettings
+from bench.synth import generate_transcript
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _isolate_storage(root: Path) -> None:
+    """
+    Point every on-disk store at a scratch directory and turn the LLM cache
+    off, so runs neither read nor pollute real data. Client-side rate limits
+    are lifted too (the stand-in only limits with --rpm). Must happen before
+    any app.pipeline module is imported.
+    """
+    import app.config as config
+
+    config.STORAGE_DIR = root
+    config.OUTPUT_DIR = root / "output"
+    config.CHECKPOINT_DIR = root / "checkpoints"
+    config.CHUNK_STORE_PATH = root / "chunks.sqlite3"
+    config.LLM_CACHE_PATH = root / "llm_cache.sqlite3"
+    config.ARTIFACT_DIR = root / "artifacts"
+    config.LLM_CACHE_ENABLED = False
+    config.MODEL_RATE_LIMITS = {}
+    config.DEFAULT_RATE_LIMIT = (10**6, 10**9)
+
+
+def run_sessions(size: int, count: int) -> dict:
+    """
+    `count` different transcripts of `size` tokens run side by side, each in
+    its own session (as JobManager runs a batch upload with JOB_WORKERS).
+    """
+    from app.config import JOB_WORKERS
+    from app.pipeline.parallel import session
+    from app.pipeline.summarizer import run_pipeline
+
+    texts = [generate_transcript(size, seed=size + i) for i in range(count)]
+
+    def one(i: int) -> float:
+        t0 = time.perf_counter()
+        with session(f"bench_{i}"):
+            run_pipeline(texts[i], source_name=f"bench_session_{i}.txt")
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=JOB_WORKERS) as pool:
+        seconds = list(pool.map(one, range(count)))
+    return {"wall": time.perf_counter() - t0, "slowest": max(seconds), "fastest": min(seconds)}
+
+
+def run_benchmarks(
+    sizes: list[int],
+    e2e_sizes: list[int],
+    repeat: int,
+    settings: FakeSettings,
+    sessions: int = 0,
+) -> dict:
+    results: dict[str, dict] = {}
+
+    with tempfile.TemporaryDirectory() as tmp, FakeOpenAIServer(settings) as server:
+        os.environ.setdefault("OPENAI_API_KEY", "fake-key")
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        _isolate_storage(Path(tmp))
+
+        from app.config import CHARACTER_ALIASES
+        from app.pipeline.chunking import TokenizedTranscript, chunk_text, count_tokens, tokenize
+        from app.pipeline.summarizer import run_pipeline
+        from app.pipeline.utils import fuzzy_replace_real_names_with_characters, normalize_locations
+
+        character_names = list(CHARACTER_ALIASES.keys())
+
+        for size in sizes:
+            text = generate_transcript(size, seed=size)
+            tokens = count_tokens(text)
+            local = {
+                "count_tokens": lambda: count_tokens(text),
+                "tokenize": lambda: TokenizedTranscript(text),
+                # cold: the shared encoding would make repeats free
+                "chunk_text": lambda: (tokenize.cache_clear(), chunk_text(text)),
+                "fuzzy_replace_real_names_with_characters": lambda: fuzzy_replace_real_names_with_characters(text),
+                "normalize_locations": lambda: normalize_locations(text, character_names),
+            }
+            for name, fn in local.items():
+                seconds = _best_of(fn, repeat)
+                results[f"{name}@{size}"] = {"seconds": round(seconds, 5), "tokens": tokens}
+                print(f"{name:<45} {size:>9} tok  {seconds:9.4f}s", file=sys.stderr)
+
+            if size in e2e_sizes:
+                requests_before = server.stats["requests"]
+                t0 = time.perf_counter()
+                result = run_pipeline(text, source_name=f"bench_{size}.txt")
+                seconds = time.perf_counter() - t0
+                results[f"run_pipeline@{size}"] = {
+                    "seconds": round(seconds, 3),
+                    "tokens": tokens,
+                    "chunks": result["chunk_count"],
+                    "llm_requests": server.stats["requests"] - requests_before,
+                    "critical_path": result["schedule"]["critical_path"],
+                }
+                print(f"{'run_pipeline':<45} {size:>9} tok  {seconds:9.4f}s", file=sys.stderr)
+
+        if sessions and e2e_sizes:
+            size = min(e2e_sizes)
+            timing = run_sessions(size, sessions)
+            single = results.get(f"run_pipeline@{size}", {}).get("seconds")
+            results[f"run_sessions@{size}x{sessions}"] = {
+                "seconds": round(timing["wall"], 3),
+                "tokens": size,
+                "sessions": sessions,
+                "slowest_session": round(timing["slowest"], 3),
+                "fastest_session": round(timing["fastest"], 3),
+                # wall time vs. running the sessions one after another
+                "speedup": round(sessions * single / timing["wall"], 2) if single else None,
+            }
+            print(f"{f'run_sessions x{sessions}':<45} {size:>9} tok  {timing['wall']:9.4f}s", file=sys.stderr)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "fake_latency": settings.latency,
+            "repeat": repeat,
+            "sessions": sessions,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for key, base in baseline.get("results", {}).items():
+        now = current["results"].get(key)
+        if now is None:
+            continue
+        if now["seconds"] > base["seconds"] * (1 + tolerance):
+            regressions.append(f"{key}: {base['seconds']}s -> {now['seconds']}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="transcript sizes in tokens")
+    parser.add_argument("--e2e-sizes", default="10000,100000", help="sizes to run end-to-end")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake API latency per call")
+    parser.add_argument("--sessions", type=int, default=0, help="also run this many sessions at once (smallest e2e size)")
+    parser.add_argument("--out", type=Path, default=None, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    e2e_sizes = [int(s) for s in args.e2e_sizes.split(",") if s]
+    report = run_benchmarks(
+        sizes, e2e_sizes, args.repeat, FakeSettings(latency=args.latency, jitter=0.0), sessions=args.sessions
+    )
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        args.out.write_text(text, encoding="utf-8")
+    if args.write_baseline:
+        args.baseline.write_text(text, encoding="utf-8")
+
+    if args.compare:
+        if not args.baseline.exists():
+            sys.exit(f"No baseline at {args.baseline}; run with --write-baseline first.")
+        regressions = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Synthetic TTRPG session transcripts for benchmarking.
+
+    python -m bench.synth --tokens 100000 --out session_100k.txt
+
+Speakers are the real player names from characters.json plus a GM. Lines
+mention characters by alias (with typos) and places by spelling variants,
+so the normalization steps have realistic work to do.
+"""
+import argparse
+import random
+from pathlib import Path
+
+from app.config import CHARACTER_ALIASES
+
+GM_NAME = "Matt"
+
+# Rough tokens-per-character ratio for English prose with cl100k/o200k
+CHARS_PER_TOKEN = 4
+
+PLACE_ROOTS = [
+    "Alkesh", "Sunken Tomb", "Scarab Hall", "Obsidian Vault", "Dune Gate",
+    "Ashen Chamber", "Bleeding Well", "Serpent Room", "Crooked Spire", "Salt Basin",
+]
+
+LINE_TEMPLATES = [
+    "{pc} walks toward the {place} with the torch held high.",
+    "I think {pc} should check the door before we go into the {place}.",
+    "Okay so {pc} rolls to search, um, the altar in {place}.",
+    "Wait, is {pc} still holding the bronze key from the {place}?",
+    "{pc} and {pc2} argue about whether to go back to {place}.",
+    "You hear scratching from the {place}, something is coming.",
+    "Roll initiative, the mummy lurches out of the {place}!",
+    "{pc} casts light and the walls of the {place} glitter with old gold.",
+    "like, I don't know, maybe {pc} just waits at the {place}?",
+    "The scorpion strikes at {pc}, take four damage.",
+]
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    op = rng.choice(("swap", "drop", "double"))
+    if op == "swap":
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    if op == "drop":
+        return word[:i] + word[i + 1:]
+    return word[:i] + word[i] + word[i:]
+
+
+def _variants(name: str, rng: random.Random, count: int = 3) -> list[str]:
+    return [name] + [" ".join(_typo(w, rng) for w in name.split()) for _ in range(count)]
+
+
+def generate_transcript(target_tokens: int, seed: int = 0, noise: float = 0.15) -> str:
+    """
+    Roughly `target_tokens` tokens of table talk. `noise` is the chance a
+    name or place is misspelled.
+    """
+    rng = random.Random(seed)
+
+    players = {}
+    for character, aliases in CHARACTER_ALIASES.items():
+        real = [a for a in aliases if a[0].isupper()] or [character]
+        players[real[0]] = aliases
+
+    places = {root: _variants(root, rng) for root in PLACE_ROOTS}
+    speakers = list(players) + [GM_NAME] * 2  # the GM talks a lot
+
+    def mention(aliases: list[str]) -> str:
+        name = rng.choice(aliases)
+        return _typo(name, rng) if rng.random() < noise else name
+
+    def place() -> str:
+        variants = places[rng.choice(PLACE_ROOTS)]
+        return rng.choice(variants[1:]) if rng.random() < noise else variants[0]
+
+    lines = []
+    size = 0
+    target_chars = target_tokens * CHARS_PER_TOKEN
+    minute = 0
+    while size < target_chars:
+        speaker = rng.choice(speakers)
+        pcs = rng.sample(list(players.values()), 2)
+        text = rng.choice(LINE_TEMPLATES).format(pc=mention(pcs[0]), pc2=mention(pcs[1]), place=place())
+        if rng.random() < 0.1:
+            # ASR stutter
+            words = text.split()
+            j = rng.randrange(len(words))
+            words.insert(j, words[j])
+            text = " ".join(words)
+        line = f"[{minute // 60:02d}:{minute % 60:02d}:00] {speaker}: {text}"
+        lines.append(line)
+        size += len(line) + 1
+        minute += rng.choice((0, 0, 1))
+
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.15)
+    parser.add_argument("--out", type=Path, required=True)
+    args = parser.parse_args()
+
+    args.out.write_text(generate_transcript(args.tokens, args.seed, args.noise), encoding="utf-8")
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
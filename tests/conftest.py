@@ -0,0 +1,24 @@
+import re
+
+import pytest
+
+
+class WordEncoder:
+    """
+    One token per word, with the whitespace before it (like tiktoken's
+    " word" tokens), so token counts are easy to reason about.
+    """
+
+    def encode_ordinary(self, text):
+        self.pieces = re.findall(r"\s*\S+|\s+$", text)
+        return list(range(len(self.pieces)))
+
+    def decode_tokens_bytes(self, ids):
+        return [self.pieces[i].encode("utf-8") for i in ids]
+
+
+@pytest.fixture
+def word_tokens(monkeypatch):
+    from app.pipeline import chunking
+
+    monkeypatch.setattr(chunking, "_get_encoder", lambda model: WordEncoder())
@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("rapidfuzz")
+
+from app.pipeline.utils import AliasResolver
+
+
+def test_memo_reset_between_resolving_and_rewriting_keeps_replacements(monkeypatch):
+    resolver = AliasResolver({"Graak": ["Bobby"], "Mira": ["Alice"]})
+    resolve = resolver._resolve_batch
+
+    def reset_after(tokens):
+        # what a concurrent call reaching MEMO_LIMIT does to the shared memo
+        resolved = resolve(tokens)
+        resolver._seed_memo()
+        return resolved
+
+    monkeypatch.setattr(resolver, "_resolve_batch", reset_after)
+    # ASR misspellings: fuzzy-matched, so not among the seeded exact aliases
+    assert resolver.rewrite("Bobbyy and Alicee met Visitor.") == "Graak and Mira met Visitor."
+
+
+def test_exact_aliases_replace_longest_first():
+    resolver = AliasResolver({"Graak": ["Bob", "Bob Smith"]})
+    assert resolver.replace_exact("Bob Smith and Bob, not Bobby") == "Graak and Graak, not Bobby"
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("tiktoken")
+pytest.importorskip("numpy")
+
+from app.pipeline import chunking
+
+
+pytestmark = pytest.mark.usefixtures("word_tokens")
+
+
+def transcript(*turn_lengths):
+    return "\n".join(" ".join(["w"] * n) for n in turn_lengths)
+
+
+def check_invariants(bounds, total, max_tokens):
+    assert bounds[0][0] == 0 and bounds[-1][1] == total
+    for (start, end), (next_start, next_end) in zip(bounds, bounds[1:]):
+        assert next_end > end  # every chunk covers new text
+        assert next_start <= end  # no gaps
+    assert all(end - start <= max_tokens for start, end in bounds)
+
+
+def test_overlap_never_produces_a_chunk_inside_the_previous_one():
+    # Turns of 15, 5 and 20 tokens: backing up 8 tokens from 20 snaps to the
+    # turn boundary at 15, which leaves no room for the 20-token turn
+    tt = chunking.TokenizedTranscript(transcript(15, 5, 20, 5))
+    bounds = tt.chunk_bounds(20, overlap_tokens=8, strategy="turns")
+    assert bounds[:2] == [(0, 20), (20, 40)]
+    check_invariants(bounds, len(tt), 20)
+
+
+def test_overlap_after_a_hard_cut():
+    # A single 60-token turn is cut by tokens; the chunk after each cut
+    # starts 8 tokens back, until the end of the turn fits without overlap
+    tt = chunking.TokenizedTranscript(transcript(60))
+    bounds = tt.chunk_bounds(20, overlap_tokens=8, strategy="turns")
+    assert bounds == [(0, 20), (12, 32), (24, 44), (44, 60)]
+    check_invariants(bounds, len(tt), 20)
+
+
+def test_turn_overlap_backs_up_whole_turns():
+    tt = chunking.TokenizedTranscript(transcript(*[4] * 20))
+    bounds = tt.chunk_bounds(20, overlap_tokens=8, strategy="turns")
+    assert bounds[:3] == [(0, 20), (12, 32), (24, 44)]
+    check_invariants(bounds, len(tt), 20)
@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("tiktoken")
+pytest.importorskip("numpy")
+
+from app.pipeline.compaction import clean_utterance, compact_transcript
+
+pytestmark = pytest.mark.usefixtures("word_tokens")
+
+
+def test_fillers_and_stutters_are_stripped():
+    assert clean_utterance("Um, I think I think we should go") == "I think we should go"
+    assert clean_utterance("the the door is old") == "the door is old"
+
+
+def test_deliberate_repetition_is_kept():
+    assert clean_utterance("no no no, don't touch it") == "no no no, don't touch it"
+    assert clean_utterance("it is very very old") == "it is very very old"
+
+
+def test_interrupting_backchannel_is_dropped_and_turns_merge():
+    text = "GM: You see a door.\nBob: yeah\nGM: It is locked."
+    compacted, report = compact_transcript(text)
+    assert compacted == "GM: You see a door. It is locked."
+    assert (report["lines_before"], report["lines_after"]) == (3, 1)
+
+
+def test_answers_ooc_and_scene_breaks():
+    text = "\n".join([
+        "Alice: Do we open it?",
+        "GM: yes",
+        "(ooc) brb getting a drink",
+        "Alice: We open it.",
+        "",
+        "",
+        "GM: The next morning you wake.",
+    ])
+    compacted, report = compact_transcript(text, keep_line_map=True)
+    # "yes" answers a question; the OOC line goes; the blank lines stay as one break
+    assert compacted == "Alice: Do we open it?\nGM: yes\nAlice: We open it.\n\nGM: The next morning you wake."
+    assert report["line_map"] == [[0, 0], [1, 1], [3, 3], [4, 4], [6, 6]]
@@ -0,0 +1,64 @@
+from functools import partial
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("tiktoken")
+pytest.importorskip("numpy")
+pytest.importorskip("rapidfuzz")
+
+from app.pipeline import chunking, summarizer
+from app.pipeline.checkpoints import transcript_hash
+from app.pipeline.incremental import ChunkReuse, ChunkStore
+from app.pipeline.profiles import CampaignProfile
+
+pytestmark = pytest.mark.usefixtures("word_tokens")
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(summarizer, "chunk_text", partial(chunking.chunk_text, max_tokens=40, overlap_tokens=0))
+
+
+@pytest.fixture
+def profile():
+    return CampaignProfile(Path("test.json"), {"Graak": ["Bob"]}, {"Graak": "he/him"})
+
+
+def session(first_line, lines, place):
+    return "".join(
+        f"{'Bob' if i % 2 else 'GM'}: line {i} and we walk through the {place} to look around\n"
+        for i in range(first_line, first_line + lines)
+    )
+
+
+def test_appended_transcript_reuses_prefix_chunks(tmp_path, profile):
+    store = ChunkStore(tmp_path / "chunks.sqlite3")
+    preparation = summarizer.preparation_hash(profile)
+    first = session(0, 12, "Silver Hall")
+    # The second part spells the place differently more often, which would
+    # move the canonical spelling (and every prefix chunk) if the whole
+    # transcript were normalized again
+    extended = first + session(12, 30, "Silver Halls")
+
+    prepared = summarizer.prepare_transcript(first, profile=profile)
+    store.record_transcript(first, transcript_hash(first), None, len(prepared["chunks"]), preparation, prepared)
+    prefix = store.find_prefix(extended, preparation)
+    assert prefix["transcript_hash"] == transcript_hash(first)
+    assert store.find_prefix(extended, "other settings") is None
+
+    calls = []
+    reuse = ChunkReuse(store)
+    analyze = reuse.wrap("analytical", lambda chunk: calls.append(chunk) or len(calls))
+    for chunk in prepared["chunks"]:
+        analyze(chunk)
+
+    extension = summarizer.prepare_transcript(extended, profile=profile, prefix=prefix)
+    assert extension["chunks"][: len(prepared["chunks"])] == prepared["chunks"]
+    assert extension["location_map"]["Silver Halls"] == "Silver Hall"
+    assert extension["text"].startswith(prepared["text"])
+
+    for chunk in extension["chunks"]:
+        analyze(chunk)
+    assert reuse.reused["analytical"] == len(prepared["chunks"])
+    assert reuse.computed["analytical"] == len(extension["chunks"])
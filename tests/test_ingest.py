@@ -0,0 +1,50 @@
+from app.pipeline.ingest import parse_subtitles
+
+
+def srt(*cues):
+    """(start seconds, end seconds, text) per cue."""
+    blocks = []
+    for i, (start, end, text) in enumerate(cues, 1):
+        stamps = [f"00:{int(t) // 60:02d}:{int(t) % 60:02d},000" for t in (start, end)]
+        blocks.append(f"{i}\n{stamps[0]} --> {stamps[1]}\n{text}\n")
+    return "\n".join(blocks).splitlines()
+
+
+def lines(cues):
+    return [turn.format() for turn in parse_subtitles(srt(*cues))]
+
+
+def test_same_speaker_cues_merge_into_one_turn():
+    assert lines([(1, 3, "Graak: I open"), (3, 5, "Graak: the door"), (6, 8, "Mira: Careful")]) == [
+        "[00:00:01] Graak: I open the door",
+        "[00:00:06] Mira: Careful",
+    ]
+
+
+def test_unlabelled_cues_merge_only_while_contiguous():
+    cues = [(3, 5, "we enter the crypt"), (5, 7, "it is dark"), (20, 22, "someone lights a torch")]
+    cues.append((622, 624, "ten minutes later"))
+    assert lines(cues) == [
+        "[00:00:03] we enter the crypt it is dark",
+        "[00:00:20] someone lights a torch",
+        "[00:10:22] ten minutes later",
+    ]
+
+
+def test_scene_gap_splits_a_speakers_turn():
+    assert lines([(1, 3, "Graak: I wait"), (300, 302, "Graak: still waiting")]) == [
+        "[00:00:01] Graak: I wait",
+        "[00:05:00] Graak: still waiting",
+    ]
+
+
+def test_rolling_caption_repeats_are_dropped():
+    cues = [(1, 3, "Graak: we go down the stairs"), (3, 5, "Graak: down the stairs and left")]
+    assert lines(cues) == ["[00:00:01] Graak: we go down the stairs and left"]
+
+
+def test_long_unlabelled_stream_is_split_into_bounded_turns():
+    cues = [(i, i + 1, " ".join(f"w{i}-{j}" for j in range(50))) for i in range(10)]
+    turns = lines(cues)
+    assert len(turns) == 2
+    assert all(len(turn.split()) <= 301 for turn in turns)
@@ -0,0 +1,24 @@
+import pytest
+
+pytest.importorskip("rapidfuzz")
+
+from app.pipeline.utils import count_location_candidates, extract_location_candidates, normalize_locations
+
+
+def test_overlapping_patterns_all_yield_candidates():
+    # "in Crypt Room" matches both the "in X" and the "X Room" patterns
+    text = "We rest in Crypt Room, then head off at Silver Hall."
+    assert extract_location_candidates(text, []) == ["Crypt", "Crypt Room", "Silver", "Silver Hall"]
+
+
+def test_candidates_count_every_pattern_match_and_skip_characters():
+    text = "Graak waits at the Silver Hall. Later in Graak we see the Silver Hall again."
+    counts = count_location_candidates(text, ["Graak"])
+    assert counts == {"Silver Hall": 4}
+
+
+def test_location_map_pins_earlier_spellings():
+    text = "the Silver Halls, the Silver Halls and the Silver Hall"
+    normalized, canon_map = normalize_locations(text, [], location_map={"Silver Hall": "Silver Hall"})
+    assert canon_map == {"Silver Hall": "Silver Hall", "Silver Halls": "Silver Hall"}
+    assert normalized == "the Silver Hall, the Silver Hall and the Silver Hall"
@@ -0,0 +1,36 @@
+from app.pipeline.merge import entity_key, merge_canon, merge_timelines
+
+
+def test_entity_key_ignores_case_punctuation_and_articles():
+    assert entity_key("Al'Kesh") == entity_key("al kesh") == entity_key("the Alkesh") == "alkesh"
+
+
+def test_merge_canon_dedupes_by_name_and_alias():
+    fragments = [
+        {"characters": {"Graak": {"aliases": ["Grak"], "pronouns": "he/him"}}, "npcs": {"Larry": ["Lary"]}},
+        {"characters": {"Grak": {"aliases": []}}, "npcs": ["Lary"], "locations": ["the Sunken Tomb"]},
+        {"npcs": {"Lary": []}, "locations": ["Sunken Tomb", "Alkesh"], "items": ["torch", "Torch"]},
+    ]
+    canon = merge_canon(fragments, character_names=["Graak"])
+    assert canon["characters"] == {"Graak": {"aliases": ["Grak"], "pronouns": "he/him"}}
+    # the spelling used most often wins; the others become aliases
+    assert canon["npcs"] == {"Lary": ["Larry"]}
+    assert canon["locations"] == ["the Sunken Tomb", "Alkesh"]
+    assert canon["items"] == ["torch"]
+
+
+def test_merge_canon_prefers_configured_character_names():
+    canon = merge_canon([{"characters": {"Grak": {"aliases": ["Graak"]}}}, {"characters": ["Grak"]}], ["Graak"])
+    assert list(canon["characters"]) == ["Graak"]
+    assert canon["characters"]["Graak"]["aliases"] == ["Grak"]
+
+
+def test_merge_timelines_drops_events_repeated_across_a_boundary():
+    fragments = [
+        {"timeline": ["They enter.", "They fight the mummy."], "simultaneous_events": {"group_1": ["a", "b"]}},
+        {"timeline": ["They fight the mummy", "They find a key."], "simultaneous_events": {"group_1": ["c", "d"]}},
+        "not a fragment",
+    ]
+    merged = merge_timelines(fragments)
+    assert merged["timeline"] == ["They enter.", "They fight the mummy.", "They find a key."]
+    assert merged["simultaneous_events"] == {"group_1": ["a", "b"], "group_2": ["c", "d"]}
@@ -0,0 +1,59 @@
+import threading
+
+from app.pipeline.parallel import FairExecutor, fan_out, run_on_pool, session
+
+
+def run_blocked(submit_all):
+    """
+    Submits tasks on a one-worker pool while its worker is busy, then lets
+    it go; returns the order the tasks ran in.
+    """
+    pool = FairExecutor(1, name="test")
+    gate, order = threading.Event(), []
+    blocker = pool.submit(gate.wait)
+    futures = submit_all(pool, order.append)
+    gate.set()
+    for future in [blocker, *futures]:
+        future.result(timeout=5)
+    return order
+
+
+def test_sessions_take_turns_by_weight():
+    def submit_all(pool, record):
+        futures = []
+        with session("low", 1):
+            futures += [pool.submit(record, f"low{i}") for i in range(4)]
+        with session("high", 2):
+            futures += [pool.submit(record, f"high{i}") for i in range(4)]
+        return futures
+
+    # "high" gets two turns for each of "low"'s, though "low" queued first
+    assert run_blocked(submit_all) == ["low0", "high0", "high1", "low1", "high2", "high3", "low2", "low3"]
+
+
+def test_short_session_is_not_stuck_behind_a_long_one():
+    def submit_all(pool, record):
+        with session("long"):
+            futures = [pool.submit(record, f"long{i}") for i in range(6)]
+        with session("short"):
+            futures += [pool.submit(record, f"short{i}") for i in range(2)]
+        return futures
+
+    order = run_blocked(submit_all)
+    assert order[:4] == ["long0", "short0", "long1", "short1"]
+
+
+def test_front_task_goes_ahead_of_its_session_queue():
+    def submit_all(pool, record):
+        with session("a"):
+            queued = [pool.submit(record, f"chunk{i}") for i in range(3)]
+            return [*queued, pool.submit(record, "stage", front=True)]
+
+    assert run_blocked(submit_all) == ["stage", "chunk0", "chunk1", "chunk2"]
+
+
+def test_run_on_pool_runs_inline_on_pool_threads():
+    # a chunk task making a model call must not wait for a second slot
+    names = fan_out([lambda: run_on_pool(lambda: threading.current_thread().name)])
+    assert names[0].startswith("llm_")
+    assert run_on_pool(lambda: threading.current_thread().name).startswith("llm_")
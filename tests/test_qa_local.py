@@ -0,0 +1,47 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("rapidfuzz")
+
+from app.pipeline.profiles import CampaignProfile
+from app.pipeline.qa_local import local_qa
+
+
+@pytest.fixture
+def profile():
+    return CampaignProfile(Path("test.json"), {"Graak": ["Jason"], "Lirel": ["Alicia"]}, {"Graak": "he/him", "Lirel": "she/her"})
+
+
+CANON = {"characters": {"Graak": {"aliases": [], "pronouns": "he/him"}}, "npcs": {"Larry": ["Lary"]}, "locations": ["Sunken Tomb"]}
+
+
+def kinds(report):
+    return [(issue["recap"], issue["kind"], issue["text"], issue["expected"], issue["passage"]) for issue in report["issues"]]
+
+
+def test_clean_recaps_have_no_findings(profile):
+    gm = "## The Tomb\n\nGraak and Lirel reach the Sunken Tomb. He lights a torch while she waits."
+    report = local_qa(gm, "Larry waves at Graak.", CANON, {"Sunkn Tomb": "Sunken Tomb"}, profile)
+    assert report == {"clean": True, "issues": [], "flagged": []}
+
+
+def test_names_variants_and_pronouns_are_flagged_by_passage(profile):
+    gm = "Graak and Lirel reach the Sunken Tomb.\n\nJason opens the door. Lirel draws his sword."
+    player = "Larry greets the party at the Sunkn Tomb.\n\nGraakk meets Zorblax. Lary waves."
+    report = local_qa(gm, player, CANON, {"Sunkn Tomb": "Sunken Tomb"}, profile)
+
+    assert kinds(report) == [
+        ("gm_final", "player_name", "Jason", "Graak", 1),
+        ("gm_final", "pronoun", "his", "Lirel: her/she", 1),
+        ("player_final", "location_variant", "Sunkn Tomb", "Sunken Tomb", 0),
+        ("player_final", "misspelled", "Graakk", "Graak", 1),
+        ("player_final", "unknown_name", "Zorblax", None, 1),
+        ("player_final", "variant", "Lary", "Larry", 1),
+    ]
+    assert [(p["recap"], p["passage"]) for p in report["flagged"]] == [
+        ("gm_final", 1),
+        ("player_final", 0),
+        ("player_final", 1),
+    ]
+    assert report["flagged"][0]["text"] == "Jason opens the door. Lirel draws his sword."
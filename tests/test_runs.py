@@ -0,0 +1,56 @@
+import pytest
+
+pytest.importorskip("httpx")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.pipeline.artifacts import ArtifactStore
+from app.routes import runs
+
+RESULT = {
+    "source": "session.txt",
+    "transcript_hash": "abc",
+    "gm_final_summary": "The party enters the tomb.",
+    "player_final_story": "We went in.",
+    "canon": {"locations": ["Sunken Tomb"]},
+}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    store = ArtifactStore(tmp_path / "artifacts")
+    store.save("run1", RESULT)
+    monkeypatch.setattr(runs, "get_artifact_store", lambda: store)
+    app = FastAPI()
+    app.include_router(runs.router, prefix="/api")
+    return TestClient(app)
+
+
+def test_bundle_is_served_with_validators(client):
+    response = client.get("/api/runs/run1", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.json() == RESULT
+    assert response.headers["etag"].startswith('"')
+    assert "immutable" in response.headers["cache-control"]
+
+
+@pytest.mark.parametrize("path", ["/api/runs/run1", "/api/runs/run1/gm", "/api/runs/run1/player", "/api/runs/run1/outputs/canon"])
+def test_matching_if_none_match_gets_304(client, path):
+    etag = client.get(path).headers["etag"]
+    for header in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get(path, headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+    assert client.get(path, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_each_view_has_its_own_etag(client):
+    etags = {client.get(path).headers["etag"] for path in ("/api/runs/run1", "/api/runs/run1/gm", "/api/runs/run1/player")}
+    assert len(etags) == 3
+
+
+def test_unknown_run_or_output_is_404(client):
+    assert client.get("/api/runs/nope").status_code == 404
+    assert client.get("/api/runs/run1/outputs/nope").status_code == 404